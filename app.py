@@ -11,15 +11,17 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.core.email_processor import parse_email
-from src.core.reply_service import generate_reply
+from src.core.reply_service import generate_reply, stream_reply
 from src.core.data_logger import log_to_csv
+from src.core.batch_processor import process_batch
 
-def handle_email(email_file):
+def handle_email(email_file, stream=False):
     """
     Process an email file and generate an automated reply
     
     Args:
         email_file (str): Path to the email file to process
+        stream (bool): Print the reply token by token as it is generated
     """
     # Parse email into dict with 'email_body' and optionally 'subject'
     email_data = parse_email(email_file)
@@ -31,7 +33,15 @@ def handle_email(email_file):
     print(f"Body:\n{email_data['email_body']}\n")
 
     # Generate classification, intent, entities, and reply
-    category, intent, entities, reply = generate_reply(email_data)
+    if stream:
+        print("===== Reply =====")
+        reply_stream = stream_reply(email_data)
+        for token in reply_stream:
+            print(token, end="", flush=True)
+        print("\n")
+        category, intent, entities, reply = reply_stream.result
+    else:
+        category, intent, entities, reply = generate_reply(email_data)
 
     # Add extra info to email data for logging
     email_data.update({
@@ -48,17 +58,236 @@ def handle_email(email_file):
     print(f"Category: {category}")
     print(f"Intent: {intent}")
     print(f"Entities: {entities}")
-    print(f"\n===== Reply ===== \n{reply}")
+    body_tokens = email_data.get("body_tokens")
+    if body_tokens:
+        print(f"Prompt body: {body_tokens['tokens']} tokens ({body_tokens['tokens_saved']} saved)")
+    if not stream:
+        print(f"\n===== Reply ===== \n{reply}")
+
+def handle_batch(source, concurrency=8, output=None, log_results=True):
+    """
+    Process a directory, glob pattern or mbox of emails concurrently
+    
+    Args:
+        source (str): Directory, glob pattern, mbox file or single email file
+        concurrency (int): Number of emails processed at the same time
+        output (str): Optional JSON Lines file that results are appended to
+        log_results (bool): Whether to record each reply in the reply log
+    """
+    import asyncio
+    from src.core.job_scheduler import get_job_scheduler
+    from src.core.llm_client import http_pool_stats
+    
+    def print_result(record):
+        if "error" in record:
+            print(f"[failed] {record['source']}: {record['error']}")
+        else:
+            print(f"[{record['latency_seconds']:.2f}s] {record['source']} -> {record['category']}")
+    
+    summary = asyncio.run(process_batch(
+        source,
+        concurrency=concurrency,
+        output_path=output,
+        log_results=log_results,
+        on_result=print_result
+    ))
+    
+    print("\n===== Batch Summary =====")
+    print(f"Processed: {summary['processed']}")
+    print(f"Failed: {summary['failed']}")
+    print(f"Elapsed: {summary['elapsed_seconds']:.2f}s")
+    print(f"Throughput: {summary['throughput_per_second']:.2f} emails/s")
+    print(f"Prompt tokens saved by body normalization: {summary['tokens_saved']}")
+    print(
+        f"Latency p50/p90/p99/max: {summary['latency_p50']:.2f}s / {summary['latency_p90']:.2f}s / "
+        f"{summary['latency_p99']:.2f}s / {summary['latency_max']:.2f}s"
+    )
+    
+    scheduler = get_job_scheduler().stats()
+    admitted = ", ".join(f"{lane} {count}" for lane, count in scheduler["admitted"].items() if count)
+    print(f"Scheduler: admitted {admitted or 'none'}; {scheduler['deferred']} deferred, {scheduler['dropped']} dropped")
+    
+    pool = http_pool_stats()
+    print(
+        f"HTTP pool: {pool['requests']} requests, {pool['connections_opened']} connections opened, "
+        f"{pool['reused']} reused, {pool['connections_open']} open, {pool['waiting']} waiting"
+    )
+
+def batch_command(argv):
+    """Parse arguments for the `batch` subcommand and run it"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        prog="email-automation batch",
+        description="Process many emails concurrently in a single process"
+    )
+    parser.add_argument("source", help="Directory, glob pattern (quote it) or mbox file of emails")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of emails processed at the same time")
+    parser.add_argument("--output", help="Append JSON Lines results to this file as they finish")
+    parser.add_argument("--no-log", action="store_true", help="Do not record replies in the reply log")
+    
+    args = parser.parse_args(argv)
+    handle_batch(args.source, args.concurrency, args.output, not args.no_log)
+
+def migrate_log_command(argv):
+    """Copy a legacy reply_log.csv into the SQLite log store"""
+    import argparse
+    from src.core.log_store import DEFAULT_CSV_LOG_PATH, DEFAULT_DB_LOG_PATH, migrate_csv_log
+    
+    parser = argparse.ArgumentParser(
+        prog="email-automation migrate-log",
+        description="Migrate a JSON-in-CSV reply log into the indexed SQLite store"
+    )
+    parser.add_argument("--csv", default=DEFAULT_CSV_LOG_PATH, help="Existing reply log CSV to read")
+    parser.add_argument("--db", default=DEFAULT_DB_LOG_PATH, help="SQLite database to write")
+    parser.add_argument("--append", action="store_true", help="Add to a database that already contains replies")
+    
+    args = parser.parse_args(argv)
+    migrated = migrate_csv_log(args.csv, args.db, append=args.append)
+    print(f"Migrated {migrated} replies from {args.csv} to {args.db}")
+    print('Set log_backend: "sqlite" in config/app_config.yaml to use it')
+
+def prune_log_command(argv):
+    """Seal the active reply log and drop days outside the retention window"""
+    import argparse
+    from src.core.log_rollups import get_reply_rollups
+    from src.core.log_store import get_log_store
+    from src.core.search_index import get_search_index, search_index_enabled
+    from src.utils.helpers import load_config_or_defaults
+    
+    parser = argparse.ArgumentParser(
+        prog="email-automation prune-log",
+        description="Compact the reply log into day segments and enforce log retention"
+    )
+    parser.add_argument("--days", type=int, help="Days to keep (default: configured log retention)")
+    
+    args = parser.parse_args(argv)
+    store = get_log_store()
+    removed = store.enforce_retention(args.days)
+    unit = "day segments" if store.backend == "csv" else "replies"
+    print(f"Removed {removed} expired {unit} from the {store.backend} reply log")
+    if get_reply_rollups().sync_with(store):
+        print("Rebuilt the analytics rollups")
+    if search_index_enabled(load_config_or_defaults()) and get_search_index().sync_with(store):
+        print("Rebuilt the search index")
+
+def search_command(argv):
+    """Full-text search over logged subjects, email bodies and replies"""
+    import argparse
+    from src.core.log_store import get_log_store
+    from src.core.search_index import get_search_index
+    
+    parser = argparse.ArgumentParser(
+        prog="email-automation search",
+        description="Search logged emails and replies, best match first ('refund*' matches prefixes)"
+    )
+    parser.add_argument("query", nargs="+", help="Words to search for")
+    parser.add_argument("--category", help="Only replies with this category")
+    parser.add_argument("--since", help="Only replies logged on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Only replies logged before this date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=10, help="Number of results to show (default: 10)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the reply log first")
+    
+    args = parser.parse_args(argv)
+    store = get_log_store()
+    index = get_search_index()
+    index.sync_with(store, force=args.rebuild)
+    
+    result = index.search(" ".join(args.query), category=args.category, start=args.since, end=args.until, limit=args.limit)
+    print(f"{result['total']} matching replies")
+    for rank, row in enumerate(result["rows"], 1):
+        print(f"\n{rank}. [{row['category']}] {row['subject']} ({row['timestamp'][:19]}, score {row['score']:.3f})")
+        print(f"   {row['snippet']}")
+
+def enqueue_command(argv):
+    """Push parsed emails into the durable job queue"""
+    import argparse
+    from src.core.batch_processor import iter_email_sources
+    from src.core.job_queue import get_job_queue
+    
+    parser = argparse.ArgumentParser(
+        prog="email-automation enqueue",
+        description="Queue emails for the worker processes; emails already queued (same Message-ID) are skipped"
+    )
+    parser.add_argument("source", help="Directory, glob pattern (quote it), mbox file or single email file")
+    
+    args = parser.parse_args(argv)
+    queue = get_job_queue()
+    created = duplicates = 0
+    for _, email_data in iter_email_sources(args.source):
+        _, new = queue.enqueue(email_data)
+        if new:
+            created += 1
+        else:
+            duplicates += 1
+    print(f"Queued {created} emails ({duplicates} already queued)")
+    print(f"Queue: {queue.stats()}")
+
+def worker_command(argv):
+    """Process queued emails with a pool of worker processes"""
+    import argparse
+    from src.utils.helpers import load_config_or_defaults
+    from src.core.queue_worker import run_workers
+    
+    config = load_config_or_defaults()
+    parser = argparse.ArgumentParser(
+        prog="email-automation worker",
+        description="Pull jobs from the durable queue through the reply pipeline until stopped (Ctrl+C finishes in-flight jobs)"
+    )
+    parser.add_argument("--processes", type=int, default=config.get("worker_processes", 1), help="Worker processes to run")
+    parser.add_argument("--concurrency", type=int, default=config.get("worker_concurrency", 4), help="Jobs in flight per process")
+    parser.add_argument("--drain", action="store_true", help="Exit once the queue has no due jobs")
+    
+    args = parser.parse_args(argv)
+    run_workers(config, processes=args.processes, concurrency=args.concurrency, drain=args.drain)
+
+def queue_status_command(argv):
+    """Show job counts and optionally revive failed jobs"""
+    import argparse
+    from src.core.job_queue import get_job_queue
+    
+    parser = argparse.ArgumentParser(prog="email-automation queue-status", description="Show the durable job queue")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue failed jobs with fresh attempts")
+    
+    args = parser.parse_args(argv)
+    queue = get_job_queue()
+    if args.retry_failed:
+        print(f"Requeued {queue.retry_failed()} failed jobs")
+    for state, count in queue.stats().items():
+        print(f"{state}: {count}")
+
+# Subcommands dispatched on the first command line argument
+COMMANDS = {
+    "batch": batch_command,
+    "migrate-log": migrate_log_command,
+    "prune-log": prune_log_command,
+    "search": search_command,
+    "enqueue": enqueue_command,
+    "worker": worker_command,
+    "queue-status": queue_status_command,
+}
 
 def main():
     """Main entry point for the application"""
     import argparse
     
-    parser = argparse.ArgumentParser(description="LangGraph Email Reply Automation")
-    parser.add_argument("email_file", help="Path to the email file to process")
+    argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+        return
+    
+    parser = argparse.ArgumentParser(
+        description="LangGraph Email Reply Automation",
+        epilog=f"Subcommands: {', '.join(COMMANDS)} (run '<subcommand> --help' for details)"
+    )
+    parser.add_argument("email_file", nargs="?", help="Path to the email file to process")
     parser.add_argument("--web", action="store_true", help="Launch the web interface")
+    parser.add_argument("--stream", action="store_true", help="Print the reply as it is generated")
+    
+    args = parser.parse_args(argv)
     
-    args = parser.parse_args()
+    if not args.web and not args.email_file:
+        parser.error("an email file is required unless --web is given")
     
     if args.web:
         # Launch Streamlit web interface
@@ -66,7 +295,7 @@ def main():
         subprocess.run(["streamlit", "run", "src/ui/main_interface.py"])
     else:
         # Process single email file
-        handle_email(args.email_file)
+        handle_email(args.email_file, stream=args.stream)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
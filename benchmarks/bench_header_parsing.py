@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: header and date parsing in parse_email
+
+Compares the previous line-splitting parser with its strptime cascade
+against the precompiled header scanner and parsedate_to_datetime path.
+
+Usage:
+    python benchmarks/bench_header_parsing.py [--count 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.email_processor import _parse_date, _parse_headers
+
+DATES = (
+    "Mon, 01 Jan 2024 10:{minute:02d}:00 +0000",
+    "{day} Feb 2024 09:{minute:02d}:30 -0500",
+    "2024-03-{day:02d} 14:{minute:02d}:00",
+    "04/{day:02d}/2024 08:{minute:02d}:15",
+)
+
+def legacy_parse_headers(headers_text):
+    headers = {}
+    for line in headers_text.split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    return headers
+
+def legacy_parse_date(date):
+    parsed_date = None
+    if date != 'Unknown':
+        for fmt in ('%a, %d %b %Y %H:%M:%S %z', '%d %b %Y %H:%M:%S %z', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M:%S'):
+            try:
+                parsed_date = datetime.strptime(date, fmt)
+                break
+            except ValueError:
+                continue
+    return parsed_date
+
+def make_headers(count, seed=7):
+    rng = random.Random(seed)
+    blocks = []
+    for index in range(count):
+        date = rng.choice(DATES).format(day=rng.randint(1, 28), minute=rng.randint(0, 59))
+        blocks.append(
+            f"From: Sender {index} <sender{index}@example.com>\n"
+            f"To: support@example.com\n"
+            f"Subject: Question about order {index}\n"
+            f"Date: {date}\n"
+            f"Message-ID: <{index}@example.com>"
+        )
+    return blocks
+
+def run(label, parse_headers, parse_date, blocks):
+    started = time.perf_counter()
+    parsed = 0
+    for block in blocks:
+        headers = parse_headers(block)
+        if parse_date(headers.get("date", "Unknown")) is not None:
+            parsed += 1
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {elapsed:8.3f}s  {len(blocks) / elapsed:>12,.0f} headers/s  ({parsed} dates parsed)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="Header blocks to parse")
+    args = parser.parse_args()
+
+    blocks = make_headers(args.count)
+    legacy = run("legacy", legacy_parse_headers, legacy_parse_date, blocks)
+    current = run("current", _parse_headers, _parse_date, blocks)
+    print(f"speedup    {legacy / current:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,10 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "http2": ["h2>=4.0"],
+        "tokens": ["tiktoken>=0.5"],
+    },
     entry_points={
         "console_scripts": [
             "email-automation=app:main",
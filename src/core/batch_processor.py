@@ -0,0 +1,206 @@
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .email_processor import parse_email, parse_email_message
+from .email_ingestion import is_maildir, is_mbox, iter_mailbox, parse_message_file
+from .reply_service import generate_reply_async
+from .data_logger import flush_logs, log_to_csv
+
+logger = logging.getLogger(__name__)
+
+EMAIL_FILE_EXTENSIONS = (".txt", ".eml")
+
+def iter_email_sources(source: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Lazily yield (source_id, email_data) pairs from a directory, glob pattern,
+    mbox file, Maildir or single email file
+
+    mbox files and Maildirs are streamed one message at a time by
+    email_ingestion; .eml files go through the MIME-aware parser. Files that
+    fail to parse are logged and skipped so one bad email does not stop the
+    whole batch.
+    """
+    if is_maildir(source) or is_mbox(source):
+        yield from iter_mailbox(source)
+        return
+    if os.path.isdir(source):
+        paths = (
+            entry.path for entry in sorted(os.scandir(source), key=lambda entry: entry.name)
+            if entry.is_file() and entry.name.lower().endswith(EMAIL_FILE_EXTENSIONS)
+        )
+    elif any(char in source for char in "*?["):
+        paths = (path for path in sorted(glob.iglob(source, recursive=True)) if os.path.isfile(path))
+    elif os.path.isfile(source):
+        paths = iter([source])
+    else:
+        raise FileNotFoundError(f"No emails found at {source}")
+
+    for path in paths:
+        try:
+            yield path, _parse_email_file(path)
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+
+def _parse_email_file(path: str) -> Dict[str, Any]:
+    if path.lower().endswith(".eml"):
+        with open(path, "rb") as f:
+            return parse_email_message(parse_message_file(f))
+    return parse_email(path)
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers (0.0 for an empty list)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+async def process_batch(
+    source: str,
+    concurrency: int = 8,
+    output_path: Optional[str] = None,
+    log_results: bool = True,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Stream emails from a source through the async reply pipeline
+
+    At most `concurrency` emails are in flight at once and parsing stays only
+    a few emails ahead of the workers, so memory does not grow with the size
+    of the source.
+
+    Args:
+        source: Directory, glob pattern, mbox file, Maildir or single email file
+        concurrency: Number of emails processed concurrently
+        output_path: Optional JSON Lines file that results are appended to as they finish
+        log_results: Whether to record each reply with log_to_csv
+        on_result: Optional callback invoked with each result record
+
+    Returns:
+        Summary with counts, throughput, latency percentiles in seconds and
+        prompt tokens saved by body normalization
+    """
+    return await process_emails(
+        iter_email_sources(source),
+        concurrency=concurrency,
+        output_path=output_path,
+        log_results=log_results,
+        on_result=on_result
+    )
+
+async def process_emails(
+    emails: Iterator[Tuple[str, Dict[str, Any]]],
+    concurrency: int = 8,
+    output_path: Optional[str] = None,
+    log_results: bool = True,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    lane: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run (source_id, email_data) pairs through the async reply pipeline
+
+    The engine behind process_batch, also used for uploads in the web UI.
+    The iterator is advanced in a worker thread, so it may parse lazily.
+    on_result is called on the event loop's thread as each email finishes.
+    lane is passed to generate_reply_async (None triages into urgent or bulk).
+    Arguments and the returned summary are otherwise as for process_batch.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    emails = iter(emails)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies = []
+    failed_sources = []
+    savings = []
+    output = open(output_path, "a", encoding="utf-8") if output_path else None
+
+    async def produce():
+        while True:
+            # Parse in a worker thread so file I/O never blocks the event loop
+            item = await asyncio.to_thread(next, emails, None)
+            if item is None:
+                break
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            source_id, email_data = item
+            started = time.perf_counter()
+            try:
+                category, intent, entities, reply = await generate_reply_async(email_data, lane)
+            except Exception as e:
+                failed_sources.append(source_id)
+                logger.error(f"Failed to process {source_id}: {e}")
+                record = {"source": source_id, "subject": email_data.get("subject"), "error": str(e)}
+            else:
+                latency = time.perf_counter() - started
+                latencies.append(latency)
+                saved = email_data.get("body_tokens", {}).get("tokens_saved", 0)
+                savings.append(saved)
+                email_data.update({
+                    "category": category,
+                    "intent": intent,
+                    "entities": entities
+                })
+                if log_results:
+                    log_to_csv(email_data, reply)
+                record = {
+                    "source": source_id,
+                    "subject": email_data.get("subject"),
+                    "category": category,
+                    "intent": intent,
+                    "entities": entities,
+                    "reply": reply,
+                    "tokens_saved": saved,
+                    "latency_seconds": round(latency, 3)
+                }
+
+            if output:
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+            if on_result:
+                on_result(record)
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # When one task fails (or the batch is cancelled) the others would
+        # wait on the queue forever; stop them so nothing outlives the batch
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if output:
+            output.close()
+        if log_results:
+            await asyncio.to_thread(flush_logs)
+    elapsed = time.perf_counter() - started
+
+    processed = len(latencies)
+    return {
+        "processed": processed,
+        "failed": len(failed_sources),
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": processed / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies) if latencies else 0.0,
+        "tokens_saved": sum(savings)
+    }
@@ -0,0 +1,146 @@
+import html
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict
+
+from ..utils.rate_limiter import estimate_tokens, truncate_tokens
+
+# Appended when a body is cut to the token budget
+TRUNCATION_MARKER = "\n[...]"
+
+_HTML_RE = re.compile(r"<(?:html|body|div|p|br|table|span|font)\b", re.IGNORECASE)
+
+# Lines that start quoted history: everything from here on is dropped
+_QUOTE_HEADER_RES = (
+    re.compile(r"^On .{0,200}wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^-{2,}\s*Forwarded message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$"),
+    re.compile(r"^From:\s.+$"),
+)
+
+# Lines that start a signature or trailing boilerplate
+_SIGNATURE_RES = (
+    re.compile(r"^--\s*$"),
+    re.compile(r"^Sent from my \w+", re.IGNORECASE),
+    re.compile(r"^Get Outlook for ", re.IGNORECASE),
+    re.compile(r"^(?:CONFIDENTIALITY NOTICE|DISCLAIMER|This (?:e-?mail|message) and any attachments?)", re.IGNORECASE),
+)
+
+_BLOCK_TAGS = {"p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "table", "hr"}
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "head"):
+            self._skip += 1
+        elif tag == "blockquote":
+            # Quoted replies in HTML mail; dropped like "> " lines
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "head", "blockquote"):
+            self._skip = max(self._skip - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+def html_to_text(body: str) -> str:
+    """
+    Convert an HTML body to plain text, dropping scripts, styles and quoted blocks
+    """
+    extractor = _TextExtractor()
+    try:
+        extractor.feed(body)
+        extractor.close()
+    except Exception:
+        return html.unescape(re.sub(r"<[^>]+>", " ", body))
+    return "".join(extractor.parts)
+
+def strip_quoted(text: str) -> str:
+    """
+    Drop quoted reply history: "> " lines and everything after a reply header
+    """
+    lines = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if any(pattern.match(stripped) for pattern in _QUOTE_HEADER_RES) and lines:
+            break
+        if stripped.startswith(">"):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+def strip_signature(text: str) -> str:
+    """
+    Drop the signature block, mobile footers and legal disclaimers
+    """
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        if index and any(pattern.match(line.strip()) for pattern in _SIGNATURE_RES):
+            return "\n".join(lines[:index])
+    return text
+
+def collapse_whitespace(text: str) -> str:
+    text = re.sub(r"[ \t ]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def normalize_body(body: str, max_tokens: int = 2000, strip_quotes: bool = True,
+                   strip_signatures: bool = True, model: str = "gpt-3.5-turbo") -> Dict[str, Any]:
+    """
+    Reduce an email body to the text the model needs
+
+    Args:
+        body: Raw email body, plain text or HTML
+        max_tokens: Token budget for the result (0 for no limit)
+        strip_quotes: Drop quoted reply history
+        strip_signatures: Drop signatures and disclaimers
+        model: Model whose tokenizer counts the tokens
+
+    Returns:
+        {"text", "original_tokens", "tokens", "tokens_saved", "truncated"}
+    """
+    original_tokens = estimate_tokens(body, model)
+    text = html_to_text(body) if _HTML_RE.search(body) else body
+    text = text.replace("\r\n", "\n")
+    if strip_quotes:
+        text = strip_quoted(text)
+    if strip_signatures:
+        text = strip_signature(text)
+    text = collapse_whitespace(text) or collapse_whitespace(body)
+
+    truncated = False
+    if max_tokens and estimate_tokens(text, model) > max_tokens:
+        text = truncate_tokens(text, max_tokens, model).rstrip() + TRUNCATION_MARKER
+        truncated = True
+    tokens = estimate_tokens(text, model)
+    return {
+        "text": text,
+        "original_tokens": original_tokens,
+        "tokens": tokens,
+        "tokens_saved": max(original_tokens - tokens, 0),
+        "truncated": truncated
+    }
+
+def normalization_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    normalize_body arguments from a loaded configuration, or None when disabled
+    """
+    if not config.get("body_normalization_enabled", True):
+        return None
+    return {
+        "max_tokens": int(config.get("body_max_tokens", 2000)),
+        "strip_quotes": bool(config.get("body_strip_quotes", True)),
+        "strip_signatures": bool(config.get("body_strip_signatures", True)),
+        "model": config.get("model_name", "gpt-3.5-turbo"),
+    }
@@ -1,27 +1,27 @@
-import csv
-import json
-import os
-from datetime import datetime
+from .log_store import build_log_record
+from .log_writer import get_log_writer
 
 def log_to_csv(email_data, reply):
-    log_path = "data/logs/reply_log.csv"
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-    file_exists = os.path.isfile(log_path)
+    """
+    Record a generated reply in the reply log
 
-    # Build compact JSON state
-    full_state = {
-        "timestamp": str(datetime.now()),
-        "subject": email_data.get("subject", "Unknown"),
-        "email_body": email_data["email_body"],
-        "category": email_data.get("category", "Unknown"),
-        "intent": email_data.get("intent", "Unknown"),
-        "entities": email_data.get("entities", {}),
-        "reply": reply
-    }
+    Writes to data/logs/reply_log.csv by default; set log_backend: "sqlite"
+    in the config to use the indexed columnar store instead. The record is
+    queued for the background log writer, so this returns without touching
+    the disk; call flush_logs() when the rows must be visible immediately.
+    """
+    get_log_writer().enqueue(build_log_record(email_data, reply))
 
-    # Write to CSV with compact JSON (1-line per row)
-    with open(log_path, mode='a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
-        if not file_exists:
-            writer.writerow(["FullEmailStateJSON"])
-        writer.writerow([json.dumps(full_state, ensure_ascii=False)])
+def flush_logs():
+    """
+    Block until every queued log record has been written
+    """
+    get_log_writer().flush()
+
+def add_log_listener(listener):
+    """
+    Register listener(records), called after each batch of replies is written
+
+    Used to invalidate caches of log-derived data.
+    """
+    get_log_writer().add_listener(listener)
@@ -0,0 +1,211 @@
+import io
+import logging
+import mmap
+import os
+import zipfile
+from email.feedparser import BytesFeedParser
+from email.message import Message
+from typing import Any, BinaryIO, Dict, Iterator, Tuple
+
+from .email_processor import parse_email_bytes, parse_email_message
+
+logger = logging.getLogger(__name__)
+
+# Bytes handed to the incremental parser at a time
+CHUNK_SIZE = 64 * 1024
+
+# mbox messages start with a "From " line at the start of the file or after a newline
+MBOX_SEPARATOR = b"\nFrom "
+
+EML_EXTENSIONS = (".eml",)
+UPLOAD_EXTENSIONS = (".txt", ".eml")
+
+# Zip entries larger than this (uncompressed) are skipped rather than inflated
+MAX_ZIP_ENTRY_BYTES = 25 * 1024 * 1024
+MAILDIR_SUBDIRS = ("new", "cur")
+
+def parse_message_bytes(data) -> Message:
+    """
+    Parse one RFC 5322 message from a bytes-like object in chunks
+    """
+    parser = BytesFeedParser()
+    with memoryview(data) as view:
+        for start in range(0, len(view), CHUNK_SIZE):
+            parser.feed(bytes(view[start:start + CHUNK_SIZE]))
+    return parser.close()
+
+def parse_message_file(file: BinaryIO) -> Message:
+    """
+    Parse one message from a binary file without reading it whole
+    """
+    parser = BytesFeedParser()
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+        parser.feed(chunk)
+    return parser.close()
+
+def iter_mbox_messages(path: str, use_mmap: bool = True) -> Iterator[Tuple[int, Message]]:
+    """
+    Yield (index, message) from an mbox file, one message at a time
+
+    With use_mmap the file is memory-mapped and messages are located by
+    searching for separator lines, so multi-GB exports are never read into
+    memory at once; otherwise the file is streamed line by line.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    if not use_mmap:
+        yield from _iter_mbox_lines(path)
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:5] == b"From ":
+            start = 0
+        else:
+            separator = mm.find(MBOX_SEPARATOR)
+            if separator < 0:
+                return
+            start = separator + 1
+        view = memoryview(mm)
+        try:
+            index = 0
+            while start < len(mm):
+                separator = mm.find(MBOX_SEPARATOR, start)
+                end = len(mm) if separator < 0 else separator + 1
+                # Skip the "From sender date" envelope line
+                newline = mm.find(b"\n", start, end)
+                body_start = end if newline < 0 else newline + 1
+                yield index, parse_message_bytes(view[body_start:end])
+                index += 1
+                start = end
+        finally:
+            view.release()
+
+def _iter_mbox_lines(path: str) -> Iterator[Tuple[int, Message]]:
+    parser = None
+    index = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"From "):
+                if parser is not None:
+                    yield index, parser.close()
+                    index += 1
+                parser = BytesFeedParser()
+            elif parser is not None:
+                parser.feed(line)
+    if parser is not None:
+        yield index, parser.close()
+
+def is_maildir(path: str) -> bool:
+    return os.path.isdir(path) and all(os.path.isdir(os.path.join(path, sub)) for sub in ("cur", "new", "tmp"))
+
+def is_mbox(path: str) -> bool:
+    if not os.path.isfile(path):
+        return False
+    if path.lower().endswith(".mbox"):
+        return True
+    with open(path, "rb") as f:
+        return f.read(5) == b"From "
+
+def iter_maildir_messages(path: str) -> Iterator[Tuple[str, Message]]:
+    """
+    Yield (file path, message) for every message in a Maildir's new/ and cur/
+    """
+    paths = (
+        entry.path
+        for sub in MAILDIR_SUBDIRS
+        for entry in sorted(os.scandir(os.path.join(path, sub)), key=lambda entry: entry.name)
+        if entry.is_file() and not entry.name.startswith(".")
+    )
+    return _iter_message_files(paths)
+
+def iter_eml_messages(path: str) -> Iterator[Tuple[str, Message]]:
+    """
+    Yield (file path, message) for a .eml file or every .eml file under a directory
+    """
+    if os.path.isfile(path):
+        paths = iter([path])
+    else:
+        paths = (
+            os.path.join(root, name)
+            for root, dirs, files in os.walk(path)
+            for name in sorted(files)
+            if name.lower().endswith(EML_EXTENSIONS)
+        )
+    return _iter_message_files(paths)
+
+def _iter_message_files(paths: Iterator[str]) -> Iterator[Tuple[str, Message]]:
+    # A mail client may move or delete a file after it was listed; skip
+    # unreadable files instead of ending the whole run
+    for file_path in paths:
+        try:
+            with open(file_path, "rb") as f:
+                message = parse_message_file(f)
+        except OSError as e:
+            logger.warning(f"Skipping {file_path}: {e}")
+            continue
+        yield file_path, message
+
+def iter_mailbox(source: str, use_mmap: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream normalized email dicts from an mbox file, Maildir or .eml files
+
+    Messages go through the MIME-aware parse_email_message, so multipart
+    bodies, transfer and charset encodings and folded headers are handled.
+    Messages that fail to parse, and message files that cannot be read,
+    are logged and skipped.
+
+    Args:
+        source: mbox file, Maildir directory, .eml file or directory of .eml files
+        use_mmap: Memory-map mbox files instead of streaming them line by line
+
+    Yields:
+        (source_id, email_data) with the same fields as parse_email
+    """
+    if is_maildir(source):
+        messages = iter_maildir_messages(source)
+    elif is_mbox(source):
+        messages = ((f"{source}#{index}", message) for index, message in iter_mbox_messages(source, use_mmap))
+    elif os.path.isdir(source) or source.lower().endswith(EML_EXTENSIONS):
+        messages = iter_eml_messages(source)
+    else:
+        raise ValueError(f"{source} is not an mbox file, Maildir or .eml source")
+
+    for source_id, message in messages:
+        try:
+            yield source_id, parse_email_message(message)
+        except Exception as e:
+            logger.warning(f"Skipping {source_id}: {e}")
+
+def parse_upload_bytes(name: str, data) -> Dict[str, Any]:
+    """
+    Parse one in-memory .txt or .eml email; .eml goes through the MIME parser
+    """
+    if name.lower().endswith(EML_EXTENSIONS):
+        return parse_email_message(parse_message_bytes(data))
+    return parse_email_bytes(data)
+
+def iter_upload(name: str, data) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (source_id, email_data) from an uploaded .txt, .eml or .zip file
+
+    Zip archives are read from memory and every .txt and .eml entry is
+    parsed in turn; entries that fail to parse or exceed
+    MAX_ZIP_ENTRY_BYTES are logged and skipped. A plain file that fails to
+    parse raises.
+    """
+    if not name.lower().endswith(".zip"):
+        yield name, parse_upload_bytes(name, data)
+        return
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            source_id = f"{name}/{info.filename}"
+            if info.is_dir() or not info.filename.lower().endswith(UPLOAD_EXTENSIONS):
+                continue
+            if os.path.basename(info.filename).startswith(".") or info.file_size > MAX_ZIP_ENTRY_BYTES:
+                logger.warning(f"Skipping {source_id}")
+                continue
+            try:
+                yield source_id, parse_upload_bytes(info.filename, archive.read(info))
+            except Exception as e:
+                logger.warning(f"Skipping {source_id}: {e}")
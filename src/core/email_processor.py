@@ -1,25 +1,104 @@
 import re
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from email.header import decode_header, make_header
+from email.utils import parsedate_to_datetime
+
+# Folded header continuation: a line break followed by whitespace
+_FOLD_RE = re.compile(r"\r?\n(?=[ \t])")
 
 def parse_email(file_path):
     """
     Enhanced email parser that extracts various email headers and body
     """
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+        return parse_email_text(f.read())
+
+def parse_email_bytes(data, encoding='utf-8'):
+    """
+    Parse an email held in memory, e.g. an uploaded file's buffer
+
+    Args:
+        data: bytes, bytearray or memoryview with the raw email
+        encoding: Text encoding of the email
+
+    Returns:
+        The same dictionary structure as parse_email
+    """
+    # str() decodes any buffer directly, so a memoryview is not copied first
+    return parse_email_text(str(data, encoding))
+
+def parse_email_text(content):
+    """
+    Parse an email from a string, without touching the disk
+    """
+    if '\r' in content:
+        content = content.replace('\r\n', '\n')
+
     # Split content into headers and body
     parts = content.split('\n\n', 1)
     headers_text = parts[0] if len(parts) > 1 else ""
     body = parts[1] if len(parts) > 1 else content
     
-    # Parse headers
+    return _build_email_data(_parse_headers(headers_text), body)
+
+# One header field per match: the field name, then the value including any
+# folded continuation lines (lines starting with whitespace)
+_HEADER_RE = re.compile(r"^([!-9;-~]+)[ \t]*:[ \t]*([^\n]*(?:\n[ \t][^\n]*)*)", re.MULTILINE)
+
+def _parse_headers(headers_text):
+    """
+    Parse a header block in one regex pass, unfolding folded values
+    """
+    return {
+        name.lower(): (_FOLD_RE.sub("", value) if "\n" in value else value).strip()
+        for name, value in _HEADER_RE.findall(headers_text)
+    }
+
+def parse_email_message(message):
+    """
+    Convert an email.message.Message (e.g. from the mailbox module) into the
+    same dictionary structure returned by parse_email
+    """
     headers = {}
-    for line in headers_text.split('\n'):
-        if ':' in line:
-            key, value = line.split(':', 1)
-            headers[key.strip().lower()] = value.strip()
+    for key, value in message.items():
+        headers[key.strip().lower()] = _decode_header_value(value)
     
+    return _build_email_data(headers, _message_body(message))
+
+def _decode_header_value(value):
+    value = _FOLD_RE.sub("", str(value))
+    try:
+        return str(make_header(decode_header(value))).strip()
+    except Exception:
+        return value.strip()
+
+def _message_body(message):
+    if not message.is_multipart():
+        return _decode_payload(message)
+    
+    # Use the first inline plain-text part of a multipart message, else the
+    # first HTML part (converted to text by body_normalizer)
+    html_part = None
+    for part in message.walk():
+        if part.get_filename():
+            continue
+        if part.get_content_type() == "text/plain":
+            return _decode_payload(part)
+        if part.get_content_type() == "text/html" and html_part is None:
+            html_part = part
+    return _decode_payload(html_part) if html_part is not None else ""
+
+def _decode_payload(part):
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return part.get_payload() or ""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+def _build_email_data(headers, body):
     # Extract key information
     subject = headers.get('subject', 'Subject: Unknown')
     sender = headers.get('from', headers.get('sender', 'Unknown'))
@@ -30,32 +109,97 @@ def parse_email(file_path):
     if subject.startswith('Subject:'):
         subject = subject.replace('Subject:', '').strip()
     
-    # Try to parse date
-    parsed_date = None
-    if date != 'Unknown':
-        try:
-            # Try common date formats
-            date_formats = [
-                '%a, %d %b %Y %H:%M:%S %z',
-                '%d %b %Y %H:%M:%S %z',
-                '%Y-%m-%d %H:%M:%S',
-                '%m/%d/%Y %H:%M:%S'
-            ]
-            for fmt in date_formats:
-                try:
-                    parsed_date = datetime.strptime(date, fmt)
-                    break
-                except ValueError:
-                    continue
-        except:
-            pass
-    
     return {
         "subject": subject,
         "sender": sender,
         "recipient": recipient,
         "date": date,
-        "parsed_date": parsed_date,
+        "parsed_date": _parse_date(date),
         "email_body": body.strip(),
         "headers": headers
     }
+
+# Non-RFC 5322 formats tried when parsedate_to_datetime fails
+DATE_FORMATS = (
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%d %b %Y %H:%M:%S %z',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S'
+)
+
+# The common RFC 5322 layout, "[Mon, ]1 Jan 2024 10:00:00 +0000", parsed
+# without the general-purpose tokenizer
+_RFC_DATE_RE = re.compile(
+    r"(?:[A-Za-z]{3}, )?(\d{1,2}) ([A-Za-z]{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2}) ([+-])(\d{2})(\d{2})$"
+)
+_MONTHS = {name: number for number, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1
+)}
+_offsets = {}
+
+def _fast_rfc_date(date):
+    match = _RFC_DATE_RE.match(date)
+    if match is None:
+        raise ValueError(date)
+    day, month, year, hour, minute, second, sign, offset_hours, offset_minutes = match.groups()
+    month_number = _MONTHS.get(month.lower())
+    if month_number is None:
+        raise ValueError(date)
+    offset = sign + offset_hours + offset_minutes
+    tz = _offsets.get(offset)
+    if tz is None:
+        delta = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        tz = _offsets.setdefault(offset, timezone(-delta if sign == "-" else delta))
+    return datetime(int(year), month_number, int(day), int(hour), int(minute), int(second), tzinfo=tz)
+
+def _strptime(fmt):
+    return lambda date: datetime.strptime(date, fmt)
+
+# Date parsers in the order they are tried for an unseen date shape; the
+# ISO format goes through the much faster datetime.fromisoformat
+_DATE_PARSERS = (
+    _fast_rfc_date,
+    parsedate_to_datetime,
+    datetime.fromisoformat,
+) + tuple(_strptime(fmt) for fmt in DATE_FORMATS if fmt != '%Y-%m-%d %H:%M:%S')
+
+# Date "shape" (digits and letters collapsed) -> parser that handled it
+_parser_by_shape = {}
+MAX_DATE_SHAPES = 1024
+_SHAPE_TRANS = str.maketrans(
+    "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "9" * 10 + "a" * 52
+)
+
+def _parse_date(date):
+    """
+    Parse a Date header into a datetime, or None
+
+    RFC 5322 dates go through a precompiled fast path, then
+    email.utils.parsedate_to_datetime, and other formats through
+    DATE_FORMATS. The parser that worked is remembered per
+    date shape, so a batch of same-style dates costs one parse each instead
+    of a cascade of failed attempts.
+    """
+    if not date or date == 'Unknown':
+        return None
+    
+    shape = date.translate(_SHAPE_TRANS)
+    known = _parser_by_shape.get(shape)
+    if known is not None:
+        try:
+            return known(date)
+        except (TypeError, ValueError, IndexError):
+            pass
+    
+    for parser in _DATE_PARSERS:
+        if parser is known:
+            continue
+        try:
+            parsed = parser(date)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if len(_parser_by_shape) < MAX_DATE_SHAPES:
+            _parser_by_shape[shape] = parser
+        return parsed
+    return None
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.helpers import load_config
+from ..utils.rate_limiter import RATE_LIMIT_KEYS, get_rate_limiter
+from .langgraph_workflow import PROMPT_VERSIONS, build_email_graph, create_llm
+from .llm_client import HTTP_POOL_KEYS
+from .reply_cache import DEFAULT_CACHE_PATH, cache_replies_enabled, create_scoped_cache
+from .semantic_cache import create_semantic_cache
+
+DEFAULT_CONFIG_PATH = "config/app_config.yaml"
+
+def graph_config_key(config: Dict[str, Any]) -> Tuple:
+    """
+    Build the cache key identifying a compiled graph for a configuration
+
+    Only the settings that change the graph's behaviour take part in the key,
+    so unrelated edits (UI defaults, logging) keep the cached graph alive.
+    """
+    api_key = config.get("openai_api_key") or ""
+    return (
+        config.get("model_name", "gpt-3.5-turbo"),
+        config.get("model_temperature", 0.3),
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16],
+        config.get("analysis_mode", "separate"),
+        cache_replies_enabled(config),
+        config.get("reply_cache_path", DEFAULT_CACHE_PATH),
+        config.get("semantic_cache_enabled", False),
+        config.get("semantic_cache_threshold", 0.95),
+        config.get("semantic_cache_bands", 4),
+        tuple(sorted(PROMPT_VERSIONS.items())),
+        tuple(config.get(key) for key in HTTP_POOL_KEYS),
+        tuple(config.get(key) for key in RATE_LIMIT_KEYS),
+    )
+
+class GraphRegistry:
+    """
+    Process-wide cache of compiled email workflows
+
+    Hands out one compiled graph per configuration key and reloads the
+    configuration file only when its modification time changes.
+    """
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH):
+        self.config_path = config_path
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._graphs = {}
+        self._config = None
+        self._config_mtime = None
+        self._lock = threading.Lock()
+
+    def _current_config(self) -> Dict[str, Any]:
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if self._config is None or mtime != self._config_mtime:
+            self._config = load_config(self.config_path)
+            self._config_mtime = mtime
+            self.reloads += 1
+
+            # Drop graphs built for settings that are no longer active
+            current_key = graph_config_key(self._config)
+            self._graphs = {key: entry for key, entry in self._graphs.items() if key == current_key}
+
+        return self._config
+
+    def get_config(self) -> Dict[str, Any]:
+        """
+        Return the configuration the registry currently builds graphs from
+        """
+        with self._lock:
+            return self._current_config()
+
+    def get_pipeline(self) -> Tuple[Any, Any]:
+        """
+        Return (compiled graph, scoped reply cache or None) for the current
+        configuration, building them on first use
+        """
+        with self._lock:
+            config = self._current_config()
+            key = graph_config_key(config)
+            entry = self._graphs.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            cache = create_scoped_cache(config)
+            graph = build_email_graph(
+                llm_client=create_llm(config),
+                analysis_mode=config.get("analysis_mode", "separate"),
+                cache=cache,
+                semantic_cache=create_semantic_cache(config),
+                rate_limiter=get_rate_limiter(config)
+            )
+            self._graphs[key] = (graph, cache)
+            return graph, cache
+
+    def get_graph(self):
+        """
+        Return the compiled graph for the current configuration, building it on first use
+        """
+        return self.get_pipeline()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return cache counters for monitoring
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "cached_graphs": len(self._graphs),
+            }
+
+    def clear(self) -> None:
+        """
+        Forget all compiled graphs and force the configuration to be reloaded
+        """
+        with self._lock:
+            self._graphs.clear()
+            self._config = None
+            self._config_mtime = None
+
+_default_registry: Optional[GraphRegistry] = None
+_default_registry_lock = threading.Lock()
+
+def get_graph_registry() -> GraphRegistry:
+    """
+    Return the shared registry used by the reply service
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = GraphRegistry()
+        return _default_registry
+
+def get_email_graph():
+    """
+    Return the shared compiled email graph for the current configuration
+    """
+    return get_graph_registry().get_graph()
+
+def get_email_pipeline():
+    """
+    Return the shared (compiled graph, reply cache or None) for the current configuration
+    """
+    return get_graph_registry().get_pipeline()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .job_scheduler import LANE_RANK, scheduled_lane
+from ..utils.helpers import load_config_or_defaults
+
+DEFAULT_QUEUE_PATH = "data/queue/jobs.sqlite"
+
+# Job states; a running job whose lease expired is claimable again
+JOB_STATES = ("queued", "running", "done", "failed")
+
+def idempotency_key(email_data: Dict[str, Any]) -> str:
+    """
+    Key identifying an email across re-deliveries and re-imports
+
+    The Message-ID header when present, else a hash of sender, date,
+    subject and body.
+    """
+    message_id = (email_data.get("headers") or {}).get("message-id")
+    if message_id:
+        return message_id.strip()
+    digest = hashlib.sha256()
+    for field in ("sender", "date", "subject", "email_body"):
+        digest.update(str(email_data.get(field, "")).encode("utf-8"))
+        digest.update(b"\0")
+    return "sha256:" + digest.hexdigest()
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobQueue:
+    """
+    Durable SQLite job queue with visibility timeouts
+
+    A claimed job is leased to one worker for the visibility timeout; if the
+    worker dies without completing or failing it, the lease expires and
+    another worker picks the job up again (at-least-once delivery). Jobs are
+    keyed by Message-ID so re-enqueueing the same email is a no-op, failed
+    attempts are retried with exponential backoff up to max_attempts, and
+    urgent emails are claimed before bulk ones. Safe to share between
+    threads and processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_attempts: int = 5,
+                 visibility_timeout: float = 300.0, retry_delay: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY, idempotency_key TEXT NOT NULL UNIQUE, payload TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, lease_expires REAL, worker TEXT, "
+                "last_error TEXT, result TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, available_at, id)")
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, email_data: Dict[str, Any], key: Optional[str] = None) -> Tuple[int, bool]:
+        """
+        Add an email unless a job with the same idempotency key exists
+
+        Returns:
+            (job id, True if a new job was created)
+        """
+        key = key or idempotency_key(email_data)
+        now = time.time()
+        payload = json.dumps(email_data, ensure_ascii=False, default=str)
+        # Same triage as the in-process scheduler, scheduler_urgent_keywords included
+        priority = LANE_RANK[scheduled_lane(email_data)]
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO jobs (idempotency_key, payload, priority, status, max_attempts, available_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?, ?) "
+                "ON CONFLICT (idempotency_key) DO NOTHING",
+                (key, payload, priority, self.max_attempts, now, now, now)
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid, True
+            return conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()[0], False
+
+    def claim(self, worker: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next due job to a worker
+
+        Returns:
+            {"id", "key", "attempts", "email_data"}, or None when nothing is due
+        """
+        worker = worker or worker_id()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs abandoned by crashed workers on their last attempt are dead
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', last_error = 'lease expired', lease_expires = NULL, "
+                    "updated_at = ? WHERE status = 'running' AND lease_expires <= ? AND attempts >= max_attempts",
+                    (now, now)
+                )
+                row = conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires = ?, worker = ?, "
+                    "updated_at = ? WHERE id = ("
+                    "SELECT id FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND lease_expires <= ?) ORDER BY priority, id LIMIT 1"
+                    ") RETURNING id, idempotency_key, attempts, payload",
+                    (now + self.visibility_timeout, worker, now, now, now)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "key": row[1], "attempts": row[2], "email_data": json.loads(row[3])}
+
+    def _update_owned(self, sql: str, params: tuple) -> bool:
+        with self._lock:
+            return self._connection().execute(sql, params).rowcount > 0
+
+    def heartbeat(self, job_id: int, worker: Optional[str] = None) -> bool:
+        """
+        Extend a running job's lease; False if the lease was lost
+        """
+        now = time.time()
+        return self._update_owned(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+            (now + self.visibility_timeout, now, job_id, worker or worker_id())
+        )
+
+    def complete(self, job_id: int, result: Optional[Dict[str, Any]] = None, worker: Optional[str] = None) -> bool:
+        """
+        Mark a job done and store its result
+        """
+        return self._update_owned(
+            "UPDATE jobs SET status = 'done', lease_expires = NULL, last_error = NULL, result = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, worker or worker_id())
+        )
+
+    def fail(self, job_id: int, error: str, worker: Optional[str] = None) -> bool:
+        """
+        Record a failed attempt; retried with backoff until max_attempts
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND worker = ?",
+                (job_id, worker or worker_id())
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_expires = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            else:
+                delay = self.retry_delay * (2 ** (attempts - 1))
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', lease_expires = NULL, last_error = ?, available_at = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (error, now + delay, now, job_id)
+                )
+            return True
+
+    def retry_failed(self) -> int:
+        """
+        Give every dead job a fresh set of attempts
+        """
+        now = time.time()
+        with self._lock:
+            return self._connection().execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'failed'",
+                (now, now)
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of jobs in each state
+        """
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update(dict(rows))
+        return counts
+
+def get_job_queue(config: Optional[Dict[str, Any]] = None) -> JobQueue:
+    """
+    Open the job queue described by the configuration
+    """
+    if config is None:
+        config = load_config_or_defaults()
+    return JobQueue(
+        config.get("job_queue_path", DEFAULT_QUEUE_PATH),
+        max_attempts=int(config.get("job_max_attempts", 5)),
+        visibility_timeout=float(config.get("job_visibility_timeout_seconds", 300)),
+        retry_delay=float(config.get("job_retry_delay_seconds", 30))
+    )
@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import itertools
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+from ..utils.helpers import load_config_or_defaults
+
+# Lanes in priority order. Interactive requests (the web UI, the CLI) go
+# first, then urgent and bulk backlog; bulk jobs that miss their deadline
+# are deferred behind everything else instead of being dropped.
+LANES = ("interactive", "urgent", "bulk", "deferred")
+LANE_RANK = {lane: rank for rank, lane in enumerate(LANES)}
+
+# Lanes whose jobs are dropped when their deadline passes while queued
+DROP_ON_DEADLINE = ("interactive", "urgent")
+
+# Words that mark an email as urgent (billing and support traffic) before it
+# has been classified
+DEFAULT_URGENT_KEYWORDS = (
+    "billing", "invoice", "refund", "charge", "charged", "payment", "overdue",
+    "support", "error", "broken", "outage", "down", "urgent", "asap", "cannot", "can't",
+)
+
+class QueueFull(RuntimeError):
+    """Raised when a lane already holds its maximum number of waiting jobs"""
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a job's deadline passes before it is admitted"""
+
+def urgent_pattern(keywords: Iterable[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(word) for word in keywords) + r")\b", re.IGNORECASE)
+
+_DEFAULT_URGENT_RE = urgent_pattern(DEFAULT_URGENT_KEYWORDS)
+
+def triage_lane(email_data: Dict[str, Any], pattern: re.Pattern = _DEFAULT_URGENT_RE) -> str:
+    """
+    Pick "urgent" or "bulk" for a backlog email from its subject and opening
+
+    A keyword scan stands in for the category, which is only known after
+    the email has gone through the pipeline.
+    """
+    text = f"{email_data.get('subject') or ''}\n{(email_data.get('email_body') or '')[:2000]}"
+    return "urgent" if pattern.search(text) else "bulk"
+
+class _Waiter:
+    __slots__ = ("lane", "deadline", "seq", "event", "future", "loop", "granted", "cancelled")
+
+    def __init__(self, lane, deadline, seq, loop=None):
+        self.lane = lane
+        self.deadline = deadline
+        self.seq = seq
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+        self.cancelled = False
+
+    def key(self):
+        # Earliest deadline first within a lane, then arrival order
+        return (LANE_RANK[self.lane], self.deadline if self.deadline is not None else float("inf"), self.seq)
+
+    def __lt__(self, other):
+        return self.key() < other.key()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class JobScheduler:
+    """
+    Priority admission control in front of the reply pipeline
+
+    At most max_concurrency jobs run at once; the rest wait in priority
+    lanes and are admitted interactive first, then urgent, bulk and
+    deferred, earliest deadline first within a lane. Each lane holds at
+    most max_queue waiting jobs, beyond which QueueFull is raised so
+    callers can shed or slow down. Jobs whose deadline passes while queued
+    are dropped with DeadlineExceeded (interactive and urgent lanes) or
+    moved to the deferred lane (bulk). Serves both threads (slot) and
+    coroutines (aslot) from any event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 200):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._queued = {lane: 0 for lane in LANES}
+        self.admitted = {lane: 0 for lane in LANES}
+        self.dropped = 0
+        self.deferred = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    # Queue bookkeeping; callers hold self._lock
+
+    def _try_admit(self, lane: str, deadline: Optional[float], loop=None) -> Optional[_Waiter]:
+        """Queue a job; None when it was admitted straight away"""
+        if lane not in LANE_RANK:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        if self._running >= self.max_concurrency and self._queued[lane] >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(f"The {lane} queue is full ({self.max_queue} waiting jobs)")
+        waiter = _Waiter(lane, deadline, next(self._seq), loop)
+        self._push(waiter)
+        self._grant_next()
+        return None if waiter.granted else waiter
+
+    def _push(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._heap, waiter)
+        self._queued[waiter.lane] += 1
+
+    def _expire(self, waiter: _Waiter) -> Optional[_Waiter]:
+        """Handle a missed deadline: None when dropped, else the deferred waiter"""
+        waiter.cancelled = True
+        self._queued[waiter.lane] -= 1
+        if waiter.lane in DROP_ON_DEADLINE:
+            self.dropped += 1
+            return None
+        self.deferred += 1
+        replacement = _Waiter("deferred", None, next(self._seq), waiter.loop)
+        self._push(replacement)
+        return replacement
+
+    def _grant_next(self) -> None:
+        while self._heap and self._running < self.max_concurrency:
+            waiter = heapq.heappop(self._heap)
+            if waiter.cancelled:
+                continue
+            self._queued[waiter.lane] -= 1
+            waiter.granted = True
+            self._running += 1
+            self.admitted[waiter.lane] += 1
+            waiter.wake()
+
+    def release(self) -> None:
+        with self._lock:
+            self._running -= 1
+            self._grant_next()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        # The caller gave up (error or cancellation) while queued or just granted
+        with self._lock:
+            if waiter.granted:
+                self._running -= 1
+                self._grant_next()
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                self._queued[waiter.lane] -= 1
+
+    def acquire(self, lane: str = "bulk", deadline: Optional[float] = None) -> None:
+        """
+        Block until the job may run
+
+        Args:
+            lane: One of LANES
+            deadline: Absolute time.monotonic() by which the job must start
+
+        Raises:
+            QueueFull: The lane is at its queue limit
+            DeadlineExceeded: The deadline passed while queued (dropping lanes)
+        """
+        started = time.monotonic()
+        with self._lock:
+            waiter = self._try_admit(lane, deadline)
+        try:
+            while waiter is not None:
+                timeout = None if waiter.deadline is None else max(waiter.deadline - time.monotonic(), 0)
+                if waiter.event.wait(timeout):
+                    break
+                with self._lock:
+                    if waiter.granted:
+                        break
+                    waiter = self._expire(waiter)
+                if waiter is None:
+                    raise DeadlineExceeded(f"Job in the {lane} lane missed its deadline")
+        except BaseException:
+            if waiter is not None:
+                self._abandon(waiter)
+            raise
+        self._record_wait(started)
+
+    async def aacquire(self, lane: str = "bulk", deadline: Optional[float] = None) -> None:
+        """
+        Coroutine counterpart of acquire; waits without blocking the event loop
+        """
+        started = time.monotonic()
+        with self._lock:
+            waiter = self._try_admit(lane, deadline, asyncio.get_running_loop())
+        try:
+            while waiter is not None:
+                timeout = None if waiter.deadline is None else max(waiter.deadline - time.monotonic(), 0)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    if waiter.granted:
+                        break
+                    waiter = self._expire(waiter)
+                if waiter is None:
+                    raise DeadlineExceeded(f"Job in the {lane} lane missed its deadline")
+        except BaseException:
+            if waiter is not None:
+                self._abandon(waiter)
+            raise
+        self._record_wait(started)
+
+    def _record_wait(self, started: float) -> None:
+        with self._lock:
+            self.wait_seconds += time.monotonic() - started
+
+    @contextmanager
+    def slot(self, lane: str = "bulk", timeout: Optional[float] = None):
+        """
+        Run the body of a with-block once admitted; timeout is seconds from now
+        """
+        self.acquire(lane, _deadline(timeout))
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, lane: str = "bulk", timeout: Optional[float] = None):
+        await self.aacquire(lane, _deadline(timeout))
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Backpressure signals: running and queued jobs per lane, how full the
+        fullest lane is, and admitted, dropped, deferred and rejected counts
+        """
+        with self._lock:
+            queued = dict(self._queued)
+            return {
+                "running": self._running,
+                "max_concurrency": self.max_concurrency,
+                "queued": queued,
+                "pressure": max(queued.values()) / self.max_queue if self.max_queue else 0.0,
+                "saturated": self._running >= self.max_concurrency,
+                "admitted": dict(self.admitted),
+                "dropped": self.dropped,
+                "deferred": self.deferred,
+                "rejected": self.rejected,
+                "wait_seconds": self.wait_seconds,
+            }
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    return None if timeout is None else time.monotonic() + timeout
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_urgent_re = _DEFAULT_URGENT_RE
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    Return the process-wide scheduler sized from the configuration
+    """
+    global _scheduler, _urgent_re
+    with _scheduler_lock:
+        if _scheduler is None:
+            config = load_config_or_defaults()
+            _scheduler = JobScheduler(
+                max_concurrency=int(config.get("scheduler_max_concurrency", 8)),
+                max_queue=int(config.get("scheduler_max_queue", 200))
+            )
+            keywords = config.get("scheduler_urgent_keywords")
+            if keywords:
+                _urgent_re = urgent_pattern(keywords)
+        return _scheduler
+
+def scheduled_lane(email_data: Dict[str, Any], lane: Optional[str] = None) -> str:
+    """
+    The lane for a job: the caller's choice, else keyword triage
+    """
+    if lane is not None:
+        if lane not in LANE_RANK:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        return lane
+    get_job_scheduler()
+    return triage_lane(email_data, _urgent_re)
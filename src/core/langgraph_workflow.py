@@ -1,24 +1,49 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from ..utils.helpers import load_config, safe_api_call
+from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Dict, Any
+from ..utils.helpers import load_config, safe_api_call, safe_api_call_async
+from .llm_client import llm_client_kwargs
+from functools import partial
 import json
+import operator
+import re
 
 # Load config
 config = load_config()
 api_key = config["openai_api_key"]
 temperature = config.get("model_temperature", 0.3)
 
+# Reducers used when parallel branches update the state in the same step
+def keep_latest(current: Any, update: Any) -> Any:
+    return update if update is not None else current
+
+def merge_entities(current: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = dict(current or {})
+    merged.update(update or {})
+    return merged
+
 # Updated state model to support nested dictionaries in entities
 class EmailState(BaseModel):
     email_body: str
-    category: Optional[str] = None
-    intent: Optional[str] = None
-    entities: Optional[Dict[str, Any]] = None  # ✅ Now allows nested dicts
+    category: Annotated[Optional[str], keep_latest] = None
+    intent: Annotated[Optional[str], keep_latest] = None
+    entities: Annotated[Optional[Dict[str, Any]], merge_entities] = None  # ✅ Now allows nested dicts
     reply: Optional[str] = None
+    degraded: Annotated[bool, operator.or_] = False  # True when any node fell back to a default
+
+# Bump the matching version whenever a prompt's wording changes so that
+# compiled graphs and cached results keyed on it are rebuilt
+PROMPT_VERSIONS = {
+    "classification": "1",
+    "extraction": "1",
+    "reply": "1",
+    "analysis": "1",
+}
+
+ANALYSIS_MODES = ("separate", "fused")
 
 # Prompt to classify emails
 classification_prompt = ChatPromptTemplate.from_messages([
@@ -32,74 +57,273 @@ extraction_prompt = ChatPromptTemplate.from_messages([
     ("human", "{email_body}")
 ])
 
+# Prompt to classify and extract in a single structured call ("fused" analysis mode)
+analysis_prompt = ChatPromptTemplate.from_messages([
+    ("system", "Analyze the following email. Classify it as one of the following: support, schedule, billing, feedback, or other. Also extract its intent and key named entities (e.g., names, dates, times)."),
+    ("human", "{email_body}")
+])
+
+# Structured output schema for the fused analysis call
+class EmailAnalysis(BaseModel):
+    category: str = Field(description="One of: support, schedule, billing, feedback, other")
+    intent: str = Field(description="Short snake_case description of what the sender wants")
+    entities: Dict[str, Any] = Field(default_factory=dict, description="Key named entities such as names, dates and times")
+
 # Prompt to generate reply
 reply_prompt = ChatPromptTemplate.from_messages([
     ("system", "You are a helpful assistant replying to a {category} email with the intent of {intent}. Use this context: {entities}"),
     ("human", "{email_body}")
 ])
 
+def create_llm(config: Dict[str, Any]) -> ChatOpenAI:
+    """
+    Create the chat model described by a loaded configuration
+
+    Every model shares the process-wide HTTP connection pool for its
+    configured pool settings, for both sync and async calls.
+    """
+    return ChatOpenAI(
+        api_key=config["openai_api_key"],
+        model=config.get("model_name", "gpt-3.5-turbo"),
+        temperature=config.get("model_temperature", 0.3),
+        **llm_client_kwargs(config)
+    )
+
 # LLM initialization
-llm = ChatOpenAI(api_key=api_key, temperature=temperature)
+llm = create_llm(config)
+
+# Nodes return only the fields they own so that classification and
+# extraction can run as parallel branches and be merged by the reducers.
+# Results are stored in the optional stage cache unless a fallback was used,
+# in which case the update is flagged as degraded and never cached.
+
+def _cache_get(cache, stage: str, state: EmailState, *extra) -> Optional[Dict[str, Any]]:
+    return cache.get(stage, state.email_body, *extra) if cache is not None else None
+
+def _cache_put(cache, stage: str, state: EmailState, update: Dict[str, Any], *extra) -> Dict[str, Any]:
+    if cache is not None:
+        cache.put(stage, state.email_body, update, *extra)
+    return update
+
+def _reply_cache_inputs(state: EmailState) -> tuple:
+    return (state.category, state.intent, state.entities)
+
+def _call_llm(func, prompt, limiter=None):
+    # Every attempt, retries included, waits for rate-limit budget
+    if limiter is None:
+        return safe_api_call(func, prompt)
+    return safe_api_call(limiter.call, func, prompt)
+
+async def _acall_llm(func, prompt, limiter=None):
+    if limiter is None:
+        return await safe_api_call_async(func, prompt)
+    return await safe_api_call_async(limiter.acall, func, prompt)
 
 # Node 1: classify
-def classify_email(state: EmailState) -> EmailState:
+def classify_email(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "classification", state)
+    if cached is not None:
+        return cached
+
+    llm_client = llm_client or llm
     try:
-        result = safe_api_call(llm.invoke, classification_prompt.format(email_body=state.email_body))
-        return EmailState(email_body=state.email_body, category=result.content.strip())
+        result = _call_llm(llm_client.invoke, classification_prompt.format(email_body=state.email_body), limiter)
     except Exception as e:
         # Fallback to a default category if classification fails
-        return EmailState(email_body=state.email_body, category="other")
+        return {"category": "other", "degraded": True}
+    return _cache_put(cache, "classification", state, {"category": result.content.strip()})
+
+async def aclassify_email(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "classification", state)
+    if cached is not None:
+        return cached
+
+    llm_client = llm_client or llm
+    try:
+        result = await _acall_llm(llm_client.ainvoke, classification_prompt.format(email_body=state.email_body), limiter)
+    except Exception as e:
+        return {"category": "other", "degraded": True}
+    return _cache_put(cache, "classification", state, {"category": result.content.strip()})
+
+# Fallback values if the API call fails
+EXTRACTION_FALLBACK = {"intent": "unknown", "entities": {}, "degraded": True}
+
+# Models often wrap JSON answers in ```json ... ``` fences
+_CODE_FENCE_RE = re.compile(r"^\s*```[\w-]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+
+def _extraction_update(content: str, cache, state: EmailState) -> Dict[str, Any]:
+    fenced = _CODE_FENCE_RE.match(content)
+    try:
+        parsed = json.loads(fenced.group(1) if fenced else content)
+    except json.JSONDecodeError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        # The model answered, just not with usable JSON: reply without
+        # extracted details, but neither degrade the result nor cache it
+        return {"intent": "unknown", "entities": {}}
+    update = {
+        "intent": parsed.get("intent", "unknown"),
+        "entities": parsed.get("entities", {})
+    }
+    return _cache_put(cache, "extraction", state, update)
 
 # Node 2: extract intent + entities
-def extract_entities_intent(state: EmailState) -> EmailState:
+def extract_entities_intent(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "extraction", state)
+    if cached is not None:
+        return cached
+
+    llm_client = llm_client or llm
+    try:
+        result = _call_llm(llm_client.invoke, extraction_prompt.format(email_body=state.email_body), limiter)
+    except Exception as e:
+        return dict(EXTRACTION_FALLBACK)
+    return _extraction_update(result.content, cache, state)
+
+async def aextract_entities_intent(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "extraction", state)
+    if cached is not None:
+        return cached
+
+    llm_client = llm_client or llm
     try:
-        result = safe_api_call(llm.invoke, extraction_prompt.format(email_body=state.email_body))
-        try:
-            parsed = json.loads(result.content)
-        except json.JSONDecodeError:
-            # Fallback parsing if JSON is malformed
-            parsed = {"intent": "unknown", "entities": {}}
+        result = await _acall_llm(llm_client.ainvoke, extraction_prompt.format(email_body=state.email_body), limiter)
     except Exception as e:
-        # Fallback values if API call fails
-        parsed = {"intent": "unknown", "entities": {}}
-    
-    return EmailState(
+        return dict(EXTRACTION_FALLBACK)
+    return _extraction_update(result.content, cache, state)
+
+def _format_reply_prompt(state: EmailState) -> str:
+    return reply_prompt.format(
         email_body=state.email_body,
         category=state.category,
-        intent=parsed.get("intent", "unknown"),
-        entities=parsed.get("entities", {})
+        intent=state.intent,
+        entities=state.entities
     )
 
+def _fallback_reply(state: EmailState) -> Dict[str, Any]:
+    return {
+        "reply": f"I apologize, but I'm unable to generate a proper reply at the moment. Please contact support for assistance with your {state.category} inquiry.",
+        "degraded": True
+    }
+
+def _reuse_reply(cache, semantic_cache, state: EmailState) -> Optional[Dict[str, Any]]:
+    # Exact stage entry first, then a near-duplicate email of the same category
+    cached = _cache_get(cache, "reply", state, *_reply_cache_inputs(state))
+    if cached is not None:
+        return cached
+    if semantic_cache is not None and not state.degraded:
+        reply_content = semantic_cache.lookup(state.email_body, state.category)
+        if reply_content is not None:
+            return {"reply": reply_content}
+    return None
+
+def _remember_reply(cache, semantic_cache, state: EmailState, reply_content: str) -> Dict[str, Any]:
+    if semantic_cache is not None and not state.degraded:
+        semantic_cache.add(state.email_body, state.category, reply_content)
+    return _cache_put(cache, "reply", state, {"reply": reply_content}, *_reply_cache_inputs(state))
+
 # Node 3: generate reply
-def generate_reply(state: EmailState) -> EmailState:
+def generate_reply(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, semantic_cache=None, limiter=None) -> Dict[str, Any]:
+    reused = _reuse_reply(cache, semantic_cache, state)
+    if reused is not None:
+        return reused
+
+    llm_client = llm_client or llm
     try:
-        result = safe_api_call(llm.invoke, reply_prompt.format(
-            email_body=state.email_body,
-            category=state.category,
-            intent=state.intent,
-            entities=state.entities
-        ))
-        reply_content = result.content.strip()
+        result = _call_llm(llm_client.invoke, _format_reply_prompt(state), limiter)
     except Exception as e:
         # Fallback reply if generation fails
-        reply_content = f"I apologize, but I'm unable to generate a proper reply at the moment. Please contact support for assistance with your {state.category} inquiry."
-    
-    return EmailState(
-        email_body=state.email_body,
-        category=state.category,
-        intent=state.intent,
-        entities=state.entities,
-        reply=reply_content
-    )
+        return _fallback_reply(state)
+    return _remember_reply(cache, semantic_cache, state, result.content.strip())
+
+async def agenerate_reply(state: EmailState, llm_client: Optional[ChatOpenAI] = None, cache=None, semantic_cache=None, limiter=None) -> Dict[str, Any]:
+    reused = _reuse_reply(cache, semantic_cache, state)
+    if reused is not None:
+        return reused
+
+    llm_client = llm_client or llm
+    try:
+        result = await _acall_llm(llm_client.ainvoke, _format_reply_prompt(state), limiter)
+    except Exception as e:
+        return _fallback_reply(state)
+    return _remember_reply(cache, semantic_cache, state, result.content.strip())
+
+# Same fallbacks as the separate classification and extraction nodes
+ANALYSIS_FALLBACK = {"category": "other", "intent": "unknown", "entities": {}, "degraded": True}
+
+# Node 1+2 (fused analysis mode): classify and extract with one structured call
+def analyze_email(state: EmailState, analyzer, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "analysis", state)
+    if cached is not None:
+        return cached
+
+    try:
+        analysis = _call_llm(analyzer.invoke, analysis_prompt.format(email_body=state.email_body), limiter)
+    except Exception as e:
+        return dict(ANALYSIS_FALLBACK)
+    return _cache_put(cache, "analysis", state, analysis.model_dump())
+
+async def aanalyze_email(state: EmailState, analyzer, cache=None, limiter=None) -> Dict[str, Any]:
+    cached = _cache_get(cache, "analysis", state)
+    if cached is not None:
+        return cached
+
+    try:
+        analysis = await _acall_llm(analyzer.ainvoke, analysis_prompt.format(email_body=state.email_body), limiter)
+    except Exception as e:
+        return dict(ANALYSIS_FALLBACK)
+    return _cache_put(cache, "analysis", state, analysis.model_dump())
+
+def _node(func, afunc, **bound) -> RunnableLambda:
+    # One runnable serves both graph.invoke (func) and graph.ainvoke (afunc)
+    return RunnableLambda(partial(func, **bound), afunc=partial(afunc, **bound))
 
 # Build LangGraph
-def build_email_graph():
+def build_email_graph(llm_client: Optional[ChatOpenAI] = None, analysis_mode: str = "separate", cache=None, semantic_cache=None,
+                      rate_limiter=None):
+    """
+    Build and compile the email workflow
+
+    In "separate" mode classification and intent/entity extraction both
+    depend only on the email body, so they fan out from the entry point and
+    join before reply generation. In "fused" mode a single structured-output
+    call covers category, intent and entities, so the graph has two nodes.
+    The compiled graph supports both invoke and ainvoke; the async path
+    runs every node through ainvoke so one event loop can keep many
+    emails in flight.
+
+    Args:
+        llm_client: Chat model used by every node; defaults to the module-level client
+        analysis_mode: "separate" (three nodes) or "fused" (two nodes)
+        cache: Optional ScopedReplyCache giving each stage its own cache entries
+        semantic_cache: Optional SemanticReplyCache reusing replies of near-duplicate emails
+        rate_limiter: Optional TokenBucketLimiter every LLM call waits on
+
+    Returns:
+        The compiled LangGraph workflow
+    """
+    if analysis_mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis_mode {analysis_mode!r}; expected one of {ANALYSIS_MODES}")
+
+    llm_client = llm_client or llm
     graph = StateGraph(EmailState)
-    graph.add_node("classify_email", RunnableLambda(classify_email))
-    graph.add_node("extract_entities_intent", RunnableLambda(extract_entities_intent))
-    graph.add_node("generate_reply", RunnableLambda(generate_reply))
-    graph.set_entry_point("classify_email")
-    graph.add_edge("classify_email", "extract_entities_intent")
-    graph.add_edge("extract_entities_intent", "generate_reply")
-    graph.set_finish_point("generate_reply")
+    graph.add_node("generate_reply", _node(
+        generate_reply, agenerate_reply, llm_client=llm_client, cache=cache, semantic_cache=semantic_cache,
+        limiter=rate_limiter
+    ))
+
+    if analysis_mode == "fused":
+        # Function calling works across chat models, unlike strict JSON-schema mode
+        analyzer = llm_client.with_structured_output(EmailAnalysis, method="function_calling")
+        graph.add_node("analyze_email", _node(analyze_email, aanalyze_email, analyzer=analyzer, cache=cache, limiter=rate_limiter))
+        graph.add_edge(START, "analyze_email")
+        graph.add_edge("analyze_email", "generate_reply")
+    else:
+        graph.add_node("classify_email", _node(classify_email, aclassify_email, llm_client=llm_client, cache=cache, limiter=rate_limiter))
+        graph.add_node("extract_entities_intent", _node(extract_entities_intent, aextract_entities_intent, llm_client=llm_client, cache=cache, limiter=rate_limiter))
+        graph.add_edge(START, "classify_email")
+        graph.add_edge(START, "extract_entities_intent")
+        graph.add_edge(["classify_email", "extract_entities_intent"], "generate_reply")
+
+    graph.add_edge("generate_reply", END)
     return graph.compile()
@@ -0,0 +1,238 @@
+import asyncio
+import concurrent.futures
+import importlib.util
+import logging
+import threading
+from typing import Any, Coroutine, Dict, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Pool defaults, overridable with the http_* keys in app_config.yaml
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_TIMEOUT = 60.0
+
+def http2_available() -> bool:
+    """
+    Whether the optional h2 package needed for HTTP/2 is installed
+    """
+    return importlib.util.find_spec("h2") is not None
+
+# Config keys that shape the shared pool
+HTTP_POOL_KEYS = (
+    "http_max_connections",
+    "http_max_keepalive_connections",
+    "http_keepalive_expiry_seconds",
+    "http_connect_timeout_seconds",
+    "http_timeout_seconds",
+    "http2_enabled",
+)
+
+def http_pool_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the connection pool settings from a loaded configuration
+
+    HTTP/2 is only enabled when requested and the h2 package is installed;
+    otherwise the pool falls back to HTTP/1.1 keep-alive.
+    """
+    http2 = bool(config.get("http2_enabled", False))
+    if http2 and not http2_available():
+        logger.warning("http2_enabled is set but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    return {
+        "max_connections": int(config.get("http_max_connections", DEFAULT_MAX_CONNECTIONS)),
+        "max_keepalive_connections": int(config.get("http_max_keepalive_connections", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+        "keepalive_expiry": float(config.get("http_keepalive_expiry_seconds", DEFAULT_KEEPALIVE_EXPIRY)),
+        "connect_timeout": float(config.get("http_connect_timeout_seconds", DEFAULT_CONNECT_TIMEOUT)),
+        "timeout": float(config.get("http_timeout_seconds", DEFAULT_TIMEOUT)),
+        "http2": http2,
+    }
+
+def _timeout(settings: Dict[str, Any]) -> httpx.Timeout:
+    return httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"])
+
+class PoolMetrics:
+    """
+    Request and connection counters for one shared pool
+
+    Uses httpcore's trace extension: a request opens a new connection when
+    it reports connect_tcp, and stops waiting for a connection once it
+    starts sending its headers.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def _event(self, name: str, state: Dict[str, bool]) -> None:
+        with self._lock:
+            if name == "connection.connect_tcp.started":
+                self.connections_opened += 1
+            elif name.endswith("send_request_headers.started") and not state["assigned"]:
+                state["assigned"] = True
+                self.waiting -= 1
+
+    def start(self) -> Dict[str, bool]:
+        with self._lock:
+            self.requests += 1
+            self.waiting += 1
+        return {"assigned": False}
+
+    def finish(self, state: Dict[str, bool]) -> None:
+        # Requests that failed before reaching a connection stop waiting too
+        with self._lock:
+            if not state["assigned"]:
+                state["assigned"] = True
+                self.waiting -= 1
+
+    def trace(self, state: Dict[str, bool]):
+        def trace(name, info):
+            self._event(name, state)
+        return trace
+
+    def atrace(self, state: Dict[str, bool]):
+        async def trace(name, info):
+            self._event(name, state)
+        return trace
+
+class _MeteredTransport(httpx.HTTPTransport):
+    def __init__(self, metrics: PoolMetrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        state = self.metrics.start()
+        request.extensions = {**request.extensions, "trace": self.metrics.trace(state)}
+        try:
+            return super().handle_request(request)
+        finally:
+            self.metrics.finish(state)
+
+class _AsyncMeteredTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, metrics: PoolMetrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = self.metrics.start()
+        request.extensions = {**request.extensions, "trace": self.metrics.atrace(state)}
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.metrics.finish(state)
+
+def _pool_connections(transport) -> list:
+    pool = getattr(transport, "_pool", None)
+    return list(getattr(pool, "connections", []))
+
+class SharedHttpClients:
+    """
+    One tuned sync and async httpx client pair shared by every LLM call
+
+    Both clients use the same limits, keep-alive, timeouts and HTTP/2
+    setting and report into the same PoolMetrics.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.metrics = PoolMetrics()
+        limits = httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"]
+        )
+        self._transport = _MeteredTransport(self.metrics, limits=limits, http2=settings["http2"])
+        self._async_transport = _AsyncMeteredTransport(self.metrics, limits=limits, http2=settings["http2"])
+        self.client = httpx.Client(transport=self._transport, timeout=_timeout(settings))
+        self.async_client = httpx.AsyncClient(transport=self._async_transport, timeout=_timeout(settings))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the pool: connections open and idle, requests served on
+        reused connections and requests waiting for a connection
+        """
+        connections = _pool_connections(self._transport) + _pool_connections(self._async_transport)
+        with self.metrics._lock:
+            requests = self.metrics.requests
+            opened = self.metrics.connections_opened
+            waiting = self.metrics.waiting
+        return {
+            "requests": requests,
+            "connections_opened": opened,
+            "connections_open": len(connections),
+            "connections_idle": sum(1 for connection in connections if connection.is_idle()),
+            "reused": max(requests - opened, 0),
+            "waiting": max(waiting, 0),
+            "http2": self.settings["http2"],
+        }
+
+_clients: Dict[Tuple, SharedHttpClients] = {}
+_clients_lock = threading.Lock()
+
+def get_http_clients(config: Dict[str, Any]) -> SharedHttpClients:
+    """
+    Return the shared clients for the configured pool settings
+    """
+    settings = http_pool_settings(config)
+    key = tuple(sorted(settings.items()))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = SharedHttpClients(settings)
+        return _clients[key]
+
+def http_pool_stats() -> Dict[str, Any]:
+    """
+    Pool metrics summed over every shared client pair in this process
+    """
+    totals = {"requests": 0, "connections_opened": 0, "connections_open": 0,
+              "connections_idle": 0, "reused": 0, "waiting": 0}
+    with _clients_lock:
+        clients = list(_clients.values())
+    for shared in clients:
+        for name, value in shared.stats().items():
+            if name in totals:
+                totals[name] += value
+    return totals
+
+def llm_client_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keyword arguments that make a ChatOpenAI model use the shared pool
+    """
+    shared = get_http_clients(config)
+    return {
+        "http_client": shared.client,
+        "http_async_client": shared.async_client,
+        "timeout": _timeout(shared.settings),
+    }
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def shared_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the process-wide event loop, running in a daemon thread
+
+    Connections kept alive by the shared async client belong to the loop
+    that opened them, so a second asyncio.run() in the same process would
+    reuse connections of a closed loop. Long-lived processes that start
+    several async batches (the web UI) run them all on this loop instead.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="shared-event-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+def run_on_shared_loop(coro: Coroutine) -> concurrent.futures.Future:
+    """
+    Schedule a coroutine on the shared event loop from any thread
+    """
+    return asyncio.run_coroutine_threadsafe(coro, shared_event_loop())
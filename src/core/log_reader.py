@@ -0,0 +1,151 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = b'"FullEmailStateJSON"'
+
+# Bytes hashed at the start of the file to notice a log replaced in place
+HEAD_FINGERPRINT_BYTES = 1024
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+
+def empty_log_aggregates() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "categories": {},
+        "intents": {},
+        "reply_length_sum": 0
+    }
+
+class IncrementalLogReader:
+    """
+    Tail reader for the JSON-in-CSV reply log
+
+    Remembers the byte offset it has consumed plus running aggregates
+    (total count, category and intent counts, reply-length sum) and only
+    parses rows appended since the last refresh. The offset and aggregates
+    are persisted next to the log so a new process resumes without a full
+    scan. Truncation, rotation or replacement of the file (different inode,
+    smaller size, or changed leading bytes) triggers a full rescan.
+    """
+
+    def __init__(self, path: str, state_path: Optional[str] = None):
+        self.path = path
+        self.state_path = state_path or f"{path}.state.json"
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        return {"offset": 0, "inode": None, "device": None, "head_hash": None, "aggregates": empty_log_aggregates()}
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if {"offset", "inode", "device", "head_hash", "aggregates"} <= set(state):
+                return state
+        except (OSError, ValueError):
+            pass
+        return self._fresh_state()
+
+    def _save_state(self) -> None:
+        # Write atomically so concurrent processes never read a partial file
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not persist log reader state: {e}")
+
+    def _head_hash(self, length: int) -> Optional[str]:
+        if length <= 0:
+            return None
+        with open(self.path, "rb") as f:
+            return hashlib.sha1(f.read(min(length, HEAD_FINGERPRINT_BYTES))).hexdigest()
+
+    def _needs_rescan(self, stat: os.stat_result) -> bool:
+        state = self._state
+        if state["offset"] == 0:
+            return False
+        if (stat.st_ino, stat.st_dev) != (state["inode"], state["device"]):
+            return True
+        if stat.st_size < state["offset"]:
+            return True
+        return self._head_hash(state["offset"]) != state["head_hash"]
+
+    def _reset(self) -> None:
+        self._state = self._fresh_state()
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Consume newly appended rows and return a copy of the aggregates
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if self._state["offset"]:
+                    self._reset()
+                    self._save_state()
+                return self._snapshot()
+
+            if self._needs_rescan(stat):
+                self._reset()
+
+            if stat.st_size > self._state["offset"]:
+                self._read_new_rows()
+                self._state["inode"], self._state["device"] = stat.st_ino, stat.st_dev
+                self._state["head_hash"] = self._head_hash(self._state["offset"])
+                self._save_state()
+
+            return self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        aggregates = self._state["aggregates"]
+        return {
+            **aggregates,
+            "categories": dict(aggregates["categories"]),
+            "intents": dict(aggregates["intents"])
+        }
+
+    def _read_new_rows(self) -> None:
+        offset = self._state["offset"]
+        remainder = b""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                data = remainder + chunk
+                # Only complete lines are consumed; a partially written row waits for the next refresh
+                cut = data.rfind(b"\n") + 1
+                for line in data[:cut].splitlines():
+                    self._consume_line(line)
+                offset += cut
+                remainder = data[cut:]
+        self._state["offset"] = offset
+
+    def _consume_line(self, line: bytes) -> None:
+        if not line.strip() or line.startswith(CSV_HEADER):
+            return
+        try:
+            row = next(csv.reader([line.decode("utf-8")]))
+            record = json.loads(row[0])
+        except (ValueError, IndexError, StopIteration) as e:
+            logger.warning(f"Skipping unreadable log row: {e}")
+            return
+
+        aggregates = self._state["aggregates"]
+        category = record.get("category", "Unknown")
+        intent = record.get("intent", "Unknown")
+        aggregates["total"] += 1
+        aggregates["categories"][category] = aggregates["categories"].get(category, 0) + 1
+        aggregates["intents"][intent] = aggregates["intents"].get(intent, 0) + 1
+        aggregates["reply_length_sum"] += len(record.get("reply") or "")
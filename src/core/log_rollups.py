@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.helpers import load_config_or_defaults
+from .log_views import LogView
+
+DEFAULT_ROLLUP_PATH = "data/logs/reply_rollups.sqlite"
+
+# Reply-length histogram bucket width; the quality bands (<50, 50-200, >=200
+# chars) fall on bucket boundaries
+LENGTH_BUCKET_WIDTH = 25
+SHORT_REPLY_LENGTH = 50
+LONG_REPLY_LENGTH = 200
+
+class ReplyRollups(LogView):
+    """
+    Per-day rollups of the reply log for the analytics dashboard
+
+    Counts and reply-length sums, squares, minimum and maximum are kept per
+    (day, category, intent), plus a reply-length histogram per day. They are
+    updated as replies are logged, so a date-range query aggregates a few
+    rows per day instead of scanning the log.
+    """
+
+    name = "reply rollups"
+
+    def __init__(self, path: str = DEFAULT_ROLLUP_PATH):
+        super().__init__(path)
+
+    def _create_tables(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reply_rollups ("
+            "day TEXT NOT NULL, category TEXT NOT NULL, intent TEXT NOT NULL, count INTEGER NOT NULL, "
+            "length_sum INTEGER NOT NULL, length_sq_sum INTEGER NOT NULL, "
+            "length_min INTEGER NOT NULL, length_max INTEGER NOT NULL, "
+            "PRIMARY KEY (day, category, intent)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reply_length_histogram ("
+            "day TEXT NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL, "
+            "PRIMARY KEY (day, bucket)) WITHOUT ROWID"
+        )
+
+    def add(self, records: Iterable[Dict[str, Any]], versions: Optional[tuple] = None) -> bool:
+        """
+        Fold logged records into the rollups
+
+        Args:
+            records: Records just appended to the log
+            versions: (before, after) store versions returned by append_many
+
+        Returns:
+            False when the rollups did not reflect "before" and were left
+            stale for sync_with() instead of being updated
+        """
+        groups, buckets = _aggregate(records)
+        if not groups:
+            return True
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if versions is not None and not self._advance_mark(conn, versions):
+                    return False
+                _insert(conn, groups, buckets)
+        return True
+
+    def total(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COALESCE(SUM(count), 0) FROM reply_rollups").fetchone()[0]
+
+    def _stage(self, records: Iterable[Dict[str, Any]]) -> tuple:
+        # A handful of rows per day, so the whole log aggregates in memory
+        return _aggregate(records)
+
+    def _replace(self, conn: sqlite3.Connection, staged: tuple) -> None:
+        conn.execute("DELETE FROM reply_rollups")
+        conn.execute("DELETE FROM reply_length_histogram")
+        _insert(conn, *staged)
+
+    def query(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate the rollups for days in [start, end] (inclusive, YYYY-MM-DD)
+
+        Returns:
+            Dict with total, reply-length statistics and quality bands, and
+            per-day, per-category, per-intent and histogram counts
+        """
+        clauses, params = [], []
+        if start:
+            clauses.append("day >= ?")
+            params.append(start)
+        if end:
+            clauses.append("day <= ?")
+            params.append(end)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            conn = self._connection()
+            total, length_sum, length_sq_sum, length_min, length_max = conn.execute(
+                "SELECT COALESCE(SUM(count), 0), COALESCE(SUM(length_sum), 0), COALESCE(SUM(length_sq_sum), 0), "
+                f"MIN(length_min), MAX(length_max) FROM reply_rollups{where}",
+                params
+            ).fetchone()
+            daily = conn.execute(
+                f"SELECT day, SUM(count) FROM reply_rollups{where} GROUP BY day ORDER BY day", params
+            ).fetchall()
+            categories = conn.execute(
+                f"SELECT category, SUM(count) AS n FROM reply_rollups{where} GROUP BY category ORDER BY n DESC, category",
+                params
+            ).fetchall()
+            intents = conn.execute(
+                f"SELECT intent, SUM(count) AS n FROM reply_rollups{where} GROUP BY intent ORDER BY n DESC, intent",
+                params
+            ).fetchall()
+            histogram = conn.execute(
+                f"SELECT bucket, SUM(count) FROM reply_length_histogram{where} GROUP BY bucket ORDER BY bucket",
+                params
+            ).fetchall()
+
+        mean = length_sum / total if total else 0.0
+        # Sample standard deviation, matching pandas' Series.std()
+        variance = (length_sq_sum - length_sum * length_sum / total) / (total - 1) if total > 1 else float("nan")
+        short_bucket = SHORT_REPLY_LENGTH // LENGTH_BUCKET_WIDTH
+        long_bucket = LONG_REPLY_LENGTH // LENGTH_BUCKET_WIDTH
+        return {
+            "total": total,
+            "avg_length": mean,
+            "min_length": length_min,
+            "max_length": length_max,
+            "std_length": max(variance, 0.0) ** 0.5 if total > 1 else variance,
+            "short_replies": sum(count for bucket, count in histogram if bucket < short_bucket),
+            "medium_replies": sum(count for bucket, count in histogram if short_bucket <= bucket < long_bucket),
+            "long_replies": sum(count for bucket, count in histogram if bucket >= long_bucket),
+            "daily_counts": dict(daily),
+            "categories": dict(categories),
+            "intents": dict(intents),
+            "length_histogram": {bucket * LENGTH_BUCKET_WIDTH: count for bucket, count in histogram}
+        }
+
+def _aggregate(records: Iterable[Dict[str, Any]]) -> tuple:
+    groups: Dict[tuple, List[int]] = {}
+    buckets: Dict[tuple, int] = {}
+    for record in records:
+        day = str(record["timestamp"])[:10]
+        length = len(record.get("reply") or "")
+        key = (day, str(record.get("category", "Unknown")), str(record.get("intent", "Unknown")))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [1, length, length * length, length, length]
+        else:
+            group[0] += 1
+            group[1] += length
+            group[2] += length * length
+            group[3] = min(group[3], length)
+            group[4] = max(group[4], length)
+        bucket = (day, length // LENGTH_BUCKET_WIDTH)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    return groups, buckets
+
+def _insert(conn: sqlite3.Connection, groups: Dict[tuple, List[int]], buckets: Dict[tuple, int]) -> None:
+    conn.executemany(
+        "INSERT INTO reply_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (day, category, intent) DO UPDATE SET "
+        "count = count + excluded.count, length_sum = length_sum + excluded.length_sum, "
+        "length_sq_sum = length_sq_sum + excluded.length_sq_sum, "
+        "length_min = MIN(length_min, excluded.length_min), "
+        "length_max = MAX(length_max, excluded.length_max)",
+        [key + tuple(values) for key, values in groups.items()]
+    )
+    conn.executemany(
+        "INSERT INTO reply_length_histogram VALUES (?, ?, ?) "
+        "ON CONFLICT (day, bucket) DO UPDATE SET count = count + excluded.count",
+        [key + (count,) for key, count in buckets.items()]
+    )
+
+_rollups: Dict[str, ReplyRollups] = {}
+_rollups_lock = threading.Lock()
+_default_rollups = None
+
+def get_reply_rollups(config: Optional[Dict[str, Any]] = None) -> ReplyRollups:
+    """
+    Return the shared rollup store for the configured path
+    """
+    global _default_rollups
+    if config is None:
+        if _default_rollups is None:
+            _default_rollups = get_reply_rollups(load_config_or_defaults())
+        return _default_rollups
+
+    path = config.get("reply_rollup_path", DEFAULT_ROLLUP_PATH)
+    with _rollups_lock:
+        if path not in _rollups:
+            _rollups[path] = ReplyRollups(path)
+        return _rollups[path]
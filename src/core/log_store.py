@@ -0,0 +1,772 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from ..utils.helpers import load_config_or_defaults
+from .log_reader import IncrementalLogReader, empty_log_aggregates
+
+DEFAULT_CSV_LOG_PATH = "data/logs/reply_log.csv"
+DEFAULT_DB_LOG_PATH = "data/logs/reply_log.sqlite"
+LOG_BACKENDS = ("csv", "sqlite")
+
+# Columns of a reply log record, in storage order
+LOG_COLUMNS = ["timestamp", "subject", "email_body", "category", "intent", "entities", "reply", "reply_length"]
+
+# JSON cells can be far larger than the csv module's default 128 KiB limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def build_log_record(email_data: Dict[str, Any], reply: str) -> Dict[str, Any]:
+    """
+    Build the record stored for one generated reply
+    """
+    return {
+        "timestamp": str(datetime.now()),
+        "subject": email_data.get("subject", "Unknown"),
+        "email_body": email_data["email_body"],
+        "category": email_data.get("category", "Unknown"),
+        "intent": email_data.get("intent", "Unknown"),
+        "entities": email_data.get("entities", {}),
+        "reply": reply
+    }
+
+class CsvLogStore:
+    """
+    Legacy reply log: one quoted CSV cell holding a JSON document per row
+
+    The configured path is the active segment. On the first append of a new
+    day its rows are sealed into one file per day under a directory named
+    after the log (data/logs/reply_log/reply_log-YYYY-MM-DD.csv), with a
+    manifest of per-day aggregates. Date-range reads only open the segments
+    covering the range, and expired segments are deleted or archived
+    according to the retention policy.
+    """
+
+    backend = "csv"
+
+    def __init__(self, path: str = DEFAULT_CSV_LOG_PATH, retention_days: Optional[int] = None,
+                 archive_expired: bool = False):
+        self.path = path
+        self.retention_days = retention_days
+        self.archive_expired = archive_expired
+        root = os.path.splitext(path)[0]
+        self._segment_prefix = os.path.basename(root)
+        self.segment_dir = root
+        self.archive_dir = os.path.join(root, "archive")
+        self._lock = threading.Lock()
+        self._aggregate_reader = IncrementalLogReader(path)
+        self._manifest_cache = (None, {})
+        self._retention_checked = None
+
+    def append_many(self, records: List[Dict[str, Any]], sync: bool = False) -> Optional[tuple]:
+        """
+        Append records with compact JSON (1-line per row)
+
+        The batch is serialized up front and written with a single call under
+        an exclusive file lock, so rows from concurrent processes never
+        interleave. With sync=True the data is fsynced before returning.
+
+        Returns:
+            (version before, version after) read under the lock, so views of
+            the log can tell whether this batch is the only change between them
+        """
+        if not records:
+            return None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        for record in records:
+            writer.writerow([json.dumps(_without_derived(record), ensure_ascii=False)])
+        newest_day = max(record["timestamp"][:10] for record in records)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            csvfile = self._open_active()
+            try:
+                before = self.version()
+                active_day = self._active_day(csvfile)
+                if active_day and newest_day > active_day:
+                    self._seal_active()
+                    csvfile.close()
+                    csvfile = self._open_active()
+                if csvfile.tell() == 0:
+                    csv.writer(csvfile, quoting=csv.QUOTE_ALL).writerow(["FullEmailStateJSON"])
+                csvfile.write(buffer.getvalue())
+                csvfile.flush()
+                if sync:
+                    os.fsync(csvfile.fileno())
+                after = self.version()
+            finally:
+                csvfile.close()
+
+        today = datetime.now().date()
+        if self.retention_days and self._retention_checked != today:
+            self._retention_checked = today
+            self.enforce_retention()
+        return before, after
+
+    def _open_active(self):
+        # Reopen if another process sealed the file while we waited for the lock
+        while True:
+            csvfile = open(self.path, mode='a', newline='', encoding='utf-8')
+            if not fcntl:
+                return csvfile
+            fcntl.flock(csvfile, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(csvfile.fileno()).st_ino:
+                    return csvfile
+            except FileNotFoundError:
+                pass
+            csvfile.close()
+
+    def _active_day(self, csvfile=None) -> Optional[str]:
+        """
+        Day of the first row in the active segment, or None when it is empty
+        """
+        try:
+            stat = os.fstat(csvfile.fileno()) if csvfile else os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if stat.st_size == 0:
+            return None
+        # Only the first row is parsed; the inode may be reused after sealing so it is not cached
+        first = next(_iter_log_file(self.path), None)
+        return first["timestamp"][:10] if first else None
+
+    @contextmanager
+    def _segments_locked(self):
+        os.makedirs(self.segment_dir, exist_ok=True)
+        with open(os.path.join(self.segment_dir, ".lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.segment_dir, f"{self._segment_prefix}-{day}.csv")
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.segment_dir, "manifest.json")
+
+    def _manifest(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-day aggregates of the sealed segments, reloaded when the file changes
+        """
+        try:
+            mtime = os.stat(self._manifest_path()).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._manifest_cache[0] != mtime:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                self._manifest_cache = (mtime, json.load(f))
+        return self._manifest_cache[1]
+
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]) -> None:
+        temp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, sort_keys=True)
+        os.replace(temp_path, self._manifest_path())
+
+    def _seal_active(self) -> None:
+        """
+        Split the active segment into per-day segments and remove it
+
+        Callers hold the active file lock, so no rows are appended meanwhile.
+        """
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for record in _iter_log_file(self.path):
+            by_day.setdefault(record["timestamp"][:10], []).append(record)
+
+        with self._segments_locked():
+            manifest = dict(self._manifest())
+            for day, day_records in by_day.items():
+                segment_path = self._segment_path(day)
+                existing = list(_iter_log_file(segment_path)) if os.path.exists(segment_path) else []
+                _write_log_file(segment_path, existing + day_records)
+                manifest[day] = _aggregate(existing + day_records)
+            self._save_manifest(manifest)
+            os.remove(self.path)
+
+    def compact(self) -> None:
+        """
+        Seal the active segment if it holds rows from before today
+        """
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            csvfile = self._open_active()
+            try:
+                active_day = self._active_day(csvfile)
+                if active_day and active_day < str(datetime.now().date()):
+                    self._seal_active()
+            finally:
+                csvfile.close()
+
+    def enforce_retention(self, retention_days: Optional[int] = None) -> int:
+        """
+        Delete, or archive as gzip, day segments older than the retention window
+
+        Args:
+            retention_days: Days to keep; defaults to the store's setting
+
+        Returns:
+            Number of expired day segments removed from the log
+        """
+        retention_days = retention_days or self.retention_days
+        if not retention_days:
+            return 0
+        self.compact()
+        cutoff = str(datetime.now().date() - timedelta(days=retention_days))
+
+        removed = 0
+        with self._segments_locked():
+            manifest = dict(self._manifest())
+            for day in sorted(manifest):
+                if day >= cutoff:
+                    break
+                segment_path = self._segment_path(day)
+                if os.path.exists(segment_path):
+                    if self.archive_expired:
+                        os.makedirs(self.archive_dir, exist_ok=True)
+                        archive_path = os.path.join(self.archive_dir, f"{os.path.basename(segment_path)}.gz")
+                        with open(segment_path, "rb") as source, gzip.open(archive_path, "wb") as target:
+                            shutil.copyfileobj(source, target)
+                    os.remove(segment_path)
+                del manifest[day]
+                removed += 1
+            if removed:
+                self._save_manifest(manifest)
+        return removed
+
+    def segment_paths(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """
+        Return the log files holding rows with timestamps in [start, end)
+        """
+        paths = [
+            self._segment_path(day) for day in sorted(self._manifest())
+            if (not start or day >= start[:10]) and (not end or day <= end[:10])
+        ]
+        active_day = self._active_day()
+        if active_day and (not end or active_day <= end[:10]):
+            paths.append(self.path)
+        return paths
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream records from every segment, oldest first, without loading them all
+        """
+        for segment_path in self.segment_paths():
+            for record in _iter_log_file(segment_path):
+                yield _with_derived(record)
+
+    def load_dataframe(self, columns: Optional[List[str]] = None, start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Load the log, optionally limited to timestamps in [start, end)
+
+        Only segments overlapping the range are opened.
+        """
+        records = (
+            _with_derived(record)
+            for segment_path in self.segment_paths(start, end)
+            for record in _iter_log_file(segment_path)
+        )
+        if start or end:
+            records = (
+                record for record in records
+                if (not start or record["timestamp"] >= start) and (not end or record["timestamp"] < end)
+            )
+        return _records_to_dataframe(records, columns)
+
+    def query(self, category: Optional[str] = None, search: Optional[str] = None,
+              search_fields: Iterable[str] = ("subject",), start: Optional[str] = None,
+              end: Optional[str] = None, limit: int = 50, offset: int = 0,
+              columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return one page of matching records, newest first, and the match count
+
+        Segments are walked newest first while holding at most one page of
+        rows. Without a search term, sealed days fully inside the range are
+        counted from the manifest instead of being read, so pages for a
+        category filter only open the segments they return rows from.
+
+        Args:
+            category: Only rows with this category
+            search: Case-insensitive substring that must occur in one of search_fields
+            search_fields: Columns searched for the substring
+            start: Inclusive lower timestamp bound
+            end: Exclusive upper timestamp bound
+            limit: Page size
+            offset: Number of matching rows to skip
+            columns: Columns to return (all by default)
+
+        Returns:
+            {"rows": list of records, "total": number of matching rows}
+        """
+        matches = _record_filter(category, search, search_fields, start, end)
+        manifest = self._manifest()
+        rows: List[Dict[str, Any]] = []
+        skip = offset
+        total = 0
+        for segment_path in reversed(self.segment_paths(start, end)):
+            day = os.path.basename(segment_path)[len(self._segment_prefix) + 1:-len(".csv")]
+            aggregates = None if segment_path == self.path else manifest.get(day)
+            if aggregates and not search and (not start or start <= day) and (not end or end[:10] > day):
+                count = aggregates["categories"].get(category, 0) if category else aggregates["total"]
+            else:
+                count = sum(1 for record in _iter_log_file(segment_path) if matches(record))
+            total += count
+
+            if skip >= count:
+                skip -= count
+                continue
+            wanted = limit - len(rows)
+            if wanted > 0:
+                # Matches are in file (oldest first) order; take the newest slice
+                first, last = max(count - skip - wanted, 0), count - skip
+                index = 0
+                page = []
+                for record in _iter_log_file(segment_path):
+                    if matches(record):
+                        if first <= index < last:
+                            page.append(record)
+                        index += 1
+                        if index >= last:
+                            break
+                rows.extend(reversed(page))
+            skip = 0
+        return {"rows": _select_columns([_with_derived(record) for record in rows], columns), "total": total}
+
+    def iter_matching(self, category: Optional[str] = None, search: Optional[str] = None,
+                      search_fields: Iterable[str] = ("subject",), start: Optional[str] = None,
+                      end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every matching record, oldest first, reading only segments in range
+        """
+        matches = _record_filter(category, search, search_fields, start, end)
+        for segment_path in self.segment_paths(start, end):
+            for record in _iter_log_file(segment_path):
+                if matches(record):
+                    yield _with_derived(record)
+
+    def version(self) -> tuple:
+        """
+        Cheap token that changes whenever rows are appended, sealed or expired
+        """
+        return tuple(_file_version(path) for path in (self.path, self._manifest_path()))
+
+    def date_bounds(self) -> Optional[tuple]:
+        """
+        Return (first day, last day) covered by the log, or None when empty
+
+        The active segment is not scanned, so the last day is today whenever
+        it holds rows.
+        """
+        days = sorted(self._manifest())
+        active_day = self._active_day()
+        if active_day:
+            days += [active_day, max(active_day, str(datetime.now().date()))]
+        return (days[0], days[-1]) if days else None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return the total row count, per-category and per-intent counts and
+        the summed reply length
+
+        Sealed segments come from the manifest and the active segment is
+        read incrementally, so only rows appended since the last call are
+        parsed.
+        """
+        totals = empty_log_aggregates()
+        for aggregates in list(self._manifest().values()) + [self._aggregate_reader.refresh()]:
+            _merge_aggregates(totals, aggregates)
+        return totals
+
+class SqliteLogStore:
+    """
+    Columnar reply log in SQLite with indexes on timestamp, category and intent
+
+    Appends are batched into a single transaction and readers can select just
+    the columns and date range they need instead of decoding every row.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = DEFAULT_DB_LOG_PATH, retention_days: Optional[int] = None):
+        self.path = path
+        self.retention_days = retention_days
+        self._conn = None
+        self._lock = threading.Lock()
+        self._retention_checked = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                "id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, subject TEXT, email_body TEXT, "
+                "category TEXT, intent TEXT, entities TEXT, reply TEXT, reply_length INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_timestamp ON replies (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_category ON replies (category, timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_intent ON replies (intent)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def append_many(self, records: List[Dict[str, Any]], sync: bool = False) -> Optional[tuple]:
+        # Each batch commits in its own transaction; sync=True also checkpoints the WAL into the database file.
+        # Returns the (before, after) versions; "before" is read holding the write lock
+        if not records:
+            return None
+        rows = [_to_row(_with_derived(record)) for record in records]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                before = self.version()
+                conn.executemany(
+                    f"INSERT INTO replies ({', '.join(LOG_COLUMNS)}) VALUES ({', '.join('?' for _ in LOG_COLUMNS)})",
+                    rows
+                )
+            if sync:
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            after = self.version()
+
+        today = datetime.now().date()
+        if self.retention_days and self._retention_checked != today:
+            self._retention_checked = today
+            self.enforce_retention()
+        return before, after
+
+    def enforce_retention(self, retention_days: Optional[int] = None) -> int:
+        """
+        Delete rows older than the retention window and return how many went
+        """
+        retention_days = retention_days or self.retention_days
+        if not retention_days:
+            return 0
+        cutoff = str(datetime.now().date() - timedelta(days=retention_days))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return conn.execute("DELETE FROM replies WHERE timestamp < ?", (cutoff,)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM replies").fetchone()[0]
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream records in insertion order, one keyset-paginated batch at a time
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    f"SELECT id, {', '.join(LOG_COLUMNS)} FROM replies WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _from_row(dict(zip(LOG_COLUMNS, row[1:])))
+            last_id = rows[-1][0]
+
+    def load_dataframe(self, columns: Optional[List[str]] = None, start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Load selected columns, optionally limited to timestamps in [start, end)
+        """
+        selected = [column for column in (columns or LOG_COLUMNS) if column in LOG_COLUMNS]
+        clauses, params = [], []
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(selected)} FROM replies{where} ORDER BY timestamp",
+                self._connection(),
+                params=params
+            )
+        if "entities" in df.columns:
+            df["entities"] = df["entities"].map(lambda value: json.loads(value) if value else {})
+        return df if not df.empty else pd.DataFrame()
+
+    def query(self, category: Optional[str] = None, search: Optional[str] = None,
+              search_fields: Iterable[str] = ("subject",), start: Optional[str] = None,
+              end: Optional[str] = None, limit: int = 50, offset: int = 0,
+              columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return one page of matching records, newest first, and the match count
+
+        Category and date filters use the (category, timestamp) and timestamp
+        indexes; the substring search is a case-insensitive LIKE.
+        """
+        where, params = _sql_filter(category, search, search_fields, start, end)
+        selected = [column for column in (columns or LOG_COLUMNS) if column in LOG_COLUMNS]
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM replies{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(selected)} FROM replies{where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        records = [dict(zip(selected, row)) for row in rows]
+        if "entities" in selected:
+            records = [_from_row(record) for record in records]
+        return {"rows": records, "total": total}
+
+    def iter_matching(self, category: Optional[str] = None, search: Optional[str] = None,
+                      search_fields: Iterable[str] = ("subject",), start: Optional[str] = None,
+                      end: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every matching record in insertion order
+        """
+        where, params = _sql_filter(category, search, search_fields, start, end)
+        where = f"{where} AND id > ?" if where else " WHERE id > ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    f"SELECT id, {', '.join(LOG_COLUMNS)} FROM replies{where} ORDER BY id LIMIT ?",
+                    params + [last_id, batch_size]
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _from_row(dict(zip(LOG_COLUMNS, row[1:])))
+            last_id = rows[-1][0]
+
+    def version(self) -> tuple:
+        return tuple(_file_version(path) for path in (self.path, f"{self.path}-wal"))
+
+    def date_bounds(self) -> Optional[tuple]:
+        with self._lock:
+            first, last = self._connection().execute("SELECT MIN(timestamp), MAX(timestamp) FROM replies").fetchone()
+        return (first[:10], last[:10]) if first else None
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            category_rows = conn.execute(
+                "SELECT category, COUNT(*), COALESCE(SUM(reply_length), 0) FROM replies GROUP BY category"
+            ).fetchall()
+            intent_rows = conn.execute("SELECT intent, COUNT(*) FROM replies GROUP BY intent").fetchall()
+        return {
+            "total": sum(row[1] for row in category_rows),
+            "categories": {category: count for category, count, _ in category_rows},
+            "intents": {intent: count for intent, count in intent_rows},
+            "reply_length_sum": sum(row[2] for row in category_rows)
+        }
+
+def _file_version(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _iter_log_file(path: str) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if row:
+                yield json.loads(row[0])
+
+def _write_log_file(path: str, records: List[Dict[str, Any]]) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["FullEmailStateJSON"])
+        for record in records:
+            writer.writerow([json.dumps(_without_derived(record), ensure_ascii=False)])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def _aggregate(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    aggregates = empty_log_aggregates()
+    for record in records:
+        _merge_aggregates(aggregates, {
+            "total": 1,
+            "categories": {record.get("category", "Unknown"): 1},
+            "intents": {record.get("intent", "Unknown"): 1},
+            "reply_length_sum": len(record.get("reply") or "")
+        })
+    return aggregates
+
+def _merge_aggregates(totals: Dict[str, Any], aggregates: Dict[str, Any]) -> None:
+    totals["total"] += aggregates["total"]
+    totals["reply_length_sum"] += aggregates["reply_length_sum"]
+    for field in ("categories", "intents"):
+        for key, count in aggregates[field].items():
+            totals[field][key] = totals[field].get(key, 0) + count
+
+def _with_derived(record: Dict[str, Any]) -> Dict[str, Any]:
+    if "reply_length" not in record:
+        record = {**record, "reply_length": len(record.get("reply") or "")}
+    return record
+
+def _without_derived(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if key != "reply_length"}
+
+def _to_row(record: Dict[str, Any]) -> tuple:
+    values = dict(record)
+    values["entities"] = json.dumps(values.get("entities") or {}, ensure_ascii=False)
+    return tuple(values.get(column) for column in LOG_COLUMNS)
+
+def _from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    row["entities"] = json.loads(row["entities"]) if row.get("entities") else {}
+    return row
+
+def _record_filter(category: Optional[str], search: Optional[str], search_fields: Iterable[str],
+                   start: Optional[str], end: Optional[str]):
+    needle = search.casefold() if search else None
+    fields = list(search_fields)
+
+    def matches(record: Dict[str, Any]) -> bool:
+        if category and record.get("category") != category:
+            return False
+        if start and record["timestamp"] < start:
+            return False
+        if end and record["timestamp"] >= end:
+            return False
+        if needle and not any(needle in str(record.get(field) or "").casefold() for field in fields):
+            return False
+        return True
+
+    return matches
+
+def _sql_filter(category: Optional[str], search: Optional[str], search_fields: Iterable[str],
+                start: Optional[str], end: Optional[str]) -> tuple:
+    clauses, params = [], []
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if search:
+        fields = [field for field in search_fields if field in LOG_COLUMNS]
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        clauses.append("(" + " OR ".join(f"{field} LIKE ? ESCAPE '\\'" for field in fields) + ")")
+        params.extend(pattern for _ in fields)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+def _select_columns(records: List[Dict[str, Any]], columns: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if not columns:
+        return records
+    return [{column: record.get(column) for column in columns} for record in records]
+
+def _records_to_dataframe(records: Iterable[Dict[str, Any]], columns: Optional[List[str]]) -> pd.DataFrame:
+    if columns:
+        records = ({column: record.get(column) for column in columns} for record in records)
+    return pd.DataFrame(list(records))
+
+_stores: Dict[tuple, Any] = {}
+_stores_lock = threading.Lock()
+
+def log_retention_days(config: Dict[str, Any]) -> Optional[int]:
+    """
+    Days of reply log to keep: the Settings page value, else data_retention_days
+    """
+    return (config.get("analytics") or {}).get("log_retention_days") or config.get("data_retention_days")
+
+_default_store = None
+
+def get_log_store(config: Optional[Dict[str, Any]] = None):
+    """
+    Return the process-wide reply log store for the configured backend
+
+    Without an explicit config the application config is read once and the
+    resulting store is reused for the life of the process.
+    """
+    global _default_store
+    if config is None:
+        if _default_store is None:
+            _default_store = get_log_store(load_config_or_defaults())
+        return _default_store
+
+    backend = config.get("log_backend", "csv")
+    if backend not in LOG_BACKENDS:
+        raise ValueError(f"Unknown log_backend {backend!r}; expected one of {LOG_BACKENDS}")
+
+    retention_days = log_retention_days(config)
+    archive_expired = config.get("log_retention_action", "delete") == "archive"
+    if backend == "sqlite":
+        key = (backend, config.get("reply_log_db_path", DEFAULT_DB_LOG_PATH), retention_days)
+    else:
+        key = (backend, config.get("reply_log_csv_path", DEFAULT_CSV_LOG_PATH), retention_days, archive_expired)
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "sqlite":
+                store = SqliteLogStore(key[1], retention_days=retention_days)
+            else:
+                store = CsvLogStore(key[1], retention_days=retention_days, archive_expired=archive_expired)
+            _stores[key] = store
+        return store
+
+def migrate_csv_log(csv_path: str = DEFAULT_CSV_LOG_PATH, db_path: str = DEFAULT_DB_LOG_PATH,
+                    batch_size: int = 5000, append: bool = False) -> int:
+    """
+    Copy a legacy JSON-in-CSV reply log into the SQLite store
+
+    Rows are streamed in batches so arbitrarily large logs migrate in
+    constant memory.
+
+    Args:
+        csv_path: Existing reply_log.csv to read
+        db_path: SQLite database to write
+        batch_size: Number of rows inserted per transaction
+        append: Allow migrating into a database that already has rows
+
+    Returns:
+        Number of migrated rows
+    """
+    source = CsvLogStore(csv_path)
+    target = SqliteLogStore(db_path)
+    if not append and target.count():
+        raise ValueError(f"{db_path} already contains replies; pass append=True to add to it")
+
+    migrated = 0
+    batch = []
+    for record in source.iter_records():
+        batch.append(record)
+        if len(batch) >= batch_size:
+            target.append_many(batch)
+            migrated += len(batch)
+            batch = []
+    target.append_many(batch)
+    return migrated + len(batch)
@@ -0,0 +1,115 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+class LogView:
+    """
+    SQLite store of data derived from the reply log (rollups, search index)
+
+    The view persists the log store version it reflects, its high-water
+    mark. Batches are folded in together with the (before, after) versions
+    returned by the store's append_many, and only when the mark still equals
+    "before": a batch that raced with another writer or a rebuild clears the
+    mark instead of being counted twice, leaving the view stale until the
+    next sync_with() rebuilds it. Rebuilds replace the contents and the mark
+    in a single transaction, so readers never see a partial view.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _create_tables(self, conn: sqlite3.Connection) -> None:
+        raise NotImplementedError
+
+    def _stage(self, records: Iterable[Dict[str, Any]]) -> Any:
+        """Prepare a rebuild from every record, outside the swap transaction"""
+        raise NotImplementedError
+
+    def _replace(self, conn: sqlite3.Connection, staged: Any) -> None:
+        """Swap the staged rebuild in, inside the swap transaction"""
+        raise NotImplementedError
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS view_state (key TEXT PRIMARY KEY, value TEXT)")
+            self._create_tables(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def mark(self) -> Optional[str]:
+        """
+        The log store version this view reflects, or None when unknown
+        """
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM view_state WHERE key = 'log_version'").fetchone()
+        return row[0] if row else None
+
+    def is_current(self, store) -> bool:
+        return self.mark() == _encode_version(store.version())
+
+    def _set_mark(self, conn: sqlite3.Connection, version: Optional[tuple]) -> None:
+        conn.execute(
+            "INSERT INTO view_state VALUES ('log_version', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (_encode_version(version) if version is not None else None,)
+        )
+
+    def _advance_mark(self, conn: sqlite3.Connection, versions: tuple) -> bool:
+        # Call inside a write transaction, before changing the view
+        before, after = versions
+        moved = conn.execute(
+            "UPDATE view_state SET value = ? WHERE key = 'log_version' AND value = ?",
+            (_encode_version(after), _encode_version(before))
+        ).rowcount
+        if not moved:
+            self._set_mark(conn, None)
+        return bool(moved)
+
+    def rebuild(self, records: Iterable[Dict[str, Any]], version: Optional[tuple] = None) -> None:
+        """
+        Recompute the view from every record and swap it in atomically
+
+        Args:
+            records: Every record of the log
+            version: Store version the records were read at, if known
+        """
+        self._swap_in(self._stage(records), version)
+
+    def _swap_in(self, staged: Any, version: Optional[tuple]) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._replace(conn, staged)
+                self._set_mark(conn, version)
+
+    def sync_with(self, store, force: bool = False) -> bool:
+        """
+        Rebuild from the store unless the view already reflects its version
+
+        Covers rows written outside the log writer (migrations, direct
+        appends), days removed by log retention and batches that could not
+        be folded in.
+
+        Returns:
+            Whether the view was rebuilt
+        """
+        if not force and self.is_current(store):
+            return False
+        version = store.version()
+        staged = self._stage(store.iter_records())
+        # Rows appended during the scan may or may not have been read; keep
+        # the view marked stale so they are neither lost nor counted twice
+        self._swap_in(staged, version if store.version() == version else None)
+        return True
+
+def _encode_version(version: tuple) -> str:
+    return json.dumps(version)
@@ -0,0 +1,247 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .log_rollups import get_reply_rollups
+from ..utils.helpers import load_config_or_defaults
+from .log_store import get_log_store
+from .search_index import get_search_index, search_index_enabled
+
+logger = logging.getLogger(__name__)
+
+# Queue markers: write the pending batch now / write it and stop /
+# resync the rollups and search index with the store once the queue is idle
+_FLUSH = object()
+_STOP = object()
+_SYNC = object()
+
+class BufferedLogWriter:
+    """
+    Queue-backed reply log writer with a dedicated flush thread
+
+    enqueue() only puts the record on an in-memory queue. The writer thread
+    drains it in batches, handing each batch to the store in one append
+    followed by an fsync, whenever `max_batch` records are waiting or
+    `flush_interval` seconds have passed since the first of them arrived.
+    The queue is bounded so a stalled disk slows producers down instead of
+    growing memory without limit. Written batches are also folded into the
+    analytics rollups and the full-text index when they are given, and then
+    passed to every listener registered with add_listener(). Their rebuilds
+    also run on the writer thread, serialized with the writes they reconcile.
+    A rebuild scans the whole log, so it is deferred: every request and every
+    batch that could not be folded in merges into one pending sync, run once
+    the queue has been idle for `flush_interval` or after `max_sync_delay`
+    seconds at the latest.
+    """
+
+    def __init__(self, store, flush_interval: float = 1.0, max_batch: int = 100, max_queue: int = 10000,
+                 rollups=None, search_index=None, max_sync_delay: float = 60.0):
+        self.store = store
+        self.rollups = rollups
+        self.search_index = search_index
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_sync_delay = max_sync_delay
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._closed = False
+        self._sync_requested = False
+        # monotonic time the pending sync was first asked for, or None
+        self._sync_due = None
+        self._lock = threading.Lock()
+        # Orders enqueue/flush against close, so nothing is queued behind _STOP
+        self._close_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="reply-log-writer", daemon=True)
+                    self._thread.start()
+
+    def enqueue(self, record: Dict[str, Any]) -> None:
+        """
+        Queue a record for the writer thread; written synchronously once closed
+        """
+        with self._close_lock:
+            if not self._closed:
+                self._ensure_started()
+                self._queue.put(record)
+                return
+        self._write([record])
+
+    def request_sync(self) -> None:
+        """
+        Ask the writer thread to rebuild the rollups and search index if
+        they are out of step with the store, once it is idle; returns
+        without waiting
+        """
+        with self._close_lock:
+            if self._closed or self._sync_requested:
+                return
+            self._ensure_started()
+            self._sync_requested = True
+            try:
+                self._queue.put_nowait(_SYNC)
+            except queue.Full:
+                self._sync_requested = False
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """
+        Call listener(batch) on the writer thread after each batch is written,
+        and listener([]) after the rollups or search index are rebuilt
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def flush(self) -> None:
+        """
+        Block until every record queued so far is on disk
+        """
+        with self._close_lock:
+            if self._closed or self._thread is None:
+                return
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Drain the queue and stop the writer thread
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join()
+                self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "queued": self._queue.qsize()
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=None if self._sync_due is None else self.flush_interval)
+            except queue.Empty:
+                self._sync()
+                continue
+            if first is _FLUSH or first is _STOP or first is _SYNC:
+                if first is _SYNC:
+                    self._sync_requested = False
+                    self._defer_sync()
+                self._queue.task_done()
+                if first is _STOP:
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _SYNC:
+                    self._sync_requested = False
+                    self._defer_sync()
+                    self._queue.task_done()
+                    continue
+                if record is _FLUSH or record is _STOP:
+                    stopping = record is _STOP
+                    self._queue.task_done()
+                    break
+                batch.append(record)
+
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if self._sync_due is not None and time.monotonic() - self._sync_due >= self.max_sync_delay:
+                self._sync()
+
+    def _write(self, batch) -> None:
+        try:
+            versions = self.store.append_many(batch, sync=True)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} reply log records: {e}")
+            return
+        for view in self._views():
+            try:
+                if not view.add(batch, versions):
+                    # Another process wrote or rebuilt in between; the view
+                    # is marked stale and rebuilt by the pending sync
+                    self._defer_sync()
+            except Exception as e:
+                # A failed update leaves the view stale until the next sync
+                logger.warning(f"Failed to update the {view.name}: {e}")
+                self._defer_sync()
+        self._notify(batch)
+
+    def _defer_sync(self) -> None:
+        if self._sync_due is None:
+            self._sync_due = time.monotonic()
+
+    def _views(self) -> list:
+        return [view for view in (self.rollups, self.search_index) if view is not None]
+
+    def _sync(self) -> None:
+        self._sync_due = None
+        rebuilt = False
+        for view in self._views():
+            try:
+                rebuilt = view.sync_with(self.store) or rebuilt
+            except Exception as e:
+                logger.warning(f"Failed to rebuild the {view.name}: {e}")
+        if rebuilt:
+            self._notify([])
+
+    def _notify(self, batch) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(batch)
+            except Exception as e:
+                logger.warning(f"Reply log listener failed: {e}")
+
+_writer: Optional[BufferedLogWriter] = None
+_writer_lock = threading.Lock()
+
+def get_log_writer() -> BufferedLogWriter:
+    """
+    Return the process-wide buffered writer for the configured log store
+
+    The writer is drained automatically when the interpreter exits. When the
+    full-text index is enabled, written batches are also indexed.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = load_config_or_defaults()
+            _writer = BufferedLogWriter(
+                get_log_store(),
+                flush_interval=config.get("log_flush_interval_seconds", 1.0),
+                max_batch=config.get("log_flush_max_records", 100),
+                rollups=get_reply_rollups(config),
+                search_index=get_search_index(config) if search_index_enabled(config) else None
+            )
+            atexit.register(_writer.close)
+        return _writer
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Any, Dict, Optional
+
+from .data_logger import flush_logs, log_to_csv
+from .job_queue import JobQueue, get_job_queue, worker_id
+from .reply_service import generate_reply_async
+from ..utils.rate_limiter import set_process_share
+
+logger = logging.getLogger(__name__)
+
+async def _heartbeat(queue: JobQueue, job_id: int, worker: str) -> None:
+    # Keep the lease alive while a slow job is still being processed
+    while True:
+        await asyncio.sleep(queue.visibility_timeout / 3)
+        if not await asyncio.to_thread(queue.heartbeat, job_id, worker):
+            logger.warning(f"Lost the lease on job {job_id}")
+            return
+
+async def process_job(queue: JobQueue, job: Dict[str, Any], worker: str, log_results: bool = True) -> bool:
+    """
+    Run one claimed job through the reply pipeline and settle it
+
+    Returns:
+        True when the job completed
+    """
+    email_data = job["email_data"]
+    heartbeat = asyncio.create_task(_heartbeat(queue, job["id"], worker))
+    try:
+        result = await generate_reply_async(email_data)
+    except Exception as e:
+        logger.error(f"Job {job['id']} attempt {job['attempts']} failed: {e}")
+        await asyncio.to_thread(queue.fail, job["id"], str(e), worker)
+        return False
+    finally:
+        heartbeat.cancel()
+
+    # The graph answers with a canned fallback when its LLM calls fail;
+    # retry the job instead of completing it with that reply
+    if result.degraded:
+        logger.error(f"Job {job['id']} attempt {job['attempts']} got a fallback reply")
+        await asyncio.to_thread(queue.fail, job["id"], "LLM calls failed; fallback reply not accepted", worker)
+        return False
+
+    category, intent, entities, reply = result
+
+    email_data.update({"category": category, "intent": intent, "entities": entities})
+    if log_results:
+        log_to_csv(email_data, reply)
+    result = {"category": category, "intent": intent, "entities": entities, "reply": reply,
+              "body_tokens": email_data.get("body_tokens")}
+    await asyncio.to_thread(queue.complete, job["id"], result, worker)
+    return True
+
+async def worker_loop(queue: JobQueue, concurrency: int = 4, drain: bool = False,
+                      poll_interval: float = 1.0, log_results: bool = True,
+                      stop: Optional[asyncio.Event] = None) -> Dict[str, int]:
+    """
+    Pull jobs with `concurrency` async tasks until stopped
+
+    Args:
+        queue: Queue to consume
+        concurrency: Jobs processed at once by this process
+        drain: Exit once no job is due instead of polling for more
+        poll_interval: Seconds between polls of an empty queue
+        log_results: Whether to record each reply with log_to_csv
+        stop: Event that ends the loop after in-flight jobs finish
+
+    Returns:
+        Counts of completed and failed jobs
+    """
+    stop = stop or asyncio.Event()
+    counts = {"completed": 0, "failed": 0}
+
+    async def run(index: int):
+        worker = f"{worker_id()}/{index}"
+        while not stop.is_set():
+            job = await asyncio.to_thread(queue.claim, worker)
+            if job is None:
+                if drain:
+                    return
+                try:
+                    await asyncio.wait_for(stop.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if await process_job(queue, job, worker, log_results):
+                counts["completed"] += 1
+            else:
+                counts["failed"] += 1
+
+    try:
+        await asyncio.gather(*(run(index) for index in range(concurrency)))
+    finally:
+        if log_results:
+            await asyncio.to_thread(flush_logs)
+    return counts
+
+def _run_process(config: Dict[str, Any], concurrency: int, drain: bool, processes: int = 1) -> None:
+    # Worker processes split the account's rate limits between them
+    set_process_share(1.0 / processes)
+    queue = get_job_queue(config)
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Finish in-flight jobs on SIGTERM/SIGINT; unfinished leases simply expire
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        counts = await worker_loop(
+            queue,
+            concurrency=concurrency,
+            drain=drain,
+            poll_interval=float(config.get("worker_poll_interval_seconds", 1.0)),
+            stop=stop
+        )
+        logger.info(f"Worker {worker_id()} finished: {counts}")
+
+    asyncio.run(main())
+
+def run_workers(config: Dict[str, Any], processes: int = 1, concurrency: int = 4, drain: bool = False) -> None:
+    """
+    Consume the job queue with `processes` worker processes
+
+    Each process runs its own event loop with `concurrency` async tasks, so
+    throughput scales across cores; a single process runs in the caller.
+    Every process gets 1/processes of the rate_limit_* budgets.
+    """
+    if processes < 1 or concurrency < 1:
+        raise ValueError("processes and concurrency must be at least 1")
+    if processes == 1:
+        _run_process(config, concurrency, drain)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_run_process, args=(config, concurrency, drain, processes), name=f"reply-worker-{index}")
+        for index in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and drain their in-flight jobs
+        for process in workers:
+            process.join()
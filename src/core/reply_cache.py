@@ -0,0 +1,245 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+from .langgraph_workflow import PROMPT_VERSIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "data/cache/reply_cache.sqlite"
+
+# Hits record last_access in memory and write it in batches of this many
+# keys, or after this many seconds, or with the next put
+ACCESS_FLUSH_KEYS = 256
+ACCESS_FLUSH_SECONDS = 30.0
+
+# Stage name under which the full generate_reply result is cached
+PIPELINE_STAGE = "pipeline"
+
+def normalize_email_body(body: str) -> str:
+    """
+    Normalize an email body for cache keys so whitespace and Unicode
+    presentation differences do not produce separate entries
+    """
+    return " ".join(unicodedata.normalize("NFKC", body).split())
+
+class ReplyCache:
+    """
+    On-disk LRU/TTL cache of workflow results backed by SQLite
+
+    Entries are content addressed: the key is a hash of the stage name, the
+    normalized email body and whatever else the stage depends on. The
+    connection is opened lazily so creating a cache never touches the disk.
+    The cache is best effort: SQLite errors such as "database is locked"
+    (several worker processes share the file) are logged and treated as a
+    miss or a skipped store, and hits only write last_access in batches.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 50000, ttl_seconds: float = 30 * 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stage_stats = {}
+        self._puts_since_eviction = 0
+        self._accessed: Dict[str, float] = {}
+        self._accessed_since = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reply_cache ("
+                "key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reply_cache_last_access ON reply_cache (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _record(self, stage: str, hit: bool) -> None:
+        counters = self._stage_stats.setdefault(stage, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+    def get(self, key: str, stage: str) -> Optional[Any]:
+        """
+        Return the cached value for a key, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT value, created_at FROM reply_cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Reply cache lookup failed, treating as a miss: {e}")
+                row = None
+            # Expired entries are left for the next eviction to delete
+            if row is None or now - row[1] > self.ttl_seconds:
+                self._record(stage, hit=False)
+                return None
+
+            if not self._accessed:
+                self._accessed_since = now
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_KEYS or now - self._accessed_since >= ACCESS_FLUSH_SECONDS:
+                try:
+                    self._write_accesses(conn)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    logger.warning(f"Failed to record reply cache accesses: {e}")
+            self._record(stage, hit=True)
+            return json.loads(row[0])
+
+    def _write_accesses(self, conn: sqlite3.Connection) -> None:
+        accessed, self._accessed = self._accessed, {}
+        conn.executemany(
+            "UPDATE reply_cache SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(when, key) for key, when in accessed.items()]
+        )
+
+    def put(self, key: str, stage: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value, evicting least recently used entries when full
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                # Pending hits go in first so eviction sees them
+                self._write_accesses(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO reply_cache (key, stage, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, stage, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._puts_since_eviction += 1
+                # Counting rows on every insert is wasteful; check periodically instead
+                if self._puts_since_eviction >= max(1, self.max_entries // 100):
+                    self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                if self._conn is not None:
+                    self._conn.rollback()
+                logger.warning(f"Failed to store a reply cache entry: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        self._puts_since_eviction = 0
+        conn.execute("DELETE FROM reply_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM reply_cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM reply_cache WHERE key IN "
+                "(SELECT key FROM reply_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and hit rate, overall and per stage
+        """
+        with self._lock:
+            stages = {}
+            hits = misses = 0
+            for stage, counters in self._stage_stats.items():
+                total = counters["hits"] + counters["misses"]
+                stages[stage] = {**counters, "hit_rate": counters["hits"] / total if total else 0.0}
+                hits += counters["hits"]
+                misses += counters["misses"]
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "stages": stages
+            }
+
+    def clear(self) -> None:
+        """
+        Remove every cached entry and reset the counters
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM reply_cache")
+            conn.commit()
+            self._stage_stats = {}
+
+class ScopedReplyCache:
+    """
+    View of a ReplyCache bound to one model configuration
+
+    Keys combine the stage, its prompt version, the model settings and the
+    normalized email body, plus any extra inputs the stage depends on.
+    """
+
+    def __init__(self, store: ReplyCache, model_name: str, temperature: float, analysis_mode: str = "separate"):
+        self.store = store
+        self.model_name = model_name
+        self.temperature = temperature
+        self.analysis_mode = analysis_mode
+
+    def _key(self, stage: str, email_body: str, extra: tuple) -> str:
+        if stage == PIPELINE_STAGE:
+            prompt_version = [self.analysis_mode, sorted(PROMPT_VERSIONS.items())]
+        else:
+            prompt_version = PROMPT_VERSIONS.get(stage)
+        material = json.dumps(
+            [stage, prompt_version, self.model_name, self.temperature, normalize_email_body(email_body), list(extra)],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, stage: str, email_body: str, *extra) -> Optional[Any]:
+        return self.store.get(self._key(stage, email_body, extra), stage)
+
+    def put(self, stage: str, email_body: str, value: Any, *extra) -> None:
+        self.store.put(self._key(stage, email_body, extra), stage, value)
+
+_stores: Dict[str, ReplyCache] = {}
+_stores_lock = threading.Lock()
+
+def get_reply_cache_store(config: Dict[str, Any]) -> ReplyCache:
+    """
+    Return the process-wide cache store for the configured path
+    """
+    path = config.get("reply_cache_path", DEFAULT_CACHE_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ReplyCache(
+                path,
+                max_entries=config.get("reply_cache_max_entries", 50000),
+                ttl_seconds=config.get("reply_cache_ttl_days", 30) * 86400
+            )
+            _stores[path] = store
+        return store
+
+def cache_replies_enabled(config: Dict[str, Any]) -> bool:
+    """
+    Whether the "Cache Replies" setting (advanced.cache_replies) is on
+    """
+    return bool((config.get("advanced") or {}).get("cache_replies", True))
+
+def create_scoped_cache(config: Dict[str, Any]) -> Optional[ScopedReplyCache]:
+    """
+    Build the cache view for a configuration, or None when caching is disabled
+    """
+    if not cache_replies_enabled(config):
+        return None
+    return ScopedReplyCache(
+        get_reply_cache_store(config),
+        config.get("model_name", "gpt-3.5-turbo"),
+        config.get("model_temperature", 0.3),
+        config.get("analysis_mode", "separate")
+    )
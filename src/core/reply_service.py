@@ -1,13 +1,149 @@
-from .langgraph_workflow import build_email_graph
+import logging
 
-def generate_reply(email_data):
-    graph = build_email_graph()
-    result = graph.invoke({"email_body": email_data["email_body"]})
+from .body_normalizer import normalization_settings, normalize_body
+from .graph_registry import get_email_pipeline, get_graph_registry
+from .job_scheduler import get_job_scheduler, scheduled_lane
+from .reply_cache import PIPELINE_STAGE
 
+logger = logging.getLogger(__name__)
+
+def prompt_body(email_data):
+    """
+    The email body as sent to the model
+
+    Quoted history, signatures and HTML are stripped and the text is cut to
+    the body_max_tokens budget (see body_normalizer). The token counts are
+    recorded in email_data["body_tokens"], including tokens_saved.
+    """
+    settings = normalization_settings(get_graph_registry().get_config() or {})
+    if settings is None:
+        return email_data["email_body"]
+    normalized = normalize_body(email_data["email_body"], **settings)
+    email_data["body_tokens"] = {
+        key: normalized[key] for key in ("original_tokens", "tokens", "tokens_saved", "truncated")
+    }
+    logger.debug(f"Body normalized from {normalized['original_tokens']} to {normalized['tokens']} tokens")
+    return normalized["text"]
+
+class ReplyResult(tuple):
+    """
+    (category, intent, entities, reply), unpacked like a plain tuple
+
+    degraded is True when a node fell back to its default output because
+    the LLM call failed, so callers that can retry (the job queue) know
+    the reply is the canned fallback.
+    """
+
+    def __new__(cls, values, degraded=False):
+        result = super().__new__(cls, values)
+        result.degraded = degraded
+        return result
+
+def _unpack_result(result):
     # Extract the fields from the result dictionary
     category = result["category"]
     intent = result["intent"]
     entities = result["entities"]
     reply = result["reply"]
 
-    return category, intent, entities, reply
+    return ReplyResult((category, intent, entities, reply), bool(result.get("degraded")))
+
+def _cached_reply(cache, body):
+    if cache is None:
+        return None
+    cached = cache.get(PIPELINE_STAGE, body)
+    return ReplyResult(cached) if cached is not None else None
+
+def _store_reply(cache, body, result):
+    unpacked = _unpack_result(result)
+    # Never cache fallback output produced while the API was failing
+    if cache is not None and not result.get("degraded"):
+        cache.put(PIPELINE_STAGE, body, list(unpacked))
+    return unpacked
+
+def generate_reply(email_data, lane="interactive", timeout=None):
+    """
+    Run the pipeline for one email once the job scheduler admits it
+
+    Cached replies are returned without queueing. lane is a job_scheduler
+    lane (None picks urgent or bulk from the email); with a timeout, the
+    job is dropped or deferred if it has not started within that many
+    seconds.
+    """
+    graph, cache = get_email_pipeline()
+    body = prompt_body(email_data)
+    cached = _cached_reply(cache, body)
+    if cached is not None:
+        return cached
+
+    with get_job_scheduler().slot(scheduled_lane(email_data, lane), timeout):
+        result = graph.invoke({"email_body": body})
+    return _store_reply(cache, body, result)
+
+async def generate_reply_async(email_data, lane=None, timeout=None):
+    """
+    Async variant of generate_reply; every LLM call is awaited via ainvoke,
+    so many emails can be in flight on a single event loop. Backlog emails
+    are triaged into the urgent or bulk lane by default.
+    """
+    graph, cache = get_email_pipeline()
+    body = prompt_body(email_data)
+    cached = _cached_reply(cache, body)
+    if cached is not None:
+        return cached
+
+    async with get_job_scheduler().aslot(scheduled_lane(email_data, lane), timeout):
+        result = await graph.ainvoke({"email_body": body})
+    return _store_reply(cache, body, result)
+
+# Graph node whose LLM tokens are streamed to the user
+STREAMED_NODE = "generate_reply"
+
+class ReplyStream:
+    """
+    Streaming variant of generate_reply
+
+    Iterating yields the reply text as the LLM produces it; classification
+    and extraction run first, so the first token arrives as soon as the
+    reply node starts. Once exhausted, `result` holds the same
+    (category, intent, entities, reply) tuple generate_reply returns, with
+    the complete reply for logging. Replies served from a cache, or the
+    fallback reply, arrive as a single chunk.
+    """
+
+    def __init__(self, email_data, lane="interactive", timeout=None):
+        self.email_data = email_data
+        self.lane = lane
+        self.timeout = timeout
+        self.result = None
+
+    def __iter__(self):
+        graph, cache = get_email_pipeline()
+        body = prompt_body(self.email_data)
+        cached = _cached_reply(cache, body)
+        if cached is not None:
+            self.result = cached
+            yield cached[3]
+            return
+
+        streamed = False
+        final_state = None
+        with get_job_scheduler().slot(scheduled_lane(self.email_data, self.lane), self.timeout):
+            for mode, payload in graph.stream({"email_body": body}, stream_mode=["messages", "values"]):
+                if mode == "values":
+                    final_state = payload
+                    continue
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == STREAMED_NODE and chunk.content:
+                    streamed = True
+                    yield chunk.content
+
+        self.result = _store_reply(cache, body, final_state)
+        if not streamed:
+            yield self.result[3]
+
+def stream_reply(email_data, lane="interactive", timeout=None):
+    """
+    Return a ReplyStream for an email; iterate it for tokens, then read .result
+    """
+    return ReplyStream(email_data, lane, timeout)
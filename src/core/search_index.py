@@ -0,0 +1,218 @@
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.helpers import load_config_or_defaults
+from .log_views import LogView
+
+DEFAULT_SEARCH_INDEX_PATH = "data/logs/reply_search.sqlite"
+
+# bm25 weights for subject, email_body and reply: a hit in the subject says
+# more about what the email is about than one in a long body
+COLUMN_WEIGHTS = (5.0, 1.0, 2.0)
+
+_TERM_RE = re.compile(r"[\w']+\*?", re.UNICODE)
+
+def build_match_query(text: str, prefix_last: bool = False) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all of its words
+
+    Words are quoted so punctuation and FTS5 operators in user input are
+    taken literally. A trailing '*' makes a word a prefix query; with
+    prefix_last the final word always is, for search-as-you-type.
+
+    Returns:
+        The MATCH expression, or None when the text has no words
+    """
+    terms = _TERM_RE.findall(text or "")
+    if not terms:
+        return None
+    parts = []
+    for index, term in enumerate(terms):
+        prefix = term.endswith("*") or (prefix_last and index == len(terms) - 1)
+        word = term.rstrip("*").replace('"', '""')
+        parts.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(parts)
+
+class ReplySearchIndex(LogView):
+    """
+    SQLite FTS5 full-text index over logged subjects, email bodies and replies
+
+    Results are ranked with bm25 and can be restricted by category and
+    timestamp range. Two- and three-character prefix indexes keep prefix
+    queries such as 'refu*' fast. Rebuilds fill a separate table that is
+    renamed over the live one, so searches keep answering meanwhile.
+    """
+
+    name = "search index"
+
+    def __init__(self, path: str = DEFAULT_SEARCH_INDEX_PATH):
+        super().__init__(path)
+
+    def _create_tables(self, conn: sqlite3.Connection) -> None:
+        conn.execute(_fts_schema("reply_fts"))
+
+    def add(self, records: Iterable[Dict[str, Any]], versions: Optional[tuple] = None) -> bool:
+        """
+        Index logged records
+
+        Args:
+            records: Records just appended to the log
+            versions: (before, after) store versions returned by append_many
+
+        Returns:
+            False when the index did not reflect "before" and was left
+            stale for sync_with() instead of being updated
+        """
+        rows = [_to_row(record) for record in records]
+        if not rows:
+            return True
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if versions is not None and not self._advance_mark(conn, versions):
+                    return False
+                _insert(conn, "reply_fts", rows)
+        return True
+
+    def total(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM reply_fts").fetchone()[0]
+
+    def _stage(self, records: Iterable[Dict[str, Any]], batch_size: int = 5000) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS reply_fts_build")
+                conn.execute(_fts_schema("reply_fts_build"))
+        batch = []
+        for record in records:
+            batch.append(_to_row(record))
+            if len(batch) >= batch_size:
+                self._stage_batch(batch)
+                batch = []
+        self._stage_batch(batch)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT INTO reply_fts_build (reply_fts_build) VALUES ('optimize')")
+            conn.commit()
+
+    def _stage_batch(self, rows: List[tuple]) -> None:
+        # The lock is taken per batch so searches are served between them
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                _insert(conn, "reply_fts_build", rows)
+
+    def _replace(self, conn: sqlite3.Connection, staged: None) -> None:
+        conn.execute("DROP TABLE reply_fts")
+        conn.execute("ALTER TABLE reply_fts_build RENAME TO reply_fts")
+
+    def search(self, text: str, category: Optional[str] = None, start: Optional[str] = None,
+               end: Optional[str] = None, limit: Optional[int] = 20, offset: int = 0,
+               prefix_last: bool = False) -> Dict[str, Any]:
+        """
+        Return ranked matches for free text and the number of matches
+
+        Args:
+            text: Words to find; 'word*' is a prefix query
+            category: Only replies with this category
+            start: Inclusive lower timestamp bound
+            end: Exclusive upper timestamp bound
+            limit: Page size, or None for every match
+            offset: Number of matches to skip
+            prefix_last: Treat the last word as a prefix
+
+        Returns:
+            {"rows": list of records with a snippet and score, "total": int}
+        """
+        match = build_match_query(text, prefix_last)
+        if not match:
+            return {"rows": [], "total": 0}
+
+        clauses, params = ["reply_fts MATCH ?"], [match]
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        where = " AND ".join(clauses)
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM reply_fts WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT timestamp, subject, category, intent, reply, email_body, "
+                "snippet(reply_fts, -1, '**', '**', '…', 12), bm25(reply_fts, " + weights + ") AS score "
+                f"FROM reply_fts WHERE {where} ORDER BY score LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+
+        columns = ["timestamp", "subject", "category", "intent", "reply", "email_body", "snippet", "score"]
+        records: List[Dict[str, Any]] = [dict(zip(columns, row)) for row in rows]
+        for record in records:
+            # bm25 is lower-is-better; flip it so larger scores rank higher
+            record["score"] = -record["score"]
+        return {"rows": records, "total": total}
+
+def _fts_schema(table: str) -> str:
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        "subject, email_body, reply, timestamp UNINDEXED, category UNINDEXED, intent UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+def _to_row(record: Dict[str, Any]) -> tuple:
+    return (
+        record.get("subject") or "",
+        record.get("email_body") or "",
+        record.get("reply") or "",
+        str(record["timestamp"]),
+        record.get("category", "Unknown"),
+        record.get("intent", "Unknown")
+    )
+
+def _insert(conn: sqlite3.Connection, table: str, rows: List[tuple]) -> None:
+    conn.executemany(
+        f"INSERT INTO {table} (subject, email_body, reply, timestamp, category, intent) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+
+_indexes: Dict[str, ReplySearchIndex] = {}
+_indexes_lock = threading.Lock()
+_default_index = None
+_default_enabled = None
+
+def search_index_enabled(config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Whether the log writer keeps the full-text index up to date
+    """
+    global _default_enabled
+    if config is None:
+        if _default_enabled is None:
+            _default_enabled = search_index_enabled(load_config_or_defaults())
+        return _default_enabled
+    return bool(config.get("search_index_enabled", True))
+
+def get_search_index(config: Optional[Dict[str, Any]] = None) -> ReplySearchIndex:
+    """
+    Return the shared full-text index for the configured path
+    """
+    global _default_index
+    if config is None:
+        if _default_index is None:
+            _default_index = get_search_index(load_config_or_defaults())
+        return _default_index
+
+    path = config.get("search_index_path", DEFAULT_SEARCH_INDEX_PATH)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = ReplySearchIndex(path)
+        return _indexes[path]
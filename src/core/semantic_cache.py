@@ -0,0 +1,256 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .langgraph_workflow import PROMPT_VERSIONS
+from .reply_cache import DEFAULT_CACHE_PATH, cache_replies_enabled
+
+FINGERPRINT_BITS = 64
+
+# Bodies with fewer shingles than this are too generic to be matched safely
+MIN_SHINGLES = 8
+
+_TOKEN_RE = re.compile(r"[a-z#']+")
+_DIGITS_RE = re.compile(r"\d+")
+_GREETING_RE = re.compile(r"^\s*(hi|hello|hey|dear|good (morning|afternoon|evening))\b[^\n]{0,40}$", re.IGNORECASE)
+_SIGN_OFF_RE = re.compile(
+    r"^\s*(thanks|thank you|many thanks|best|regards|best regards|kind regards|cheers|sincerely)[,.!]?\s*$",
+    re.IGNORECASE
+)
+
+def _split_greeting_and_sign_off(body: str) -> Tuple[List[str], str, List[str]]:
+    lines = body.strip().splitlines()
+    greeting = []
+    while lines and (not lines[0].strip() or _GREETING_RE.match(lines[0])):
+        greeting.append(lines.pop(0))
+    sign_off = []
+    # Only look for a sign-off near the end so it cannot swallow the message
+    for index in range(len(lines) - 1, max(-1, len(lines) - 7), -1):
+        if _SIGN_OFF_RE.match(lines[index]):
+            sign_off = lines[index:]
+            del lines[index:]
+            break
+    return greeting, "\n".join(lines), sign_off
+
+def email_shingles(body: str, size: int = 3) -> List[str]:
+    """
+    Split an email body into word shingles
+
+    The greeting line and sign-off block are dropped and digit runs collapse
+    to '#', so emails that differ only in who they are from or in order
+    numbers, dates or amounts produce the same shingles; email_details()
+    keeps those apart.
+    """
+    text = _split_greeting_and_sign_off(body)[1]
+    tokens = _TOKEN_RE.findall(_DIGITS_RE.sub("#", text.lower()))
+    if len(tokens) < size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+def email_details(body: str) -> str:
+    """
+    Digest of what the fingerprint ignores: greeting, sign-off and digits
+
+    A stored reply is written for one sender and one set of order numbers,
+    dates and amounts, so it is only reused for an email with the same
+    details.
+    """
+    greeting, text, sign_off = _split_greeting_and_sign_off(body)
+    parts = [" ".join(line.lower().split()) for line in greeting + sign_off if line.strip()]
+    parts.extend(_DIGITS_RE.findall(text))
+    return hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def simhash(shingles: List[str]) -> int:
+    """
+    64-bit SimHash fingerprint; similar shingle sets give fingerprints with a
+    small Hamming distance
+    """
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+class SemanticReplyCache:
+    """
+    Near-duplicate reply cache indexed with SimHash locality-sensitive hashing
+
+    Each fingerprint is split into `bands` equal slices that are indexed
+    separately. By the pigeonhole principle any stored email within
+    `bands - 1` differing bits shares at least one slice with the query, so
+    a lookup only examines rows from a handful of index probes instead of
+    scanning the log. Only emails of the same category and with the same
+    email_details() are considered, so a reply addressed to one customer
+    or order is never handed to another.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, scope: str = "", threshold: float = 0.95,
+                 bands: int = 4, ttl_seconds: float = 30 * 86400):
+        if FINGERPRINT_BITS % bands:
+            raise ValueError(f"bands must divide {FINGERPRINT_BITS}")
+        self.path = path
+        self.scope = scope
+        self.threshold = threshold
+        self.bands = bands
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.candidates_examined = 0
+        self._band_bits = FINGERPRINT_BITS // bands
+        self._conn = None
+        self._lock = threading.Lock()
+        self._inserts_since_purge = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_entries ("
+                "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, category TEXT NOT NULL, "
+                "fingerprint INTEGER NOT NULL, reply TEXT NOT NULL, created_at REAL NOT NULL, details TEXT)"
+            )
+            # Entries stored before details were recorded never match
+            if "details" not in {row[1] for row in conn.execute("PRAGMA table_info(semantic_entries)")}:
+                conn.execute("ALTER TABLE semantic_entries ADD COLUMN details TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_semantic_entries_created ON semantic_entries (created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_bands ("
+                "scope TEXT NOT NULL, category TEXT NOT NULL, band INTEGER NOT NULL, "
+                "value INTEGER NOT NULL, entry_id INTEGER NOT NULL, "
+                "PRIMARY KEY (scope, category, band, value, entry_id)) WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self._band_bits) - 1
+        return [fingerprint >> (band * self._band_bits) & mask for band in range(self.bands)]
+
+    def lookup(self, email_body: str, category: str) -> Optional[str]:
+        """
+        Return the reply of the most similar stored email of the same
+        category, or None when nothing is above the similarity threshold
+        """
+        shingles = email_shingles(email_body)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+
+        fingerprint = simhash(shingles)
+        probes = list(enumerate(self._band_values(fingerprint)))
+        placeholders = ", ".join("(?, ?)" for _ in probes)
+        params = [self.scope, category] + [value for probe in probes for value in probe]
+        params.extend([time.time() - self.ttl_seconds, email_details(email_body)])
+
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT e.fingerprint, e.reply FROM semantic_entries e WHERE e.id IN ("
+                "SELECT entry_id FROM semantic_bands WHERE scope = ? AND category = ? "
+                f"AND (band, value) IN (VALUES {placeholders})) AND e.created_at >= ? AND e.details = ?",
+                params
+            ).fetchall()
+
+            best_reply, best_similarity = None, 0.0
+            for stored, reply in rows:
+                similarity = 1.0 - hamming_distance(fingerprint, _to_unsigned(stored)) / FINGERPRINT_BITS
+                if similarity > best_similarity:
+                    best_reply, best_similarity = reply, similarity
+
+            self.candidates_examined += len(rows)
+            if best_reply is not None and best_similarity >= self.threshold:
+                self.hits += 1
+                return best_reply
+            self.misses += 1
+            return None
+
+    def add(self, email_body: str, category: str, reply: str) -> None:
+        """
+        Index a handled email so later near-duplicates can reuse its reply
+        """
+        shingles = email_shingles(email_body)
+        if len(shingles) < MIN_SHINGLES:
+            return
+
+        fingerprint = simhash(shingles)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO semantic_entries (scope, category, fingerprint, reply, created_at, details) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.scope, category, _to_signed(fingerprint), reply, now, email_details(email_body))
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO semantic_bands (scope, category, band, value, entry_id) VALUES (?, ?, ?, ?, ?)",
+                [(self.scope, category, band, value, cursor.lastrowid) for band, value in enumerate(self._band_values(fingerprint))]
+            )
+            self._inserts_since_purge += 1
+            if self._inserts_since_purge >= 1000:
+                self._purge_expired(conn, now)
+            conn.commit()
+
+    def _purge_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        self._inserts_since_purge = 0
+        cutoff = now - self.ttl_seconds
+        conn.execute(
+            "DELETE FROM semantic_bands WHERE entry_id IN (SELECT id FROM semantic_entries WHERE created_at < ?)",
+            (cutoff,)
+        )
+        conn.execute("DELETE FROM semantic_entries WHERE created_at < ?", (cutoff,))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and the average number of candidates per lookup
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_candidates": self.candidates_examined / lookups if lookups else 0.0
+            }
+
+def create_semantic_cache(config: Dict[str, Any]) -> Optional[SemanticReplyCache]:
+    """
+    Build the near-duplicate cache for a configuration, or None when disabled
+    """
+    if not cache_replies_enabled(config) or not config.get("semantic_cache_enabled", False):
+        return None
+    scope = "|".join([
+        str(config.get("model_name", "gpt-3.5-turbo")),
+        str(config.get("model_temperature", 0.3)),
+        f"reply:{PROMPT_VERSIONS['reply']}"
+    ])
+    return SemanticReplyCache(
+        config.get("reply_cache_path", DEFAULT_CACHE_PATH),
+        scope=scope,
+        threshold=config.get("semantic_cache_threshold", 0.95),
+        bands=config.get("semantic_cache_bands", 4),
+        ttl_seconds=config.get("reply_cache_ttl_days", 30) * 86400
+    )
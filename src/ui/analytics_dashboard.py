@@ -1,31 +1,33 @@
 import streamlit as st
 import pandas as pd
-from src.utils.helpers import (
-    load_reply_data,
-    create_category_chart,
-    create_timeline_chart,
-    create_intent_chart,
-    get_reply_statistics,
-    analyze_reply_quality,
+from src.utils.helpers import export_replies_csv, search_replies
+from src.ui.ui_cache import (
+    get_reply_page,
+    get_search_page,
+    get_cached_reply_rollups,
+    get_cached_reply_date_range,
+    get_cached_analytics_charts,
 )
 import plotly.express as px
 from datetime import datetime, timedelta
 
+# Rows per page in the detailed data table
+DETAIL_PAGE_SIZE = 50
+
 def show_analytics_page():
     """
     Display the analytics dashboard page
     """
     st.markdown('<h1 class="main-header">📊 Analytics Dashboard</h1>', unsafe_allow_html=True)
     
-    # Load data
-    df = load_reply_data()
+    # Dates covered by the log, without loading it
+    date_range = get_cached_reply_date_range()
     
-    if df.empty:
+    if not date_range:
         st.warning("📭 No reply data found. Generate some replies first to see analytics!")
         return
     
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    first_date, last_date = date_range
     
     # Date range filter
     st.subheader("📅 Date Range Filter")
@@ -34,56 +36,50 @@ def show_analytics_page():
     with col1:
         start_date = st.date_input(
             "Start Date",
-            value=df['timestamp'].min().date(),
-            min_value=df['timestamp'].min().date(),
-            max_value=df['timestamp'].max().date()
+            value=first_date,
+            min_value=first_date,
+            max_value=last_date
         )
     
     with col2:
         end_date = st.date_input(
             "End Date",
-            value=df['timestamp'].max().date(),
-            min_value=df['timestamp'].min().date(),
-            max_value=df['timestamp'].max().date()
+            value=last_date,
+            min_value=first_date,
+            max_value=last_date
         )
     
-    # Filter data by date range
-    filtered_df = df[
-        (df['timestamp'].dt.date >= start_date) & 
-        (df['timestamp'].dt.date <= end_date)
-    ]
+    # Metrics and charts come from the per-day rollups, not the raw log
+    rollup = get_cached_reply_rollups(start_date, end_date)
+    charts = get_cached_analytics_charts(start_date, end_date)
     
-    if filtered_df.empty:
+    if rollup["total"] == 0:
         st.warning("No data found for the selected date range.")
         return
     
     # Key metrics
     st.subheader("📈 Key Metrics")
     
-    stats = get_reply_statistics(filtered_df)
-    quality_metrics = analyze_reply_quality(filtered_df)
-    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Replies", stats.get('total_replies', 0))
+        st.metric("Total Replies", rollup["total"])
     
     with col2:
-        st.metric("Unique Categories", stats.get('unique_categories', 0))
+        st.metric("Unique Categories", len(rollup["categories"]))
     
     with col3:
-        avg_length = stats.get('avg_reply_length', 0)
-        st.metric("Avg Reply Length", f"{avg_length:.0f} chars")
+        st.metric("Avg Reply Length", f"{rollup['avg_length']:.0f} chars")
     
     with col4:
-        most_common = stats.get('most_common_category', 'None')
+        most_common = next(iter(rollup["categories"]), 'None')
         st.metric("Most Common Category", most_common)
     
     # Charts
     st.subheader("📊 Visualizations")
     
     # Timeline chart
-    timeline_fig = create_timeline_chart(filtered_df)
+    timeline_fig = charts["timeline"]
     if timeline_fig:
         st.plotly_chart(timeline_fig, use_container_width=True)
     
@@ -91,88 +87,109 @@ def show_analytics_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        category_fig = create_category_chart(filtered_df)
+        category_fig = charts["category"]
         if category_fig:
             st.plotly_chart(category_fig, use_container_width=True)
     
     with col2:
-        intent_fig = create_intent_chart(filtered_df)
+        intent_fig = charts["intent"]
         if intent_fig:
             st.plotly_chart(intent_fig, use_container_width=True)
     
     # Reply quality analysis
     st.subheader("🔍 Reply Quality Analysis")
     
-    if quality_metrics:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("Short Replies (<50 chars)", quality_metrics.get('short_replies', 0))
-        
-        with col2:
-            st.metric("Medium Replies (50-200 chars)", quality_metrics.get('medium_replies', 0))
-        
-        with col3:
-            st.metric("Long Replies (>200 chars)", quality_metrics.get('long_replies', 0))
-        
-        # Reply length distribution
-        reply_lengths = filtered_df['reply'].str.len()
-        
-        fig = px.histogram(
-            x=reply_lengths,
-            nbins=20,
-            title="Reply Length Distribution",
-            labels={'x': 'Reply Length (characters)', 'y': 'Count'}
-        )
-        
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Short Replies (<50 chars)", rollup["short_replies"])
+    
+    with col2:
+        st.metric("Medium Replies (50-200 chars)", rollup["medium_replies"])
+    
+    with col3:
+        st.metric("Long Replies (>200 chars)", rollup["long_replies"])
+    
+    # Reply length distribution
+    histogram = rollup["length_histogram"]
+    
+    fig = px.bar(
+        x=list(histogram.keys()),
+        y=list(histogram.values()),
+        title="Reply Length Distribution",
+        labels={'x': 'Reply Length (characters)', 'y': 'Count'}
+    )
+    
+    fig.update_layout(height=400, bargap=0)
+    st.plotly_chart(fig, use_container_width=True)
     
     # Detailed data table
     st.subheader("📋 Detailed Data")
     
     # Add search and filter options
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([2, 2, 1])
     
     with col1:
         category_filter = st.selectbox(
             "Filter by Category",
-            ["All"] + list(filtered_df["category"].unique())
+            ["All"] + list(rollup["categories"])
         )
     
     with col2:
-        search_term = st.text_input("Search in subjects or replies", "")
+        search_term = st.text_input(
+            "Search subjects, emails and replies",
+            "",
+            help="Matches whole words; end a word with * to match prefixes"
+        )
     
-    # Apply filters
-    display_df = filtered_df.copy()
+    # Search terms go to the full-text index (ranked, prefix-matched as you
+    # type, or a log substring search when the index is disabled); otherwise
+    # the log store pages through the filtered rows
+    filters = {
+        "category": None if category_filter == "All" else category_filter,
+        "start": str(start_date),
+        "end": str(end_date + timedelta(days=1)),
+    }
+    if search_term:
+        _, matching = get_search_page(search_term, **filters, page_size=0)
+    else:
+        _, matching = get_reply_page(**filters, page_size=0)
+    page_count = max(1, -(-matching // DETAIL_PAGE_SIZE))
     
-    if category_filter != "All":
-        display_df = display_df[display_df["category"] == category_filter]
+    with col3:
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
     
     if search_term:
-        mask = (
-            display_df["subject"].str.contains(search_term, case=False, na=False) |
-            display_df["reply"].str.contains(search_term, case=False, na=False)
+        display_df, _ = get_search_page(search_term, **filters, page=int(page_number), page_size=DETAIL_PAGE_SIZE)
+        if not display_df.empty:
+            display_df = display_df[["timestamp", "subject", "category", "intent", "snippet"]]
+        export = lambda: search_replies(search_term, **filters, page_size=None)[0].drop(columns=["snippet"]).to_csv(index=False)
+    else:
+        display_df, _ = get_reply_page(
+            **filters,
+            page=int(page_number),
+            page_size=DETAIL_PAGE_SIZE,
+            columns=["timestamp", "subject", "category", "intent", "reply"]
+        )
+        export = lambda: export_replies_csv(
+            **filters,
+            columns=["timestamp", "subject", "email_body", "category", "intent", "entities", "reply", "reply_length"]
         )
-        display_df = display_df[mask]
     
     # Show filtered data
     if not display_df.empty:
-        # Select columns to display
-        display_columns = ["timestamp", "subject", "category", "intent", "reply"]
-        available_columns = [col for col in display_columns if col in display_df.columns]
-        
+        st.caption(f"{matching} matching replies, {'best match' if search_term else 'newest'} first")
         st.dataframe(
-            display_df[available_columns].sort_values("timestamp", ascending=False),
+            display_df,
             use_container_width=True,
             height=400
         )
         
-        # Download option
-        csv_data = display_df.to_csv(index=False)
+        # Download option; the CSV is only built when the button is clicked
+        # (callable data needs streamlit 1.52+)
         st.download_button(
             label="📥 Download Filtered Data",
-            data=csv_data,
+            data=export,
             file_name=f"email_analytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv"
         )
@@ -182,25 +199,25 @@ def show_analytics_page():
     # Insights section
     st.subheader("💡 Insights")
     
-    if not filtered_df.empty:
-        # Most active day
-        most_active_day = filtered_df.groupby(filtered_df['timestamp'].dt.date).size().idxmax()
-        st.write(f"**Most Active Day:** {most_active_day} ({filtered_df.groupby(filtered_df['timestamp'].dt.date).size().max()} replies)")
-        
-        # Category insights
-        category_dist = filtered_df['category'].value_counts()
-        if len(category_dist) > 0:
-            st.write(f"**Most Common Category:** {category_dist.index[0]} ({category_dist.iloc[0]} replies)")
-        
-        # Intent insights
-        intent_dist = filtered_df['intent'].value_counts()
-        if len(intent_dist) > 0:
-            st.write(f"**Most Common Intent:** {intent_dist.index[0]} ({intent_dist.iloc[0]} replies)")
-        
-        # Reply length insights
-        avg_len = filtered_df['reply'].str.len().mean()
-        st.write(f"**Average Reply Length:** {avg_len:.0f} characters")
-        
-        # Recent activity
-        recent_replies = filtered_df[filtered_df['timestamp'] >= datetime.now() - timedelta(days=7)]
-        st.write(f"**Replies in Last 7 Days:** {len(recent_replies)}") 
\ No newline at end of file
+    # Most active day
+    daily_counts = rollup["daily_counts"]
+    most_active_day = max(daily_counts, key=daily_counts.get)
+    st.write(f"**Most Active Day:** {most_active_day} ({daily_counts[most_active_day]} replies)")
+    
+    # Category insights
+    if rollup["categories"]:
+        category, count = next(iter(rollup["categories"].items()))
+        st.write(f"**Most Common Category:** {category} ({count} replies)")
+    
+    # Intent insights
+    if rollup["intents"]:
+        intent, count = next(iter(rollup["intents"].items()))
+        st.write(f"**Most Common Intent:** {intent} ({count} replies)")
+    
+    # Reply length insights
+    st.write(f"**Average Reply Length:** {rollup['avg_length']:.0f} characters")
+    
+    # Recent activity
+    week_ago = str((datetime.now() - timedelta(days=7)).date())
+    recent_replies = sum(count for day, count in daily_counts.items() if day >= week_ago)
+    st.write(f"**Replies in Last 7 Days:** {recent_replies}")
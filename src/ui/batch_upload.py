@@ -0,0 +1,121 @@
+import logging
+import queue
+import streamlit as st
+import pandas as pd
+from src.core.batch_processor import process_emails
+from src.core.email_ingestion import iter_upload
+from src.core.llm_client import run_on_shared_loop
+from src.utils.helpers import export_replies_zip
+
+logger = logging.getLogger(__name__)
+
+def parse_uploads(uploaded_files):
+    """
+    Parse every uploaded .txt, .eml or .zip file in memory
+
+    Returns:
+        ([(source_id, email_data)], [failure records for files that did not parse])
+    """
+    emails, failures = [], []
+    for uploaded_file in uploaded_files:
+        try:
+            emails.extend(iter_upload(uploaded_file.name, uploaded_file.getbuffer()))
+        except Exception as e:
+            logger.warning(f"Failed to parse {uploaded_file.name}: {e}")
+            failures.append({"source": uploaded_file.name, "subject": None, "error": f"Could not parse: {e}"})
+    return emails, failures
+
+def show_batch_upload(uploaded_files, config, auto_save=True):
+    """
+    Generate replies for several uploaded emails concurrently
+
+    Emails go through the async reply pipeline, on the shared event loop,
+    with ui_batch_concurrency replies in flight; each row appears as its
+    reply finishes. Parsed uploads and results are kept in the session so reruns
+    neither re-parse the files nor lose the download.
+    """
+    batch_key = tuple((uploaded_file.name, uploaded_file.size) for uploaded_file in uploaded_files)
+    # Streamlit reruns the script on every interaction; parse each upload set once
+    parsed = st.session_state.get("batch_uploads")
+    if parsed is None or parsed["key"] != batch_key:
+        emails, parse_failures = parse_uploads(uploaded_files)
+        parsed = {"key": batch_key, "emails": emails, "failures": parse_failures}
+        st.session_state["batch_uploads"] = parsed
+    emails, parse_failures = parsed["emails"], parsed["failures"]
+
+    st.subheader("📧 Uploaded Emails")
+    st.info(f"{len(emails)} emails found in {len(uploaded_files)} files")
+    for failure in parse_failures:
+        st.warning(f"⚠️ {failure['source']}: {failure['error']}")
+    if not emails:
+        return
+
+    concurrency = st.slider(
+        "Parallel replies",
+        min_value=1,
+        max_value=32,
+        value=int(config.get("ui_batch_concurrency", 4)),
+        help="Number of emails sent to the reply pipeline at once"
+    )
+
+    saved = st.session_state.get("batch_results")
+    if saved is not None and saved["key"] != batch_key:
+        saved = None
+
+    if st.button(f"🚀 Generate {len(emails)} AI Replies", type="primary", use_container_width=True):
+        if not config.get("openai_api_key") or config["openai_api_key"] == "your-openai-api-key-here":
+            st.error("❌ OpenAI API key not configured. Please set your API key in config/app_config.yaml")
+            st.info("💡 Go to Settings page to configure your API key")
+            st.stop()
+
+        progress = st.progress(0.0, text=f"0 of {len(emails)} replies")
+        rows = st.container()
+        records = []
+
+        def show_result(record):
+            records.append(record)
+            progress.progress(len(records) / len(emails), text=f"{len(records)} of {len(emails)} replies")
+            if "error" in record:
+                rows.write(f"❌ **{record['source']}**: {record['error']}")
+            else:
+                rows.write(f"✅ **{record['subject']}** → {record['category']} ({record['latency_seconds']:.1f}s)")
+
+        # Batches run on the process-wide event loop that owns the shared
+        # async HTTP client; results come back through a queue so the page
+        # is only updated from the script thread
+        finished = queue.Queue()
+        try:
+            batch = run_on_shared_loop(process_emails(
+                emails, concurrency=concurrency, log_results=auto_save, on_result=finished.put
+            ))
+            while not (batch.done() and finished.empty()):
+                try:
+                    show_result(finished.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+            summary = batch.result()
+        except Exception as e:
+            logger.error(f"Batch reply generation failed: {e}")
+            st.error(f"❌ Error generating replies: {str(e)}")
+            return
+
+        saved = {"key": batch_key, "records": parse_failures + records, "summary": summary}
+        st.session_state["batch_results"] = saved
+
+    if saved is None:
+        return
+
+    summary = saved["summary"]
+    st.success(
+        f"✅ {summary['processed']} replies generated, {summary['failed']} failed in "
+        f"{summary['elapsed_seconds']:.1f}s ({summary['tokens_saved']} prompt tokens saved)"
+    )
+    results = pd.DataFrame(saved["records"], columns=["source", "subject", "category", "intent", "reply", "error"])
+    st.dataframe(results, use_container_width=True, hide_index=True)
+    st.download_button(
+        "📦 Download All Replies (.zip)",
+        export_replies_zip(saved["records"]),
+        file_name=f"replies_{len(saved['records'])}.zip",
+        mime="application/zip",
+        use_container_width=True
+    )
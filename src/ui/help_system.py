@@ -13,8 +13,11 @@ def show_help_page():
         st.markdown("""
         ### Step 1: Upload an Email
         1. Go to the **Home** page
-        2. Click "Browse files" to upload a `.txt` email file
+        2. Click "Browse files" to upload a `.txt` or `.eml` email file
         3. The email will be automatically parsed and displayed
+        4. To answer many emails at once, upload several files or a `.zip`
+           archive, click "🚀 Generate AI Replies" and download all replies
+           as a zip when they finish
         
         ### Step 2: Generate a Reply
         1. Review the parsed email content
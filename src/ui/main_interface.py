@@ -3,13 +3,16 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.core.email_processor import parse_email
-from src.core.reply_service import generate_reply
+from src.core.email_ingestion import parse_upload_bytes
+from src.core.reply_service import stream_reply
+from src.core.job_scheduler import DeadlineExceeded, QueueFull, get_job_scheduler
 from src.core.data_logger import log_to_csv
+from .ui_cache import get_app_config, get_log_summary, get_reply_page
 from .analytics_dashboard import show_analytics_page
 from .settings_panel import show_settings_page
 from .help_system import show_help_page
-from src.utils.helpers import load_config, safe_api_call
+from .batch_upload import show_batch_upload
+from src.utils.helpers import safe_api_call, export_replies_csv
 import os
 import csv
 import json
@@ -22,9 +25,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load configuration
+# Load configuration (cached until config/app_config.yaml changes)
 try:
-    config = load_config()
+    config = get_app_config()
 except Exception as e:
     st.error(f"Failed to load configuration: {e}")
     st.stop()
@@ -94,22 +97,15 @@ with st.sidebar:
     
     # Statistics
     st.header("📊 Statistics")
-    log_path = "data/logs/reply_log.csv"
-    if os.path.exists(log_path):
-        try:
-            with open(log_path, "r", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-                total_replies = len(rows) - 1 if len(rows) > 1 else 0
-                st.metric("Total Replies", total_replies)
-                
-                if total_replies > 0:
-                    data = [json.loads(row[0]) for row in rows[1:]]
-                    categories = [item.get("category", "Unknown") for item in data]
-                    unique_categories = len(set(categories))
-                    st.metric("Unique Categories", unique_categories)
-        except Exception as e:
-            st.error(f"Error loading statistics: {e}")
+    total_replies = 0
+    try:
+        log_summary = get_log_summary()
+        total_replies = log_summary["total"]
+        st.metric("Total Replies", total_replies)
+        if total_replies > 0:
+            st.metric("Unique Categories", len(log_summary["categories"]))
+    except Exception as e:
+        st.error(f"Error loading statistics: {e}")
 
 # Navigation
 st.sidebar.title("📬 Navigation")
@@ -124,22 +120,24 @@ if page == "🏠 Home":
 
     # File upload section
     st.header("📤 Upload Email")
-uploaded_file = st.file_uploader(
-    "Upload an email (.txt) file", 
-    type=["txt"],
-    help="Upload a text file containing the email content"
+uploaded_files = st.file_uploader(
+    "Upload email (.txt, .eml) files or a .zip of emails", 
+    type=["txt", "eml", "zip"],
+    accept_multiple_files=True,
+    help="Upload one email to review it, or several (or a zip archive) to generate replies in bulk"
 )
 
+# One email opens the single-reply view; several emails or a zip the batch view
+uploaded_file = None
+if len(uploaded_files) == 1 and not uploaded_files[0].name.lower().endswith(".zip"):
+    uploaded_file = uploaded_files[0]
+elif uploaded_files:
+    show_batch_upload(uploaded_files, config, auto_save)
+
 if uploaded_file is not None:
     try:
-        # Read and parse the uploaded email
-        email_content = uploaded_file.read().decode("utf-8")
-        
-        # Save to temporary file
-        with open("temp_email.txt", "w", encoding="utf-8") as f:
-            f.write(email_content)
-        
-        email_data = parse_email("temp_email.txt")
+        # Parse the uploaded email straight from its in-memory buffer
+        email_data = parse_upload_bytes(uploaded_file.name, uploaded_file.getbuffer())
         
         # Display email preview in a better format
         st.subheader("📧 Email Preview")
@@ -150,18 +148,17 @@ if uploaded_file is not None:
             st.markdown("**Subject:**")
             st.info(email_data.get("subject", "No subject"))
             
-            # Extract and display sender if available
-            lines = email_content.split('\n')
-            sender_line = next((line for line in lines if line.lower().startswith("from:")), None)
-            if sender_line:
+            # Display sender if available
+            sender = email_data["headers"].get("from")
+            if sender:
                 st.markdown("**From:**")
-                st.info(sender_line.replace("From:", "").strip())
+                st.info(sender)
         
         with col2:
             st.markdown("**Email Body:**")
             st.text_area(
                 "Email Content",
-                email_data.get("email_body", email_content),
+                email_data.get("email_body", ""),
                 height=200,
                 disabled=True
             )
@@ -176,8 +173,22 @@ if uploaded_file is not None:
                         st.info("💡 Go to Settings page to configure your API key")
                         st.stop()
                     
-                    # Generate reply with retry logic
-                    category, intent, entities, reply = generate_reply(email_data)
+                    st.subheader("🤖 AI-Generated Reply")
+                    
+                    # Stream the reply as it is generated, then swap in the editable box
+                    reply_container = st.empty()
+                    # Requests beyond the scheduler's concurrency wait their turn
+                    scheduler_stats = get_job_scheduler().stats()
+                    if scheduler_stats["saturated"]:
+                        waiting = sum(scheduler_stats["queued"].values())
+                        st.info(f"⏳ {scheduler_stats['running']} replies in progress, {waiting} waiting; yours is next in line")
+                    reply_stream = stream_reply(
+                        email_data,
+                        timeout=config.get("scheduler_interactive_timeout_seconds", 120)
+                    )
+                    with reply_container.container():
+                        st.write_stream(reply_stream)
+                    category, intent, entities, reply = reply_stream.result
                     email_data.update({
                         "category": category,
                         "intent": intent,
@@ -191,12 +202,8 @@ if uploaded_file is not None:
                             logger.warning(f"Failed to save to CSV: {e}")
                             st.warning("⚠️ Reply generated but failed to save to logs")
                     
-                    # Display results
-                    st.subheader("🤖 AI-Generated Reply")
-                    
                     # Reply display with copy functionality
-                    reply_container = st.container()
-                    with reply_container:
+                    with reply_container.container():
                         st.markdown('<div class="reply-box">', unsafe_allow_html=True)
                         st.text_area(
                             "Generated Reply",
@@ -233,6 +240,13 @@ if uploaded_file is not None:
                         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
                         st.metric("Entities Found", len(entities) if isinstance(entities, dict) else 0)
                         st.markdown('</div>', unsafe_allow_html=True)
+
+                    body_tokens = email_data.get("body_tokens")
+                    if body_tokens and body_tokens["tokens_saved"]:
+                        st.caption(
+                            f"✂️ Prompt body trimmed from {body_tokens['original_tokens']} to "
+                            f"{body_tokens['tokens']} tokens ({body_tokens['tokens_saved']} saved)"
+                        )
                     
                     # Detailed entities display
                     if entities and isinstance(entities, dict):
@@ -248,6 +262,10 @@ if uploaded_file is not None:
                     else:
                         st.success("✅ Reply generated successfully!")
                         
+                except (QueueFull, DeadlineExceeded) as e:
+                    logger.warning(f"Reply request not admitted: {e}")
+                    st.error("❌ The reply service is busy right now. Please try again in a moment.")
+                    
                 except Exception as e:
                     logger.error(f"Error generating reply: {e}")
                     st.error(f"❌ Error generating reply: {str(e)}")
@@ -267,52 +285,60 @@ if uploaded_file is not None:
         st.exception(e)
 
 # Show previous replies if log exists
-if os.path.exists(log_path):
+REPLIES_PAGE_SIZE = 25
+
+if total_replies > 0:
     try:
-        with open(log_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            rows = list(reader)
-            if len(rows) > 1:  # Skip header
-                data = [json.loads(row[0]) for row in rows[1:]]
-                df = pd.DataFrame(data)
-                
-                st.subheader("📚 Previous AI-Generated Replies")
-                
-                # Add filters
-                col1, col2 = st.columns(2)
-                with col1:
-                    category_filter = st.selectbox(
-                        "Filter by Category",
-                        ["All"] + list(df["category"].unique())
-                    )
-                
-                with col2:
-                    search_term = st.text_input("Search in subjects", "")
-                
-                # Apply filters
-                filtered_df = df.copy()
-                if category_filter != "All":
-                    filtered_df = filtered_df[filtered_df["category"] == category_filter]
-                
-                if search_term:
-                    filtered_df = filtered_df[filtered_df["subject"].str.contains(search_term, case=False, na=False)]
-                
-                # Display filtered data
-                if not filtered_df.empty:
-                    display_df = filtered_df[["timestamp", "subject", "category", "intent"]].sort_values("timestamp", ascending=False)
-                    st.dataframe(display_df, use_container_width=True)
-                    
-                    # Download option
-                    csv_data = filtered_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download Filtered Data",
-                        data=csv_data,
-                        file_name=f"email_replies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.info("No replies match the selected filters.")
-                    
+        st.subheader("📚 Previous AI-Generated Replies")
+        
+        # Add filters
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            category_filter = st.selectbox(
+                "Filter by Category",
+                ["All"] + sorted(log_summary["categories"])
+            )
+        
+        with col2:
+            search_term = st.text_input("Search in subjects", "")
+        
+        # Filters are applied by the log store, which returns a single page
+        filters = {
+            "category": None if category_filter == "All" else category_filter,
+            "search": search_term or None,
+        }
+        _, matching = get_reply_page(**filters, page_size=0)
+        page_count = max(1, -(-matching // REPLIES_PAGE_SIZE))
+        
+        with col3:
+            page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        
+        display_df, _ = get_reply_page(
+            **filters,
+            page=int(page_number),
+            page_size=REPLIES_PAGE_SIZE,
+            columns=["timestamp", "subject", "category", "intent"]
+        )
+        
+        # Display filtered data
+        if not display_df.empty:
+            first_row = (int(page_number) - 1) * REPLIES_PAGE_SIZE + 1
+            st.caption(f"Showing {first_row}–{first_row + len(display_df) - 1} of {matching} replies")
+            st.dataframe(display_df, use_container_width=True)
+            
+            # Download option; the CSV is only built when the button is clicked
+            st.download_button(
+                label="📥 Download Filtered Data",
+                data=lambda: export_replies_csv(
+                    **filters,
+                    columns=["timestamp", "subject", "category", "intent", "entities", "reply"]
+                ),
+                file_name=f"email_replies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+        else:
+            st.info("No replies match the selected filters.")
+            
     except Exception as e:
         st.error(f"Error loading previous replies: {e}")
 
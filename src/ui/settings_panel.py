@@ -2,6 +2,7 @@ import streamlit as st
 import yaml
 import os
 from datetime import datetime
+from src.ui.ui_cache import get_app_config
 
 def show_settings_page():
     """
@@ -12,12 +13,8 @@ def show_settings_page():
     # Configuration file path
     config_file = "config/app_config.yaml"
     
-    # Load existing config or create default
-    if os.path.exists(config_file):
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f) or {}
-    else:
-        config = {}
+    # Load existing config or create default (cached until the file changes)
+    config = get_app_config(config_file)
     
     st.subheader("🤖 AI Configuration")
     
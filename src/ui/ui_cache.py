@@ -0,0 +1,114 @@
+import hashlib
+import streamlit as st
+from src.core.data_logger import add_log_listener
+from src.core.log_store import get_log_store
+from src.utils.helpers import (
+    load_config,
+    query_replies,
+    search_replies,
+    load_reply_rollups,
+    get_reply_date_range,
+    create_category_chart_from_counts,
+    create_timeline_chart_from_counts,
+    create_intent_chart_from_counts,
+)
+
+CONFIG_PATH = "config/app_config.yaml"
+
+# Streamlit caches shared by every session. Configuration is keyed by a hash
+# of the config file and log-derived data by the log store's version (file
+# identity, mtime and size), so reruns that change neither are served from
+# memory. Log caches are also cleared whenever a batch of replies is written.
+
+def config_hash(path=CONFIG_PATH):
+    """
+    Return a hash of the config file contents, or "" when it is missing
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+@st.cache_data(show_spinner=False)
+def _load_config(path, digest):
+    return load_config(path) or {}
+
+def get_app_config(path=CONFIG_PATH):
+    """
+    Load the application config, re-reading YAML only when the file changes
+    """
+    return _load_config(path, config_hash(path))
+
+def log_version():
+    """
+    Token identifying the current state of the reply log
+    """
+    return get_log_store().version()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _log_summary(version):
+    return get_log_store().summary()
+
+def get_log_summary():
+    return _log_summary(log_version())
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _reply_page(category, search, search_fields, start, end, page, page_size, columns, version):
+    return query_replies(category, search, search_fields, start, end, page, page_size, columns)
+
+def get_reply_page(category=None, search=None, search_fields=("subject",), start=None, end=None,
+                   page=1, page_size=50, columns=None):
+    """
+    One page of logged replies and the total match count; see query_replies
+    """
+    return _reply_page(category, search, tuple(search_fields), start, end, page, page_size,
+                       tuple(columns) if columns else None, log_version())
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _search_page(text, category, start, end, page, page_size, version):
+    return search_replies(text, category, start, end, page, page_size)
+
+def get_search_page(text, category=None, start=None, end=None, page=1, page_size=50):
+    """
+    One page of full-text search results and the match count; see search_replies
+    """
+    return _search_page(text, category, start, end, page, page_size, log_version())
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _reply_date_range(version):
+    return get_reply_date_range()
+
+def get_cached_reply_date_range():
+    return _reply_date_range(log_version())
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _reply_rollups(start, end, version):
+    return load_reply_rollups(start, end)
+
+def get_cached_reply_rollups(start, end):
+    return _reply_rollups(start, end, log_version())
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _analytics_charts(start, end, version):
+    rollup = load_reply_rollups(start, end)
+    return {
+        "timeline": create_timeline_chart_from_counts(rollup["daily_counts"]),
+        "category": create_category_chart_from_counts(rollup["categories"]),
+        "intent": create_intent_chart_from_counts(rollup["intents"])
+    }
+
+def get_cached_analytics_charts(start, end):
+    """
+    Plotly figures for the analytics page, built once per range and log version
+    """
+    return _analytics_charts(start, end, log_version())
+
+def clear_log_caches(records=None):
+    """
+    Invalidate every cache derived from the reply log
+    """
+    for cached in (_log_summary, _reply_page, _search_page, _reply_date_range, _reply_rollups, _analytics_charts):
+        cached.clear()
+
+add_log_listener(clear_log_caches)
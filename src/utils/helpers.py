@@ -5,10 +5,15 @@ import plotly.graph_objects as go
 from collections import Counter
 import json
 import csv
+import io
 import os
+import re
+import zipfile
 import time
 import random
-from typing import Callable, Any, Optional
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Any, Optional
 import logging
 
 # Configure logging
@@ -53,18 +58,69 @@ def retry_with_exponential_backoff(
                 logger.error(f"All {max_retries + 1} attempts failed. Last error: {str(e)}")
                 raise last_exception
             
-            # Calculate delay with exponential backoff
-            delay = min(base_delay * (backoff_factor ** attempt), max_delay)
+            delay = _backoff_delay(attempt, base_delay, max_delay, backoff_factor, jitter)
+            logger.info(f"Retrying in {delay:.2f} seconds...")
+            time.sleep(delay)
+    
+    raise last_exception
+
+async def retry_with_exponential_backoff_async(
+    func: Callable[[], Awaitable[Any]],
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    backoff_factor: float = 2.0,
+    jitter: bool = True
+) -> Any:
+    """
+    Async counterpart of retry_with_exponential_backoff.
+    
+    Waits between attempts with asyncio.sleep so other coroutines keep
+    running on the event loop while this one backs off.
+    
+    Args:
+        func: Zero-argument callable returning the awaitable to retry
+        max_retries: Maximum number of retry attempts
+        base_delay: Initial delay between retries in seconds
+        max_delay: Maximum delay between retries in seconds
+        backoff_factor: Multiplier for delay after each retry
+        jitter: Whether to add random jitter to delays
+    
+    Returns:
+        The result of the awaited call
+    
+    Raises:
+        Exception: The last exception encountered after all retries
+    """
+    last_exception = None
+    
+    for attempt in range(max_retries + 1):
+        try:
+            return await func()
+        except Exception as e:
+            last_exception = e
+            logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
             
-            # Add jitter to prevent thundering herd
-            if jitter:
-                delay = delay * (0.5 + random.random() * 0.5)
+            if attempt == max_retries:
+                logger.error(f"All {max_retries + 1} attempts failed. Last error: {str(e)}")
+                raise last_exception
             
+            delay = _backoff_delay(attempt, base_delay, max_delay, backoff_factor, jitter)
             logger.info(f"Retrying in {delay:.2f} seconds...")
-            time.sleep(delay)
+            await asyncio.sleep(delay)
     
     raise last_exception
 
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float, backoff_factor: float, jitter: bool) -> float:
+    # Calculate delay with exponential backoff
+    delay = min(base_delay * (backoff_factor ** attempt), max_delay)
+    
+    # Add jitter to prevent thundering herd
+    if jitter:
+        delay = delay * (0.5 + random.random() * 0.5)
+    
+    return delay
+
 def safe_api_call(func: Callable, *args, **kwargs) -> Any:
     """
     Safely execute an API call with retry logic and proper error handling.
@@ -85,29 +141,217 @@ def safe_api_call(func: Callable, *args, **kwargs) -> Any:
     
     return retry_with_exponential_backoff(api_call)
 
+async def safe_api_call_async(func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    """
+    Async counterpart of safe_api_call for coroutine APIs such as ainvoke.
+    
+    Args:
+        func: The async API function to call
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+    
+    Returns:
+        The result of the API call
+    
+    Raises:
+        Exception: If all retry attempts fail
+    """
+    def api_call():
+        return func(*args, **kwargs)
+    
+    return await retry_with_exponential_backoff_async(api_call)
+
 def load_config(path="config/app_config.yaml"):
     with open(path, "r") as file:
         return yaml.safe_load(file)
 
-def load_reply_data(log_path="data/logs/reply_log.csv"):
+def load_config_or_defaults(path="config/app_config.yaml"):
+    """
+    Load the configuration, or an empty dict (all defaults) when it is
+    missing or unreadable
+    """
+    try:
+        return load_config(path) or {}
+    except Exception:
+        return {}
+
+def _reply_log_store(log_path=None):
+    from ..core.log_store import CsvLogStore, get_log_store
+    return CsvLogStore(log_path) if log_path else get_log_store()
+
+def load_reply_data(log_path=None, columns=None, start=None, end=None):
     """
     Load and parse reply log data
+    
+    Reads the configured log store, or a legacy JSON-in-CSV log when
+    log_path is given. start/end limit timestamps to [start, end) so only
+    the log segments covering that range are read.
     """
-    if not os.path.exists(log_path):
+    try:
+        return _reply_log_store(log_path).load_dataframe(columns=columns, start=start, end=end)
+    except Exception as e:
+        print(f"Error loading data: {e}")
         return pd.DataFrame()
+
+def query_replies(category=None, search=None, search_fields=("subject",), start=None, end=None,
+                  page=1, page_size=50, columns=None):
+    """
+    Load one page of logged replies, newest first
+    
+    Args:
+        category: Only replies with this category
+        search: Case-insensitive substring to look for in search_fields
+        search_fields: Columns searched for the substring
+        start: Inclusive lower timestamp bound
+        end: Exclusive upper timestamp bound
+        page: 1-based page number
+        page_size: Rows per page
+        columns: Columns to return
+    
+    Returns:
+        Tuple of (DataFrame with at most page_size rows, total matching rows)
+    """
+    result = _reply_log_store().query(
+        category=category,
+        search=search,
+        search_fields=search_fields,
+        start=start,
+        end=end,
+        limit=page_size,
+        offset=(page - 1) * page_size,
+        columns=columns
+    )
+    return pd.DataFrame(result["rows"], columns=columns), result["total"]
+
+def search_replies(text, category=None, start=None, end=None, page=1, page_size=50, prefix_last=True):
+    """
+    Full-text search over logged subjects, bodies and replies, best match first
+    
+    When rows were added or removed behind the index's back, the log writer
+    thread is asked to rebuild it; until it has, the last complete index is
+    searched. With search_index_enabled: false nothing fills the index, so
+    the log store is searched for the text instead, newest first.
+    
+    Returns:
+        Tuple of (DataFrame with at most page_size rows, total matching rows)
+    """
+    from ..core.log_writer import get_log_writer
+    from ..core.search_index import get_search_index, search_index_enabled
+    
+    if not search_index_enabled():
+        return _search_log_store(text, category, start, end, page, page_size)
+    index = get_search_index()
+    if not index.is_current(_reply_log_store()):
+        get_log_writer().request_sync()
+    result = index.search(
+        text,
+        category=category,
+        start=start,
+        end=end,
+        limit=page_size,
+        offset=(page - 1) * page_size if page_size else 0,
+        prefix_last=prefix_last
+    )
+    return pd.DataFrame(result["rows"]), result["total"]
+
+SEARCH_RESULT_COLUMNS = ["timestamp", "subject", "category", "intent", "reply", "email_body", "snippet", "score"]
+
+def _search_log_store(text, category, start, end, page, page_size):
+    # Substring match over the same fields as the index; a trailing '*'
+    # already matches prefixes
+    store = _reply_log_store()
+    search = text.replace("*", "").strip()
+    fields = ("subject", "email_body", "reply")
+    if page_size is None:
+        rows = list(store.iter_matching(category=category, search=search, search_fields=fields, start=start, end=end))
+        rows.reverse()
+        total = len(rows)
+    else:
+        result = store.query(
+            category=category, search=search, search_fields=fields, start=start, end=end,
+            limit=page_size, offset=(page - 1) * page_size
+        )
+        rows, total = result["rows"], result["total"]
+    for row in rows:
+        row["snippet"] = (row.get("reply") or "")[:120]
+        row["score"] = None
+    return pd.DataFrame(rows, columns=SEARCH_RESULT_COLUMNS), total
+
+def export_replies_csv(category=None, search=None, search_fields=("subject",), start=None, end=None,
+                       columns=None, batch_size=1000):
+    """
+    Render every matching reply as CSV text, streamed from the log store
+    """
+    records = _reply_log_store().iter_matching(
+        category=category, search=search, search_fields=search_fields, start=start, end=end
+    )
+    output = io.StringIO()
+    header = True
+    while True:
+        batch = [record for _, record in zip(range(batch_size), records)]
+        if not batch:
+            break
+        pd.DataFrame(batch, columns=columns).to_csv(output, index=False, header=header)
+        header = False
+    return output.getvalue()
+
+BATCH_EXPORT_COLUMNS = ["source", "subject", "category", "intent", "entities", "reply", "error"]
+
+def export_replies_zip(records):
+    """
+    Bundle batch results into a zip archive for download
+
+    Args:
+        records: Result records from process_emails
+
+    Returns:
+        Zip bytes with one replies/<n>_<source>.txt per reply and a results.csv
+    """
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for number, record in enumerate(records, 1):
+            if record.get("reply") is None:
+                continue
+            stem = os.path.splitext(os.path.basename(str(record.get("source", ""))))[0]
+            name = re.sub(r"[^\w.-]+", "_", stem).strip("._") or "email"
+            archive.writestr(f"replies/{number:03d}_{name}.txt", record["reply"])
+        table = pd.DataFrame(records, columns=BATCH_EXPORT_COLUMNS)
+        table["entities"] = table["entities"].map(lambda value: json.dumps(value) if isinstance(value, dict) else value)
+        archive.writestr("results.csv", table.to_csv(index=False))
+    return output.getvalue()
+
+def load_reply_rollups(start=None, end=None):
+    """
+    Return pre-aggregated reply analytics for dates in [start, end]
     
+    When rows were added or removed behind the rollups' back, the log
+    writer thread is asked to rebuild them; until it has, this returns the
+    last complete rollups rather than scanning the log on the request path.
+    """
+    from ..core.log_rollups import get_reply_rollups
+    from ..core.log_store import get_log_store
+    from ..core.log_writer import get_log_writer
+    
+    rollups = get_reply_rollups()
+    if not rollups.is_current(get_log_store()):
+        get_log_writer().request_sync()
+    return rollups.query(
+        str(start) if start else None,
+        str(end) if end else None
+    )
+
+def get_reply_date_range(log_path=None):
+    """
+    Return the (first, last) dates covered by the reply log, or None if empty
+    """
     try:
-        with open(log_path, "r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            rows = list(reader)
-            if len(rows) <= 1:
-                return pd.DataFrame()
-            
-            data = [json.loads(row[0]) for row in rows[1:]]
-            return pd.DataFrame(data)
+        bounds = _reply_log_store(log_path).date_bounds()
     except Exception as e:
         print(f"Error loading data: {e}")
-        return pd.DataFrame()
+        return None
+    if not bounds:
+        return None
+    return tuple(datetime.strptime(day, "%Y-%m-%d").date() for day in bounds)
 
 def create_category_chart(df):
     """
@@ -116,7 +360,15 @@ def create_category_chart(df):
     if df.empty:
         return None
     
-    category_counts = df['category'].value_counts()
+    return create_category_chart_from_counts(df['category'].value_counts())
+
+def create_category_chart_from_counts(category_counts):
+    """
+    Create the category pie chart from a {category: count} mapping or Series
+    """
+    category_counts = pd.Series(category_counts, dtype="int64")
+    if category_counts.empty:
+        return None
     
     fig = px.pie(
         values=category_counts.values,
@@ -144,7 +396,17 @@ def create_timeline_chart(df):
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df['date'] = df['timestamp'].dt.date
     
-    daily_counts = df.groupby('date').size().reset_index(name='count')
+    return create_timeline_chart_from_counts(df.groupby('date').size())
+
+def create_timeline_chart_from_counts(daily_counts):
+    """
+    Create the daily replies line chart from a {date: count} mapping or Series
+    """
+    daily_counts = pd.Series(daily_counts, dtype="int64")
+    if daily_counts.empty:
+        return None
+    
+    daily_counts = daily_counts.rename_axis('date').reset_index(name='count')
     
     fig = px.line(
         daily_counts,
@@ -169,7 +431,15 @@ def create_intent_chart(df):
     if df.empty:
         return None
     
-    intent_counts = df['intent'].value_counts()
+    return create_intent_chart_from_counts(df['intent'].value_counts())
+
+def create_intent_chart_from_counts(intent_counts):
+    """
+    Create the intent bar chart from a {intent: count} mapping or Series
+    """
+    intent_counts = pd.Series(intent_counts, dtype="int64")
+    if intent_counts.empty:
+        return None
     
     fig = px.bar(
         x=intent_counts.index,
@@ -0,0 +1,243 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Seconds of budget a limiter bucket can hold
+DEFAULT_BURST_SECONDS = 5.0
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model: str):
+    # tiktoken downloads encodings on first use; without network access (or
+    # tiktoken) fall back to the character heuristic instead of failing calls
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.info(f"Token counting falls back to a character estimate: {e}")
+        return None
+
+def estimate_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Count the tokens in a prompt with the model's tokenizer when available
+
+    Args:
+        text: Prompt text
+        model: Model name used to pick the tiktoken encoding
+
+    Returns:
+        Token count, or a characters/4 estimate without tiktoken
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """
+    Cut text to at most max_tokens tokens of the model's tokenizer
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def usage_tokens(result: Any) -> Optional[int]:
+    """
+    Total tokens reported by the API for a chat model result, if any
+    """
+    usage = getattr(result, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    return None
+
+class TokenBucketLimiter:
+    """
+    Proactive client-side limiter for requests and tokens per minute
+
+    Each bucket refills continuously at its per-minute limit (scaled by
+    headroom) and holds at most burst_seconds of budget, starting full, so
+    neither a cold start nor an idle period allows a burst above the
+    account's rate (the API enforces limits over sub-minute windows too).
+    A call reserves one request and its estimated tokens up front; when a
+    bucket runs short the reservation goes into debt and the caller sleeps until the debt is
+    repaid, so waiting callers are served in arrival order and the
+    account limit is approached without being exceeded. After the call
+    the estimate is corrected from the reported usage.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 headroom: float = 0.9, completion_tokens: int = 256, model: str = "gpt-3.5-turbo",
+                 burst_seconds: float = DEFAULT_BURST_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.request_rate = requests_per_minute * headroom / 60.0
+        self.token_rate = tokens_per_minute * headroom / 60.0
+        self.request_capacity = max(self.request_rate * burst_seconds, 1.0)
+        self.token_capacity = self.token_rate * burst_seconds
+        # Most a single call can take from the token bucket: one minute of budget
+        self.max_reservation = tokens_per_minute * headroom
+        self.completion_tokens = completion_tokens
+        self.model = model
+        self._clock = clock
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.tokens_reserved = 0
+        self.tokens_used = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated, 0.0)
+        self._updated = now
+        if self.request_rate:
+            self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+        if self.token_rate:
+            self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and some tokens
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            self._refill(self._clock())
+            wait = 0.0
+            if self.request_rate:
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests / self.request_rate)
+            if self.token_rate:
+                # A single huge prompt waits for a full minute at most
+                self._tokens -= self._reserved(tokens)
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.token_rate)
+            self.calls += 1
+            self.tokens_reserved += tokens
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    def _reserved(self, tokens: int) -> float:
+        return min(tokens, self.max_reservation)
+
+    def correct(self, estimated: int, actual: Optional[int]) -> None:
+        """
+        Return over-estimated tokens to the bucket, or charge the shortfall
+
+        Settled against what reserve() actually took, so prompts capped at
+        max_reservation are not over-credited.
+        """
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens_used += actual
+            if self.token_rate:
+                self._tokens = min(self.token_capacity, self._tokens + self._reserved(estimated) - self._reserved(actual))
+
+    def estimate(self, prompt: Any) -> int:
+        return estimate_tokens(str(prompt), self.model) + self.completion_tokens
+
+    def call(self, func: Callable, prompt: Any, *args, **kwargs) -> Any:
+        """
+        Wait for budget, call func(prompt, ...) and correct from its usage
+        """
+        estimated = self.estimate(prompt)
+        wait = self.reserve(estimated)
+        if wait > 0:
+            time.sleep(wait)
+        result = func(prompt, *args, **kwargs)
+        self.correct(estimated, usage_tokens(result))
+        return result
+
+    async def acall(self, func: Callable[..., Awaitable[Any]], prompt: Any, *args, **kwargs) -> Any:
+        """
+        Async counterpart of call; waits with asyncio.sleep
+        """
+        estimated = self.estimate(prompt)
+        wait = self.reserve(estimated)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        result = await func(prompt, *args, **kwargs)
+        self.correct(estimated, usage_tokens(result))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(self._clock())
+            return {
+                "calls": self.calls,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "tokens_reserved": self.tokens_reserved,
+                "tokens_used": self.tokens_used,
+                "requests_available": self._requests,
+                "tokens_available": self._tokens,
+            }
+
+# Config keys that shape the limiter
+RATE_LIMIT_KEYS = (
+    "rate_limit_requests_per_minute",
+    "rate_limit_tokens_per_minute",
+    "rate_limit_headroom",
+    "rate_limit_completion_tokens",
+    "rate_limit_burst_seconds",
+)
+
+_limiters: Dict[Tuple, TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+_process_share = 1.0
+
+def set_process_share(share: float) -> None:
+    """
+    Limit this process to a fraction of the account budget
+
+    Each process has its own buckets, so when N worker processes call the
+    same account each one is given 1/N of the configured limits.
+    """
+    global _process_share
+    if not 0 < share <= 1:
+        raise ValueError("share must be in (0, 1]")
+    _process_share = share
+
+def get_rate_limiter(config: Dict[str, Any]) -> Optional[TokenBucketLimiter]:
+    """
+    Return the process-wide limiter for the configured account limits,
+    scaled by the share set with set_process_share
+
+    Returns:
+        The shared limiter, or None when both limits are 0 (disabled)
+    """
+    rpm = float(config.get("rate_limit_requests_per_minute", 0) or 0) * _process_share
+    tpm = float(config.get("rate_limit_tokens_per_minute", 0) or 0) * _process_share
+    if not rpm and not tpm:
+        return None
+    key = (
+        rpm,
+        tpm,
+        float(config.get("rate_limit_headroom", 0.9)),
+        int(config.get("rate_limit_completion_tokens", 256)),
+        config.get("model_name", "gpt-3.5-turbo"),
+        float(config.get("rate_limit_burst_seconds", DEFAULT_BURST_SECONDS)),
+    )
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = TokenBucketLimiter(*key)
+        return _limiters[key]
@@ -12,7 +12,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from src.core.email_processor import parse_email
 from src.core.reply_service import generate_reply
-from src.core.data_logger import log_to_csv
+from src.core.data_logger import log_to_csv, flush_logs
 
 def test_email_parsing():
     """Test that email parsing works correctly"""
@@ -58,6 +58,7 @@ def test_data_logging():
     
     # Test logging
     log_to_csv(email_data, reply)
+    flush_logs()
     
     # Verify log file exists
     log_path = "data/logs/reply_log.csv"
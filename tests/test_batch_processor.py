@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent batch processing
+"""
+
+import sys
+import os
+import json
+import asyncio
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core import batch_processor
+from src.core.batch_processor import iter_email_sources, percentile, process_batch, process_emails
+from src.core.llm_client import run_on_shared_loop
+
+async def fake_generate_reply_async(email_data, lane=None):
+    await asyncio.sleep(0)
+    return "schedule", "reschedule_meeting", {}, f"Re: {email_data['subject']}"
+
+def write_emails(directory, count):
+    for i in range(count):
+        (directory / f"email{i}.txt").write_text(f"Subject: Email {i}\n\nBody {i}\n")
+
+def test_iter_email_sources_reads_mbox(tmp_path):
+    """Test that messages are streamed out of an mbox file"""
+    mbox_path = tmp_path / "inbox.mbox"
+    mbox_path.write_text(
+        "From alice@example.com Mon Jan  1 00:00:00 2024\n"
+        "Subject: First\n\nHello one\n\n"
+        "From bob@example.com Mon Jan  1 00:00:00 2024\n"
+        "Subject: Second\n\nHello two\n"
+    )
+
+    subjects = [email_data["subject"] for _, email_data in iter_email_sources(str(mbox_path))]
+
+    assert subjects == ["First", "Second"]
+
+def test_process_batch_writes_every_result(tmp_path, monkeypatch):
+    """Test that every email in a directory is processed and written out"""
+    monkeypatch.setattr(batch_processor, "generate_reply_async", fake_generate_reply_async)
+    write_emails(tmp_path, 5)
+    output_path = tmp_path / "results.jsonl"
+
+    summary = asyncio.run(process_batch(str(tmp_path), concurrency=2, output_path=str(output_path), log_results=False))
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert summary["processed"] == 5
+    assert summary["failed"] == 0
+    assert sorted(record["reply"] for record in records) == [f"Re: Email {i}" for i in range(5)]
+
+def test_process_emails_reports_each_result(monkeypatch):
+    """Test that in-memory emails are processed with a callback per result"""
+    monkeypatch.setattr(batch_processor, "generate_reply_async", fake_generate_reply_async)
+    emails = [(f"upload{i}.txt", {"subject": f"Email {i}", "email_body": "Body"}) for i in range(4)]
+    records = []
+
+    summary = asyncio.run(process_emails(emails, concurrency=3, log_results=False, on_result=records.append))
+
+    assert summary["processed"] == 4
+    assert sorted(record["source"] for record in records) == [f"upload{i}.txt" for i in range(4)]
+
+def test_summary_counts_failures_and_tokens_saved(monkeypatch):
+    """Test that failed emails and trimmed tokens are reported in the summary"""
+    async def flaky_generate_reply_async(email_data, lane=None):
+        if email_data["subject"] == "Email 0":
+            raise RuntimeError("model unavailable")
+        return await fake_generate_reply_async(email_data, lane)
+
+    monkeypatch.setattr(batch_processor, "generate_reply_async", flaky_generate_reply_async)
+    emails = [
+        (f"upload{i}.txt", {"subject": f"Email {i}", "email_body": "Body", "body_tokens": {"tokens_saved": 5}})
+        for i in range(3)
+    ]
+
+    summary = asyncio.run(process_emails(emails, concurrency=2, log_results=False))
+
+    assert summary["processed"] == 2
+    assert summary["failed"] == 1
+    assert summary["tokens_saved"] == 10
+
+def test_batches_run_back_to_back_on_the_shared_loop(monkeypatch):
+    """Test that the web UI can run one batch after another in the same process"""
+    monkeypatch.setattr(batch_processor, "generate_reply_async", fake_generate_reply_async)
+    emails = [(f"upload{i}.txt", {"subject": f"Email {i}", "email_body": "Body"}) for i in range(3)]
+
+    for _ in range(2):
+        summary = run_on_shared_loop(process_emails(emails, concurrency=2, log_results=False)).result(timeout=10)
+        assert summary["processed"] == 3
+
+def test_failing_callback_stops_every_task(monkeypatch):
+    """Test that an error outside the per-email handling leaves no task behind"""
+    monkeypatch.setattr(batch_processor, "generate_reply_async", fake_generate_reply_async)
+    emails = [(f"upload{i}.txt", {"subject": f"Email {i}", "email_body": "Body"}) for i in range(20)]
+
+    def broken_callback(record):
+        raise RuntimeError("display failed")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await process_emails(emails, concurrency=2, log_results=False, on_result=broken_callback)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+
+def test_percentile_uses_nearest_rank():
+    """Test the latency percentile helper"""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+if __name__ == "__main__":
+    pytest.main([__file__])
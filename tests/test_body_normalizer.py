@@ -0,0 +1,88 @@
+"""
+Tests for email body normalization
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from email import message_from_string
+from src.core.body_normalizer import TRUNCATION_MARKER, normalize_body
+from src.core.email_processor import parse_email_message
+
+REPLY_CHAIN = """Hi team,
+
+Could you   resend the March invoice?
+
+
+
+Thanks,
+Dana
+
+--
+Dana Smith | Finance
++1 555 0100
+
+On Mon, 4 Mar 2024 at 10:00, Support <support@example.com> wrote:
+> Your invoice is attached.
+> Regards
+"""
+
+def test_quotes_signatures_and_whitespace_are_stripped():
+    """Test that quoted history and the signature are dropped and blank runs collapsed"""
+    result = normalize_body(REPLY_CHAIN)
+
+    assert result["text"] == "Hi team,\n\nCould you resend the March invoice?\n\nThanks,\nDana"
+    assert result["tokens_saved"] > 0
+    assert result["tokens_saved"] == result["original_tokens"] - result["tokens"]
+    assert not result["truncated"]
+
+def test_outlook_history_and_disclaimer_are_stripped():
+    """Test Outlook-style reply headers and legal footers"""
+    body = (
+        "Please cancel my order.\n\nSent from my iPhone\n"
+        "-----Original Message-----\nFrom: Shop\nSent: Monday\n\nYour order has shipped."
+    )
+    assert normalize_body(body)["text"] == "Please cancel my order."
+    body = "Order 42 is late.\n\nCONFIDENTIALITY NOTICE: This message is intended only for the addressee."
+    assert normalize_body(body)["text"] == "Order 42 is late."
+
+def test_html_is_converted_to_text():
+    """Test that tags, styles and quoted blocks are removed from HTML bodies"""
+    body = (
+        "<html><head><style>p {color: red}</style></head><body>"
+        "<p>Hello&nbsp;there,</p><div>My login <b>fails</b> &amp; resets.</div>"
+        "<blockquote>Earlier message</blockquote></body></html>"
+    )
+    assert normalize_body(body)["text"] == "Hello there,\n\nMy login fails & resets."
+
+def test_body_is_truncated_to_the_token_budget():
+    """Test that long bodies are cut to max_tokens and marked as truncated"""
+    result = normalize_body("word " * 5000, max_tokens=100)
+
+    assert result["truncated"]
+    assert result["text"].endswith(TRUNCATION_MARKER)
+    assert result["tokens"] <= 110
+    assert not normalize_body("word " * 5000, max_tokens=0)["truncated"]
+
+def test_stripping_never_empties_the_body():
+    """Test that a body consisting only of quoted text is kept"""
+    assert normalize_body("> quoted only")["text"] == "> quoted only"
+
+def test_html_only_message_body_is_used():
+    """Test that multipart messages without a text/plain part fall back to HTML"""
+    message = message_from_string(
+        "From: a@example.com\nSubject: Hi\nMIME-Version: 1.0\n"
+        "Content-Type: multipart/alternative; boundary=XX\n\n"
+        "--XX\nContent-Type: text/html\n\n<p>Refund please</p>\n--XX--\n"
+    )
+    email_data = parse_email_message(message)
+
+    assert "Refund please" in email_data["email_body"]
+    assert normalize_body(email_data["email_body"])["text"] == "Refund please"
+
+if __name__ == "__main__":
+    pytest.main([__file__])
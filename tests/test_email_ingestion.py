@@ -0,0 +1,113 @@
+"""
+Tests for streaming mbox, Maildir and .eml ingestion
+"""
+
+import sys
+import os
+import io
+import zipfile
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.email_ingestion import iter_mailbox, iter_mbox_messages, iter_upload
+
+MULTIPART_MESSAGE = (
+    "From: =?utf-8?q?Ren=C3=A9e?= <renee@example.com>\n"
+    "Subject: A very long subject that was\n"
+    " folded onto two lines\n"
+    "Message-ID: <multi@example.com>\n"
+    "MIME-Version: 1.0\n"
+    'Content-Type: multipart/alternative; boundary="b1"\n'
+    "\n"
+    "--b1\n"
+    "Content-Type: text/plain; charset=utf-8\n"
+    "Content-Transfer-Encoding: quoted-printable\n"
+    "\n"
+    "Caf=C3=A9 at 4pm?\n"
+    "--b1\n"
+    "Content-Type: text/html\n"
+    "\n"
+    "<p>Caf&eacute; at 4pm?</p>\n"
+    "--b1--\n"
+)
+
+def write_mbox(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(count):
+            f.write(f"From sender{index}@example.com Mon Jan  1 00:00:00 2024\n")
+            f.write(f"Subject: Message {index}\nMessage-ID: <{index}@example.com>\n\nBody {index}\n\n")
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_mbox_streams_every_message(tmp_path, use_mmap):
+    """Test that mmap and line-by-line mbox reading yield the same messages"""
+    path = tmp_path / "export.mbox"
+    write_mbox(path, 3)
+
+    messages = list(iter_mbox_messages(str(path), use_mmap=use_mmap))
+
+    assert [message["Subject"] for _, message in messages] == ["Message 0", "Message 1", "Message 2"]
+    assert messages[2][1].get_payload().strip() == "Body 2"
+
+def test_eml_parsing_handles_mime_and_folded_headers(tmp_path):
+    """Test that multipart, encoded and folded messages are normalized"""
+    (tmp_path / "one.eml").write_text(MULTIPART_MESSAGE, encoding="utf-8")
+
+    [(source_id, email_data)] = list(iter_mailbox(str(tmp_path)))
+
+    assert source_id.endswith("one.eml")
+    assert email_data["subject"] == "A very long subject that was folded onto two lines"
+    assert email_data["sender"] == "Renée <renee@example.com>"
+    assert email_data["email_body"] == "Café at 4pm?"
+    assert email_data["headers"]["message-id"] == "<multi@example.com>"
+
+def test_maildir_reads_new_and_cur(tmp_path):
+    """Test that Maildir messages in new/ and cur/ are yielded"""
+    for sub in ("cur", "new", "tmp"):
+        (tmp_path / sub).mkdir()
+    (tmp_path / "new" / "1.host").write_text("Subject: Fresh\n\nNew mail\n")
+    (tmp_path / "cur" / "2.host:2,S").write_text("Subject: Seen\n\nOld mail\n")
+
+    subjects = sorted(email_data["subject"] for _, email_data in iter_mailbox(str(tmp_path)))
+
+    assert subjects == ["Fresh", "Seen"]
+
+def test_maildir_skips_files_moved_during_the_run(tmp_path):
+    """Test that a message file removed after listing is skipped, not fatal"""
+    for sub in ("cur", "new", "tmp"):
+        (tmp_path / sub).mkdir()
+    (tmp_path / "new" / "1.host").write_text("Subject: First\n\nHello\n")
+    (tmp_path / "new" / "2.host").write_text("Subject: Moved\n\nGone\n")
+    (tmp_path / "new" / "3.host").write_text("Subject: Third\n\nStill here\n")
+
+    subjects = []
+    for _, email_data in iter_mailbox(str(tmp_path)):
+        subjects.append(email_data["subject"])
+        (tmp_path / "new" / "2.host").unlink(missing_ok=True)
+
+    assert subjects == ["First", "Third"]
+
+def test_zip_upload_yields_txt_and_eml_entries():
+    """Test that zip uploads are read from memory, skipping other files"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("inbox/one.txt", "Subject: One\n\nFirst body\n")
+        archive.writestr("inbox/two.eml", "Subject: =?utf-8?q?Caf=C3=A9?=\nContent-Type: text/plain\n\nSecond body\n")
+        archive.writestr("inbox/notes.pdf", b"%PDF")
+        archive.writestr("__MACOSX/inbox/._one.txt", b"\x00\x05")
+
+    emails = list(iter_upload("batch.zip", buffer.getbuffer()))
+
+    assert [source_id for source_id, _ in emails] == ["batch.zip/inbox/one.txt", "batch.zip/inbox/two.eml"]
+    assert [email_data["subject"] for _, email_data in emails] == ["One", "Café"]
+
+def test_single_upload_is_parsed_by_extension():
+    """Test that a plain .txt upload is parsed from its buffer"""
+    [(source_id, email_data)] = iter_upload("email.txt", memoryview(b"Subject: Hi\n\nBody\n"))
+
+    assert source_id == "email.txt"
+    assert email_data["email_body"] == "Body"
+
+if __name__ == "__main__":
+    pytest.main([__file__])
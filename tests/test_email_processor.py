@@ -0,0 +1,61 @@
+"""
+Tests for header and date parsing in the email processor
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from email.utils import parsedate_to_datetime
+from src.core.email_processor import _parse_date, _parse_headers, parse_email, parse_email_bytes, parse_email_text
+
+@pytest.mark.parametrize("date, expected", [
+    ("Mon, 01 Jan 2024 10:00:00 +0000", datetime(2024, 1, 1, 10, tzinfo=timezone.utc)),
+    ("5 Mar 2024 23:59:59 -0530", datetime(2024, 3, 5, 23, 59, 59, tzinfo=timezone(-timedelta(hours=5, minutes=30)))),
+    ("Mon, 1 Jan 2024 10:00:00 GMT", parsedate_to_datetime("Mon, 1 Jan 2024 10:00:00 GMT")),
+    ("2024-01-05 10:00:00", datetime(2024, 1, 5, 10)),
+    ("01/05/2024 10:00:00", datetime(2024, 1, 5, 10)),
+    ("not a date", None),
+    ("Unknown", None),
+])
+def test_date_parsing(date, expected):
+    """Test RFC 5322, legacy and invalid dates, twice to exercise the shape cache"""
+    assert _parse_date(date) == expected
+    assert _parse_date(date) == expected
+
+def test_header_scanner_unfolds_and_lowercases():
+    """Test that folded headers are joined and names normalized"""
+    headers = _parse_headers("From: a@example.com\nSubject: Meeting\n\tnext week\nX-Note : a: b\nnot a header")
+
+    assert headers == {"from": "a@example.com", "subject": "Meeting\tnext week", "x-note": "a: b"}
+
+def test_parse_email_reads_folded_subject(tmp_path):
+    """Test parse_email end to end with a folded header and RFC date"""
+    path = tmp_path / "email.txt"
+    path.write_text("Subject: Quarterly\n report\nDate: 2 Feb 2024 09:30:00 +0100\n\nBody text\n", encoding="utf-8")
+
+    email_data = parse_email(str(path))
+
+    assert email_data["subject"] == "Quarterly report"
+    assert email_data["parsed_date"].utcoffset() == timedelta(hours=1)
+    assert email_data["email_body"] == "Body text"
+
+def test_in_memory_parsing_matches_parse_email(tmp_path):
+    """Test that text and buffer parsing give the same result as reading the file"""
+    content = "From: Dana <dana@example.com>\nSubject: Refund\n\nPlease refund order 42.\n"
+    path = tmp_path / "email.txt"
+    path.write_text(content, encoding="utf-8")
+
+    expected = parse_email(str(path))
+
+    assert parse_email_text(content) == expected
+    assert parse_email_bytes(memoryview(content.encode("utf-8"))) == expected
+    assert parse_email_bytes(content.replace("\n", "\r\n").encode("utf-8")) == expected
+    assert expected["headers"]["from"] == "Dana <dana@example.com>"
+
+if __name__ == "__main__":
+    pytest.main([__file__])
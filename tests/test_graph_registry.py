@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled graph registry
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.graph_registry import GraphRegistry, graph_config_key
+
+def write_config(path, temperature, mtime):
+    with open(path, "w") as f:
+        f.write(f'openai_api_key: "test-key"\nmodel_name: "gpt-3.5-turbo"\nmodel_temperature: {temperature}\n')
+    os.utime(path, ns=(mtime, mtime))
+
+def test_registry_reuses_compiled_graph(tmp_path):
+    """Test that repeated lookups hand out the same compiled graph"""
+    config_path = tmp_path / "app_config.yaml"
+    write_config(config_path, 0.3, 1_000_000_000)
+
+    registry = GraphRegistry(str(config_path))
+    first = registry.get_graph()
+    second = registry.get_graph()
+
+    assert first is second
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["cached_graphs"] == 1
+
+def test_registry_rebuilds_when_config_changes(tmp_path):
+    """Test that a changed config file produces a freshly compiled graph"""
+    config_path = tmp_path / "app_config.yaml"
+    write_config(config_path, 0.3, 1_000_000_000)
+
+    registry = GraphRegistry(str(config_path))
+    first = registry.get_graph()
+
+    write_config(config_path, 0.9, 2_000_000_000)
+    second = registry.get_graph()
+
+    assert first is not second
+    assert registry.stats()["misses"] == 2
+    assert registry.stats()["cached_graphs"] == 1
+
+def test_graph_config_key_ignores_unrelated_settings():
+    """Test that only behaviour-changing settings take part in the key"""
+    base = {"openai_api_key": "k", "model_name": "gpt-4", "model_temperature": 0.2}
+    assert graph_config_key(base) == graph_config_key({**base, "default_reply_tone": "Casual"})
+    assert graph_config_key(base) != graph_config_key({**base, "model_temperature": 0.5})
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,111 @@
+"""
+Tests for the durable job queue and its workers
+"""
+
+import sys
+import os
+import asyncio
+import time
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core import job_scheduler, queue_worker
+from src.core.job_queue import JobQueue, idempotency_key
+from src.core.reply_service import ReplyResult
+
+def email(message_id, subject="Hello", body="Can we meet?"):
+    return {"subject": subject, "email_body": body, "headers": {"message-id": message_id}}
+
+def test_enqueue_is_idempotent_by_message_id(tmp_path):
+    """Test that re-enqueueing the same Message-ID does not add a job"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    first_id, created = queue.enqueue(email("<a@example.com>"))
+    again_id, created_again = queue.enqueue(email("<a@example.com>", body="different copy"))
+
+    assert created and not created_again
+    assert first_id == again_id
+    assert queue.stats()["queued"] == 1
+    assert idempotency_key({"email_body": "x"}).startswith("sha256:")
+
+def test_urgent_jobs_are_claimed_first(tmp_path):
+    """Test that triaged urgent emails jump ahead of bulk ones"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(email("<bulk@example.com>", subject="Team lunch"))
+    queue.enqueue(email("<urgent@example.com>", subject="Refund request"))
+
+    assert queue.claim("w")["key"] == "<urgent@example.com>"
+    assert queue.claim("w")["key"] == "<bulk@example.com>"
+    assert queue.claim("w") is None
+
+def test_enqueue_uses_configured_urgent_keywords(tmp_path, monkeypatch):
+    """Test that the queue triages with scheduler_urgent_keywords like the scheduler"""
+    job_scheduler.get_job_scheduler()
+    monkeypatch.setattr(job_scheduler, "_urgent_re", job_scheduler.urgent_pattern(["lunch"]))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(email("<refund@example.com>", subject="Refund request"))
+    queue.enqueue(email("<lunch@example.com>", subject="Team lunch"))
+
+    assert queue.claim("w")["key"] == "<lunch@example.com>"
+
+def test_expired_lease_is_redelivered(tmp_path):
+    """Test that a job whose worker died is claimed again (at-least-once)"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), visibility_timeout=0.05)
+    queue.enqueue(email("<a@example.com>"))
+    crashed = queue.claim("crashed-worker")
+
+    assert queue.claim("other") is None
+    time.sleep(0.06)
+    job = queue.claim("other")
+    assert job["id"] == crashed["id"]
+    assert job["attempts"] == 2
+    assert not queue.complete(job["id"], {}, worker="crashed-worker")
+    assert queue.complete(job["id"], {}, worker="other")
+    assert queue.stats()["done"] == 1
+
+def test_failures_retry_until_max_attempts(tmp_path):
+    """Test that failed jobs are retried with backoff and then given up on"""
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2, retry_delay=0)
+    queue.enqueue(email("<a@example.com>"))
+
+    job = queue.claim("w")
+    queue.fail(job["id"], "boom", worker="w")
+    assert queue.stats()["queued"] == 1
+
+    job = queue.claim("w")
+    queue.fail(job["id"], "boom again", worker="w")
+    assert queue.stats()["failed"] == 1
+    assert queue.retry_failed() == 1
+
+def test_worker_drains_queue(tmp_path, monkeypatch):
+    """Test that worker tasks process every queued job"""
+    async def fake_generate_reply_async(email_data):
+        return ReplyResult(("schedule", "reschedule_meeting", {}, "Sure."))
+
+    monkeypatch.setattr(queue_worker, "generate_reply_async", fake_generate_reply_async)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    for index in range(5):
+        queue.enqueue(email(f"<{index}@example.com>"))
+
+    counts = asyncio.run(queue_worker.worker_loop(queue, concurrency=2, drain=True, log_results=False))
+
+    assert counts == {"completed": 5, "failed": 0}
+    assert queue.stats()["done"] == 5
+
+def test_fallback_replies_are_retried(tmp_path, monkeypatch):
+    """Test that a job answered with the degraded fallback reply is failed and retried"""
+    async def fake_generate_reply_async(email_data):
+        return ReplyResult(("other", "unknown", {}, "Thanks, we will get back to you."), degraded=True)
+
+    monkeypatch.setattr(queue_worker, "generate_reply_async", fake_generate_reply_async)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=1)
+    queue.enqueue(email("<down@example.com>"))
+
+    counts = asyncio.run(queue_worker.worker_loop(queue, concurrency=1, drain=True, log_results=False))
+
+    assert counts == {"completed": 0, "failed": 1}
+    assert queue.stats()["failed"] == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__])
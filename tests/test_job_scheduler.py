@@ -0,0 +1,78 @@
+"""
+Tests for the priority job scheduler in front of the reply pipeline
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.job_scheduler import DeadlineExceeded, JobScheduler, QueueFull, triage_lane
+
+def test_waiting_jobs_are_admitted_by_lane_priority():
+    """Test that interactive jobs jump ahead of queued backlog"""
+    scheduler = JobScheduler(max_concurrency=1)
+    order = []
+    scheduler.acquire("bulk")
+
+    async def job(lane):
+        async with scheduler.aslot(lane):
+            order.append(lane)
+
+    async def main():
+        tasks = [asyncio.create_task(job(lane)) for lane in ("bulk", "urgent", "interactive")]
+        await asyncio.sleep(0.01)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["interactive", "urgent", "bulk"]
+
+def test_full_lane_is_rejected():
+    """Test that a lane at its queue limit signals backpressure"""
+    scheduler = JobScheduler(max_concurrency=1, max_queue=1)
+    scheduler.acquire("bulk")
+    waiter = threading.Thread(target=lambda: scheduler.slot("bulk").__enter__(), daemon=True)
+    waiter.start()
+    while scheduler.stats()["queued"]["bulk"] < 1:
+        time.sleep(0.001)
+
+    with pytest.raises(QueueFull):
+        scheduler.acquire("bulk")
+    assert scheduler.stats()["rejected"] == 1
+    assert scheduler.stats()["saturated"]
+
+def test_missed_deadlines_drop_or_defer():
+    """Test that interactive jobs are dropped and bulk jobs deferred past their deadline"""
+    scheduler = JobScheduler(max_concurrency=1)
+    scheduler.acquire("bulk")
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire("interactive", time.monotonic() + 0.01)
+
+    admitted = threading.Event()
+    def deferred_job():
+        scheduler.acquire("bulk", time.monotonic() + 0.01)
+        admitted.set()
+    threading.Thread(target=deferred_job, daemon=True).start()
+    while scheduler.stats()["deferred"] < 1:
+        time.sleep(0.001)
+
+    scheduler.release()
+    assert admitted.wait(1)
+    stats = scheduler.stats()
+    assert stats["dropped"] == 1
+    assert stats["admitted"]["deferred"] == 1
+
+def test_triage_marks_billing_and_support_urgent():
+    """Test that keyword triage routes backlog emails to lanes"""
+    assert triage_lane({"subject": "Refund for last invoice", "email_body": "Hi"}) == "urgent"
+    assert triage_lane({"subject": "Team lunch", "email_body": "See you Friday"}) == "bulk"
+
+if __name__ == "__main__":
+    pytest.main([__file__])
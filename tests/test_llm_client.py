@@ -0,0 +1,80 @@
+"""
+Tests for the shared HTTP connection pool used by LLM calls
+"""
+
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.llm_client import get_http_clients, http_pool_settings, llm_client_kwargs, run_on_shared_loop
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_pool_settings_read_config():
+    """Test that pool settings come from the config and HTTP/2 needs h2"""
+    settings = http_pool_settings({"http_max_connections": 5, "http_timeout_seconds": 15})
+
+    assert settings["max_connections"] == 5
+    assert settings["timeout"] == 15.0
+    assert settings["http2"] is False
+
+def test_clients_are_shared_per_settings():
+    """Test that models with the same pool settings share one client pair"""
+    first = llm_client_kwargs({"http_max_connections": 7})
+    second = llm_client_kwargs({"http_max_connections": 7})
+    other = llm_client_kwargs({"http_max_connections": 8})
+
+    assert first["http_client"] is second["http_client"]
+    assert first["http_async_client"] is second["http_async_client"]
+    assert first["http_client"] is not other["http_client"]
+
+def test_keepalive_connections_are_reused(server):
+    """Test that sequential requests reuse one kept-alive connection"""
+    shared = get_http_clients({"http_max_connections": 3})
+    for _ in range(3):
+        assert shared.client.get(server).text == "ok"
+
+    stats = shared.stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["reused"] == 2
+    assert stats["connections_open"] == 1
+    assert stats["waiting"] == 0
+
+def test_async_batches_back_to_back_share_the_pool(server):
+    """Test that consecutive async batches reuse the async client's connections"""
+    shared = get_http_clients({"http_max_connections": 4})
+
+    async def batch():
+        return [(await shared.async_client.get(server)).text for _ in range(2)]
+
+    assert run_on_shared_loop(batch()).result(timeout=10) == ["ok", "ok"]
+    assert run_on_shared_loop(batch()).result(timeout=10) == ["ok", "ok"]
+    assert shared.stats()["connections_opened"] == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__])
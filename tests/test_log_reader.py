@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental reply log reader
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.log_reader import IncrementalLogReader
+from src.core.log_store import CsvLogStore
+from test_log_store import make_record
+
+def test_reader_only_parses_appended_rows(tmp_path, monkeypatch):
+    """Test that a refresh after an append parses just the new rows"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record("2024-01-01 09:00:00", "support")])
+    reader = IncrementalLogReader(store.path)
+    assert reader.refresh()["total"] == 1
+
+    parsed = []
+    original = IncrementalLogReader._consume_line
+    monkeypatch.setattr(IncrementalLogReader, "_consume_line", lambda self, line: parsed.append(line) or original(self, line))
+    store.append_many([make_record("2024-01-01 10:00:00", "billing")])
+    summary = reader.refresh()
+
+    assert len(parsed) == 1
+    assert summary["categories"] == {"support": 1, "billing": 1}
+    assert summary["intents"] == {"ask": 2}
+
+def test_reader_resumes_from_persisted_offset(tmp_path):
+    """Test that a new reader picks up the saved offset and aggregates"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record("2024-01-01 09:00:00", "support")])
+    IncrementalLogReader(store.path).refresh()
+    store.append_many([make_record("2024-01-01 10:00:00", "billing")])
+
+    reader = IncrementalLogReader(store.path)
+    assert reader._state["offset"] > 0
+    assert reader.refresh()["total"] == 2
+
+def test_reader_rescans_after_truncation(tmp_path):
+    """Test that a truncated or replaced log is rescanned from the start"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record(f"2024-01-0{i} 09:00:00", "support") for i in range(1, 4)])
+    reader = IncrementalLogReader(store.path)
+    assert reader.refresh()["total"] == 3
+
+    os.remove(store.path)
+    store.append_many([make_record("2024-02-01 09:00:00", "billing")])
+
+    assert reader.refresh() == {
+        "total": 1,
+        "categories": {"billing": 1},
+        "intents": {"ask": 1},
+        "reply_length_sum": len("Thanks for reaching out")
+    }
+
+def test_partial_rows_wait_for_next_refresh(tmp_path):
+    """Test that a row still being written is not consumed"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record("2024-01-01 09:00:00", "support")])
+    with open(store.path, "a", encoding="utf-8") as f:
+        f.write('"{""category"": ""bil')
+    reader = IncrementalLogReader(store.path)
+
+    assert reader.refresh()["total"] == 1
+    assert reader._state["offset"] < os.path.getsize(store.path)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
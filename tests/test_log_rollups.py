@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the pre-aggregated analytics rollups
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.log_rollups import ReplyRollups
+from src.core.log_store import CsvLogStore
+from src.utils.helpers import analyze_reply_quality, load_reply_data
+from test_log_store import make_record
+
+def sample_records():
+    return [
+        make_record(f"2024-01-0{1 + i % 3} 09:00:{i:02d}", ["support", "billing"][i % 2], reply="x" * (i * 17))
+        for i in range(20)
+    ]
+
+def test_rollups_match_raw_log_statistics(tmp_path):
+    """Test that rollup queries agree with statistics computed from raw rows"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many(sample_records())
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.add(sample_records())
+
+    df = load_reply_data(store.path, start="2024-01-02", end="2024-01-04")
+    expected = analyze_reply_quality(df)
+    result = rollups.query("2024-01-02", "2024-01-03")
+
+    assert result["total"] == len(df)
+    for key in ("avg_length", "min_length", "max_length", "std_length", "short_replies", "medium_replies", "long_replies"):
+        assert result[key] == pytest.approx(expected[key])
+    assert result["categories"] == df["category"].value_counts().to_dict()
+    assert sum(result["daily_counts"].values()) == len(df)
+    assert sum(result["length_histogram"].values()) == len(df)
+
+def test_rollups_rebuild_when_out_of_sync(tmp_path):
+    """Test that rows logged without the writer are picked up by sync_with"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many(sample_records())
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.add(sample_records()[:5])
+
+    rollups.sync_with(store)
+
+    assert rollups.total() == 20
+    assert rollups.query()["intents"] == {"ask": 20}
+
+def test_batches_racing_a_rebuild_are_not_counted_twice(tmp_path):
+    """Test that a batch already picked up by a rebuild is not folded in again"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    records = sample_records()
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    store.append_many(records[:10])
+    assert rollups.sync_with(store)
+
+    versions = store.append_many(records[10:15])
+    assert rollups.add(records[10:15], versions)
+    assert rollups.is_current(store)
+
+    # The rebuild reads the writer's batch before the writer folds it in
+    versions = store.append_many(records[15:])
+    rollups.sync_with(store)
+    assert not rollups.add(records[15:], versions)
+    assert rollups.total() == 20
+    assert not rollups.is_current(store)
+
+    rollups.sync_with(store)
+    assert rollups.is_current(store)
+    assert rollups.total() == 20
+
+def test_failed_rebuild_keeps_previous_rollups(tmp_path):
+    """Test that a rebuild is swapped in whole or not at all"""
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.rebuild(sample_records())
+
+    def broken_log():
+        yield from sample_records()[:5]
+        raise OSError("log segment vanished")
+
+    with pytest.raises(OSError):
+        rollups.rebuild(broken_log())
+    assert rollups.total() == 20
+
+if __name__ == "__main__":
+    pytest.main([__file__])
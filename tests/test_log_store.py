@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the reply log storage backends
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.log_store import CsvLogStore, SqliteLogStore, migrate_csv_log
+
+def make_record(timestamp, category, reply="Thanks for reaching out"):
+    return {
+        "timestamp": timestamp,
+        "subject": f"{category} question",
+        "email_body": "Body",
+        "category": category,
+        "intent": "ask",
+        "entities": {"name": "Alex"},
+        "reply": reply
+    }
+
+def test_sqlite_store_selects_columns_and_dates(tmp_path):
+    """Test that the SQLite store filters by date and only loads requested columns"""
+    store = SqliteLogStore(str(tmp_path / "log.sqlite"))
+    store.append_many([
+        make_record("2024-01-01 09:00:00", "support"),
+        make_record("2024-01-02 09:00:00", "billing", reply="Refund issued"),
+    ])
+
+    df = store.load_dataframe(columns=["timestamp", "category", "reply_length"], start="2024-01-02")
+
+    assert list(df.columns) == ["timestamp", "category", "reply_length"]
+    assert df["category"].tolist() == ["billing"]
+    assert df["reply_length"].tolist() == [len("Refund issued")]
+    assert store.summary() == {
+        "total": 2,
+        "categories": {"support": 1, "billing": 1},
+        "intents": {"ask": 2},
+        "reply_length_sum": len("Thanks for reaching out") + len("Refund issued")
+    }
+
+def test_migrate_csv_log(tmp_path):
+    """Test that a legacy CSV log is copied into SQLite with real columns"""
+    csv_store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    csv_store.append_many([make_record(f"2024-01-0{i} 09:00:00", "support") for i in range(1, 6)])
+    db_path = str(tmp_path / "reply_log.sqlite")
+
+    migrated = migrate_csv_log(csv_store.path, db_path, batch_size=2)
+
+    store = SqliteLogStore(db_path)
+    assert migrated == 5
+    assert store.count() == 5
+    assert next(store.iter_records())["entities"] == {"name": "Alex"}
+    with pytest.raises(ValueError):
+        migrate_csv_log(csv_store.path, db_path)
+
+def test_csv_log_rotates_into_day_segments(tmp_path):
+    """Test that a new day seals the active log and range reads skip other days"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record("2024-01-01 09:00:00", "support"), make_record("2024-01-02 09:00:00", "billing")])
+    store.append_many([make_record("2024-01-03 09:00:00", "sales")])
+
+    assert sorted(os.listdir(store.segment_dir)) == [".lock", "manifest.json", "reply_log-2024-01-01.csv", "reply_log-2024-01-02.csv"]
+    assert store.segment_paths(start="2024-01-02", end="2024-01-02 23:59") == [str(tmp_path / "reply_log" / "reply_log-2024-01-02.csv")]
+    assert store.load_dataframe(columns=["category"], start="2024-01-02")["category"].tolist() == ["billing", "sales"]
+    assert store.summary()["categories"] == {"support": 1, "billing": 1, "sales": 1}
+    assert [record["category"] for record in store.iter_records()] == ["support", "billing", "sales"]
+
+def test_retention_drops_or_archives_expired_days(tmp_path):
+    """Test that day segments outside the retention window are removed"""
+    today = datetime.now()
+    old_day = str(today - timedelta(days=40))
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"), archive_expired=True)
+    store.append_many([make_record(old_day, "support"), make_record(str(today - timedelta(days=5)), "billing")])
+
+    assert store.enforce_retention(30) == 1
+    assert os.listdir(store.archive_dir) == [f"reply_log-{old_day[:10]}.csv.gz"]
+    assert store.summary()["categories"] == {"billing": 1}
+
+    db_store = SqliteLogStore(str(tmp_path / "log.sqlite"))
+    db_store.append_many([make_record(old_day, "support"), make_record(str(today), "billing")])
+    assert db_store.enforce_retention(30) == 1
+    assert db_store.count() == 1
+
+@pytest.mark.parametrize("store_class, filename", [(CsvLogStore, "reply_log.csv"), (SqliteLogStore, "log.sqlite")])
+def test_query_pages_filters_and_searches(tmp_path, store_class, filename):
+    """Test that both stores return one page of matching rows, newest first"""
+    store = store_class(str(tmp_path / filename))
+    for day in range(1, 4):
+        store.append_many([
+            {**make_record(f"2024-01-0{day} 09:00:{i:02d}", ["support", "billing"][i % 2]), "subject": f"Order {day}-{i}"}
+            for i in range(10)
+        ])
+
+    page = store.query(category="support", limit=4, offset=3, columns=["timestamp", "subject"])
+    assert page["total"] == 15
+    assert [row["subject"] for row in page["rows"]] == ["Order 3-2", "Order 3-0", "Order 2-8", "Order 2-6"]
+    assert list(page["rows"][0]) == ["timestamp", "subject"]
+
+    found = store.query(search="ORDER 2-", start="2024-01-02", end="2024-01-03", limit=3)
+    assert found["total"] == 10
+    assert [row["subject"] for row in found["rows"]] == ["Order 2-9", "Order 2-8", "Order 2-7"]
+    assert store.query(search="100%")["total"] == 0
+    assert len(list(store.iter_matching(category="billing", start="2024-01-03"))) == 5
+
+if __name__ == "__main__":
+    pytest.main([__file__])
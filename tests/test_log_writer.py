@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the buffered reply log writer
+"""
+
+import sys
+import os
+import threading
+import time
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.log_rollups import ReplyRollups
+from src.core.log_store import CsvLogStore
+from src.core.log_writer import BufferedLogWriter
+from test_log_store import make_record
+
+def test_writer_batches_records(tmp_path):
+    """Test that queued records are written in batches and visible after flush"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=5.0, max_batch=10)
+    for i in range(25):
+        writer.enqueue(make_record(f"2024-01-01 09:00:{i:02d}", "support"))
+    writer.flush()
+
+    assert writer.stats()["written"] == 25
+    assert writer.stats()["batches"] == 3
+    assert store.summary()["total"] == 25
+    writer.close()
+
+def test_concurrent_producers_do_not_interleave_rows(tmp_path):
+    """Test that rows from many threads stay intact"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=0.01)
+
+    def produce(n):
+        for i in range(50):
+            writer.enqueue(make_record(f"2024-01-01 {n:02d}:00:{i:02d}", f"cat{n}"))
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    records = list(store.iter_records())
+    assert len(records) == 200
+    assert {record["category"] for record in records} == {"cat0", "cat1", "cat2", "cat3"}
+
+def test_close_drains_queue(tmp_path):
+    """Test that closing writes everything still queued"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=60.0)
+    writer.enqueue(make_record("2024-01-01 09:00:00", "support"))
+    writer.close()
+
+    assert store.summary()["total"] == 1
+    writer.enqueue(make_record("2024-01-02 09:00:00", "support"))
+    assert store.summary()["total"] == 2
+
+def test_flush_after_close_returns(tmp_path):
+    """Test that flushing a closed writer does not wait on the stopped thread"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=60.0)
+    writer.enqueue(make_record("2024-01-01 09:00:00", "support"))
+    writer.close()
+
+    flusher = threading.Thread(target=writer.flush, daemon=True)
+    flusher.start()
+    flusher.join(timeout=5)
+    assert not flusher.is_alive()
+
+def test_records_enqueued_while_closing_are_kept(tmp_path):
+    """Test that records racing with close are written, not left behind the stop marker"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=0.01)
+
+    def produce():
+        for i in range(50):
+            writer.enqueue(make_record("2024-01-01 09:00:00", f"cat{i % 3}"))
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for producer in producers:
+        producer.start()
+    writer.close()
+    for producer in producers:
+        producer.join()
+
+    assert store.summary()["total"] == 200
+
+def test_listeners_run_after_each_write(tmp_path):
+    """Test that cache invalidation listeners see written batches and the store version moves"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    writer = BufferedLogWriter(store, flush_interval=0.01)
+    seen = []
+    writer.add_listener(seen.append)
+    before = store.version()
+
+    writer.enqueue(make_record("2024-01-01 09:00:00", "support"))
+    writer.flush()
+
+    assert [len(batch) for batch in seen] == [1]
+    assert store.version() != before
+    writer.close()
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_rollup_sync_runs_on_the_writer_thread(tmp_path):
+    """Test that a requested rollup rebuild runs on the writer and notifies listeners"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many([make_record("2024-01-01 09:00:00", "support")])
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    writer = BufferedLogWriter(store, flush_interval=0.01, rollups=rollups)
+    seen = []
+    writer.add_listener(seen.append)
+
+    writer.request_sync()
+    assert wait_until(lambda: rollups.is_current(store))
+
+    assert rollups.total() == 1
+    assert seen == [[]]
+
+    writer.enqueue(make_record("2024-01-01 10:00:00", "billing"))
+    writer.flush()
+
+    assert rollups.is_current(store)
+    assert rollups.total() == 2
+    writer.close()
+
+def test_contended_batches_share_one_deferred_rebuild(tmp_path):
+    """Test that batches losing the version race do not each rescan the log"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    rollups = ReplyRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.sync_with(store)
+    rebuilds = []
+    sync_with = rollups.sync_with
+    rollups.sync_with = lambda store: rebuilds.append(1) or sync_with(store)
+    writer = BufferedLogWriter(store, flush_interval=0.5, rollups=rollups)
+
+    for minute in range(5):
+        # Another process appends between every batch of this writer
+        store.append_many([make_record(f"2024-01-01 09:{minute:02d}:00", "billing")])
+        writer.enqueue(make_record(f"2024-01-01 10:{minute:02d}:00", "support"))
+        writer.flush()
+    assert rebuilds == []
+
+    assert wait_until(lambda: rollups.is_current(store))
+    assert rebuilds == [1]
+    assert rollups.total() == 10
+    writer.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
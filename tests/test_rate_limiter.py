@@ -0,0 +1,113 @@
+"""
+Tests for the client-side LLM rate limiter
+"""
+
+import sys
+import os
+import asyncio
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_core.messages import AIMessage
+from src.utils import rate_limiter
+from src.utils.rate_limiter import TokenBucketLimiter, get_rate_limiter, set_process_share
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_requests_wait_once_the_bucket_is_empty():
+    """Test that calls beyond the per-minute budget are told to wait in order"""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(requests_per_minute=60, headroom=1.0, clock=clock)
+    limiter._requests = 2
+
+    assert limiter.reserve(0) == 0
+    assert limiter.reserve(0) == 0
+    assert limiter.reserve(0) == pytest.approx(1.0)
+    assert limiter.reserve(0) == pytest.approx(2.0)
+
+    clock.now = 2.0
+    assert limiter.reserve(0) == pytest.approx(1.0)
+
+def test_token_estimate_is_corrected_from_usage():
+    """Test that reported usage refunds an over-estimate"""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(tokens_per_minute=600, headroom=1.0, completion_tokens=100,
+                                 burst_seconds=60.0, clock=clock)
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+
+    estimated = limiter.estimate("hello world")
+    limiter.call(lambda prompt: message, "hello world")
+
+    stats = limiter.stats()
+    assert stats["tokens_reserved"] == estimated
+    assert stats["tokens_used"] == 15
+    assert stats["tokens_available"] == pytest.approx(limiter.token_capacity - 15)
+
+def test_bursts_are_capped_to_a_few_seconds_of_budget():
+    """Test that a fresh or idle limiter cannot spend a whole minute's budget at once"""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(requests_per_minute=600, headroom=1.0, burst_seconds=2.0, clock=clock)
+
+    waits = [limiter.reserve(0) for _ in range(22)]
+    assert waits[:20] == [0] * 20
+    assert waits[20] == pytest.approx(0.1)
+
+    clock.now = 3600.0
+    assert limiter.stats()["requests_available"] == pytest.approx(20)
+
+def test_oversized_prompt_is_refunded_against_the_capped_reservation():
+    """Test that correcting a prompt larger than a minute of budget does not over-credit"""
+    limiter = TokenBucketLimiter(tokens_per_minute=600, headroom=1.0, clock=FakeClock())
+    start = limiter.stats()["tokens_available"]
+
+    limiter.reserve(5000)
+    limiter.correct(5000, 4000)
+
+    assert limiter.stats()["tokens_available"] == pytest.approx(start - 600)
+
+def test_async_call_waits_for_budget(monkeypatch):
+    """Test that acall sleeps on the event loop when out of budget"""
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = TokenBucketLimiter(requests_per_minute=60, headroom=1.0, clock=FakeClock())
+    limiter._requests = 0
+
+    async def call(prompt):
+        return AIMessage(content=prompt)
+
+    result = asyncio.run(limiter.acall(call, "hi"))
+    assert result.content == "hi"
+    assert slept == [pytest.approx(1.0)]
+
+def test_limiter_is_shared_and_can_be_disabled():
+    """Test that one limiter serves every graph with the same limits"""
+    config = {"rate_limit_requests_per_minute": 100, "rate_limit_tokens_per_minute": 1000}
+
+    assert get_rate_limiter(config) is get_rate_limiter(dict(config))
+    assert get_rate_limiter({"rate_limit_requests_per_minute": 0}) is None
+
+def test_worker_processes_split_the_budget(monkeypatch):
+    """Test that each of N worker processes gets 1/N of the account limits"""
+    monkeypatch.setattr(rate_limiter, "_process_share", 1.0)
+    config = {"rate_limit_requests_per_minute": 600, "rate_limit_headroom": 1.0}
+    whole = get_rate_limiter(config)
+
+    set_process_share(0.25)
+    quarter = get_rate_limiter(config)
+
+    assert quarter is not whole
+    assert quarter.request_rate == pytest.approx(whole.request_rate / 4)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
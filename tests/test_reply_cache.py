@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed reply cache
+"""
+
+import sys
+import os
+import sqlite3
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.langgraph_workflow import build_email_graph
+from src.core.reply_cache import ReplyCache, ScopedReplyCache, create_scoped_cache
+from test_workflow import fake_llm
+
+def scoped_cache(tmp_path, **kwargs):
+    store = ReplyCache(str(tmp_path / "cache.sqlite"), **kwargs)
+    return ScopedReplyCache(store, "gpt-3.5-turbo", 0.3)
+
+def test_cache_key_normalizes_whitespace(tmp_path):
+    """Test that bodies differing only in whitespace share an entry"""
+    cache = scoped_cache(tmp_path)
+    cache.put("classification", "Hello   team,\n\nthanks", {"category": "feedback"})
+
+    assert cache.get("classification", "Hello team, thanks") == {"category": "feedback"}
+    assert cache.get("classification", "Hello team, thanks!") is None
+    assert cache.store.stats()["stages"]["classification"]["hits"] == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    """Test that entries older than the TTL are not served"""
+    cache = scoped_cache(tmp_path, ttl_seconds=-1)
+    cache.put("reply", "body", {"reply": "hi"})
+
+    assert cache.get("reply", "body") is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Test that the store stays within max_entries"""
+    cache = scoped_cache(tmp_path, max_entries=2)
+    for i in range(4):
+        cache.put("reply", f"body {i}", {"reply": str(i)})
+
+    assert cache.get("reply", "body 0") is None
+    assert cache.get("reply", "body 3") == {"reply": "3"}
+
+class LockedConnection:
+    """Connection stand-in for a cache file locked by another process"""
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    executemany = execute
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def test_locked_database_is_a_miss(tmp_path):
+    """Test that SQLite errors count as misses and skipped stores instead of raising"""
+    cache = scoped_cache(tmp_path)
+    cache.store._conn = LockedConnection()
+
+    cache.put("reply", "body", {"reply": "hi"})
+    assert cache.get("reply", "body") is None
+    assert cache.store.stats()["misses"] == 1
+
+def test_hits_batch_last_access_writes(tmp_path):
+    """Test that hits do not write to the database until the next put"""
+    cache = scoped_cache(tmp_path)
+    cache.put("reply", "body", {"reply": "hi"})
+    key = cache._key("reply", "body", ())
+    last_access = lambda: sqlite3.connect(cache.store.path).execute(
+        "SELECT last_access FROM reply_cache WHERE key = ?", (key,)
+    ).fetchone()[0]
+    stored = last_access()
+
+    assert cache.get("reply", "body") == {"reply": "hi"}
+    assert last_access() == stored
+
+    cache.put("reply", "other body", {"reply": "hello"})
+    assert last_access() > stored
+
+def test_cached_stages_skip_llm_calls(tmp_path):
+    """Test that a repeated email is answered entirely from stage entries"""
+    cache = scoped_cache(tmp_path)
+    llm = fake_llm()
+    graph = build_email_graph(llm_client=llm, cache=cache)
+
+    first = graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+    calls_after_first = len(llm.prompts)
+    second = graph.invoke({"email_body": "Can we  move our meeting to 4:30pm?"})
+
+    assert calls_after_first == 3
+    assert len(llm.prompts) == 3
+    assert second["reply"] == first["reply"]
+
+def test_cache_replies_setting_disables_cache():
+    """Test that advanced.cache_replies: false turns caching off"""
+    assert create_scoped_cache({"advanced": {"cache_replies": False}}) is None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the full-text search index
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core import search_index
+from src.core.log_store import CsvLogStore
+from src.core.search_index import ReplySearchIndex, build_match_query
+from src.utils import helpers
+from test_log_store import make_record
+
+def indexed_records():
+    return [
+        {**make_record("2024-01-01 09:00:00", "billing"), "subject": "Refund for order 1234", "email_body": "Please refund me"},
+        {**make_record("2024-01-02 09:00:00", "support"), "subject": "Login problem", "email_body": "I asked about a refund last week"},
+        {**make_record("2024-01-03 09:00:00", "sales"), "subject": "Pricing", "email_body": "What does the premium plan cost?"},
+    ]
+
+def test_match_query_quotes_user_input():
+    """Test that operators and punctuation in user input are taken literally"""
+    assert build_match_query('refund AND "order') == '"refund" "AND" "order"'
+    assert build_match_query("refu*") == '"refu"*'
+    assert build_match_query("premium pl", prefix_last=True) == '"premium" "pl"*'
+    assert build_match_query("?!") is None
+
+def test_search_ranks_subject_hits_first(tmp_path):
+    """Test ranked, prefix and filtered search"""
+    index = ReplySearchIndex(str(tmp_path / "search.sqlite"))
+    index.add(indexed_records())
+
+    result = index.search("refund")
+    assert result["total"] == 2
+    assert [row["subject"] for row in result["rows"]] == ["Refund for order 1234", "Login problem"]
+    assert "**refund**" in result["rows"][1]["snippet"]
+
+    assert index.search("prem", prefix_last=True)["total"] == 1
+    assert index.search("refund", category="support")["rows"][0]["subject"] == "Login problem"
+    assert index.search("refund", start="2024-01-02")["total"] == 1
+
+def test_index_rebuilds_from_log(tmp_path):
+    """Test that rows logged without the writer are indexed by sync_with"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many(indexed_records())
+    index = ReplySearchIndex(str(tmp_path / "search.sqlite"))
+
+    index.sync_with(store)
+
+    assert index.total() == 3
+    assert index.search("cost")["total"] == 1
+
+def test_batch_picked_up_by_a_rebuild_is_not_indexed_twice(tmp_path):
+    """Test that a racing writer batch leaves the index stale instead of duplicating rows"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    index = ReplySearchIndex(str(tmp_path / "search.sqlite"))
+    records = indexed_records()
+    store.append_many(records[:1])
+    index.sync_with(store)
+
+    versions = store.append_many(records[1:])
+    index.sync_with(store)
+    assert not index.add(records[1:], versions)
+    assert index.total() == 3
+    assert index.search("refund")["total"] == 2
+
+    index.sync_with(store)
+    assert index.is_current(store)
+    assert index.total() == 3
+
+def test_failed_rebuild_keeps_the_live_index(tmp_path):
+    """Test that searches see the old index until a rebuild is complete"""
+    index = ReplySearchIndex(str(tmp_path / "search.sqlite"))
+    index.rebuild(indexed_records())
+
+    def broken_log():
+        yield from indexed_records()[:1]
+        raise OSError("log segment vanished")
+
+    with pytest.raises(OSError):
+        index.rebuild(broken_log())
+    assert index.total() == 3
+    assert index.search("cost")["total"] == 1
+
+def test_search_falls_back_to_the_log_when_index_is_disabled(tmp_path, monkeypatch):
+    """Test that searches still find replies with search_index_enabled: false"""
+    store = CsvLogStore(str(tmp_path / "reply_log.csv"))
+    store.append_many(indexed_records())
+    monkeypatch.setattr(search_index, "_default_enabled", False)
+    monkeypatch.setattr(helpers, "_reply_log_store", lambda log_path=None: store)
+
+    rows, total = helpers.search_replies("refund*", page_size=10)
+    assert total == 2
+    assert list(rows["subject"]) == ["Login problem", "Refund for order 1234"]
+    assert helpers.search_replies("premium", category="billing", page_size=10)[1] == 0
+    assert len(helpers.search_replies("refund", page_size=None)[0]) == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the near-duplicate semantic reply cache
+"""
+
+import sys
+import os
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.core.semantic_cache import SemanticReplyCache, email_details, email_shingles, hamming_distance, simhash
+
+ORDER_EMAIL = """Hi team,
+
+My order #{order} has not arrived yet and the tracking page has not been
+updated for over a week. Could you please check where the package is and let
+me know when I can expect the delivery?
+
+Thanks,
+{name}"""
+
+def test_greeting_signature_and_digits_do_not_change_fingerprint():
+    """Test that emails differing only in greeting, sign-off or digits share a fingerprint"""
+    first = simhash(email_shingles(ORDER_EMAIL.format(order=12345, name="Alex")))
+    second = ORDER_EMAIL.format(order=98765, name="Sam").replace("Hi team,", "Hello Support,")
+    second = simhash(email_shingles(second.replace("Thanks,", "Kind regards,")))
+    assert first == second
+
+def test_near_duplicate_reuses_reply(tmp_path):
+    """Test that a near-duplicate email of the same category reuses the stored reply"""
+    cache = SemanticReplyCache(str(tmp_path / "cache.sqlite"), scope="test")
+    cache.add(ORDER_EMAIL.format(order=12345, name="Alex"), "support", "Alex, we are checking order #12345.")
+    resent = ORDER_EMAIL.format(order=12345, name="Alex").replace("yet and", "yet, and").replace("\nupdated", " updated")
+
+    reused = cache.lookup(resent, "support")
+
+    assert reused == "Alex, we are checking order #12345."
+    assert cache.lookup(resent, "billing") is None
+    assert cache.stats()["hits"] == 1
+
+def test_reply_is_not_reused_for_other_customers_or_orders(tmp_path):
+    """Test that a reply written for one sender and order is not handed to another"""
+    cache = SemanticReplyCache(str(tmp_path / "cache.sqlite"), scope="test")
+    cache.add(ORDER_EMAIL.format(order=12345, name="Alex"), "support", "Alex, we are checking order #12345.")
+
+    assert email_details(ORDER_EMAIL.format(order=12345, name="Alex")) != email_details(ORDER_EMAIL.format(order=555, name="Alex"))
+    assert cache.lookup(ORDER_EMAIL.format(order=555, name="Sam"), "support") is None
+    assert cache.lookup(ORDER_EMAIL.format(order=555, name="Alex"), "support") is None
+    assert cache.lookup(ORDER_EMAIL.format(order=12345, name="Sam"), "support") is None
+
+def test_unrelated_email_is_a_miss(tmp_path):
+    """Test that a different email is not matched"""
+    cache = SemanticReplyCache(str(tmp_path / "cache.sqlite"), scope="test")
+    cache.add(ORDER_EMAIL.format(order=1, name="Alex"), "support", "We are checking your order.")
+
+    other = "Can we move our weekly planning meeting from Tuesday afternoon to Thursday morning next week please?"
+    assert cache.lookup(other, "support") is None
+
+def test_hamming_distance():
+    """Test the bit distance helper"""
+    assert hamming_distance(0b1011, 0b0001) == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for the LangGraph email workflow using a fake chat model
+"""
+
+import sys
+import os
+import asyncio
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_core.language_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.core import reply_service
+from src.core.langgraph_workflow import build_email_graph
+from src.utils.helpers import retry_with_exponential_backoff_async
+
+class PromptRoutedChatModel(SimpleChatModel):
+    """Fake chat model answering by prompt, since branches run in any order"""
+
+    prompts: list = []
+
+    @property
+    def _llm_type(self):
+        return "prompt-routed-fake"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        if "Classify this email" in prompt:
+            return "schedule"
+        if "Extract intent" in prompt:
+            return '{"intent": "reschedule_meeting", "entities": {"time": "4:30pm"}}'
+        return "Sure, 4:30pm works."
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Stream word by word, like a real model streaming tokens
+        for index, word in enumerate(self._call(messages, stop=stop).split(" ")):
+            token = word if index == 0 else " " + word
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        if "Analyze the following email" not in prompt:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        self.prompts.append(prompt)
+        message = AIMessage(content="", tool_calls=[{
+            "name": "EmailAnalysis",
+            "args": {"category": "schedule", "intent": "reschedule_meeting", "entities": {"time": "4:30pm"}},
+            "id": "call_1",
+        }])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def fake_llm():
+    return PromptRoutedChatModel(prompts=[])
+
+def test_graph_sync_invoke():
+    """Test that the graph runs all three nodes with invoke"""
+    graph = build_email_graph(llm_client=fake_llm())
+    result = graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+
+    assert result["category"] == "schedule"
+    assert result["intent"] == "reschedule_meeting"
+    assert result["entities"] == {"time": "4:30pm"}
+    assert result["reply"] == "Sure, 4:30pm works."
+
+def test_graph_async_invoke():
+    """Test that the graph runs all three nodes with ainvoke"""
+    graph = build_email_graph(llm_client=fake_llm())
+    result = asyncio.run(graph.ainvoke({"email_body": "Can we move our meeting to 4:30pm?"}))
+
+    assert result["category"] == "schedule"
+    assert result["intent"] == "reschedule_meeting"
+    assert result["reply"] == "Sure, 4:30pm works."
+
+def test_reply_stream_yields_tokens_then_result(monkeypatch):
+    """Test that streamed reply tokens add up to the logged reply"""
+    graph = build_email_graph(llm_client=fake_llm())
+    monkeypatch.setattr(reply_service, "get_email_pipeline", lambda: (graph, None))
+
+    stream = reply_service.stream_reply({"email_body": "Can we move our meeting to 4:30pm?"})
+    tokens = list(stream)
+
+    assert tokens == ["Sure,", " 4:30pm", " works."]
+    assert stream.result == ("schedule", "reschedule_meeting", {"time": "4:30pm"}, "Sure, 4:30pm works.")
+
+def test_reply_node_sees_both_branches():
+    """Test that classification and extraction join before reply generation"""
+    llm = fake_llm()
+    graph = build_email_graph(llm_client=llm)
+    graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+
+    reply_prompt = llm.prompts[-1]
+    assert "replying to a schedule email with the intent of reschedule_meeting" in reply_prompt
+    assert "4:30pm" in reply_prompt
+
+def test_graph_fans_out_from_entry_point():
+    """Test that classification and extraction are parallel branches"""
+    edges = build_email_graph(llm_client=fake_llm()).get_graph().edges
+    starts = {edge.target for edge in edges if edge.source == "__start__"}
+
+    assert starts == {"classify_email", "extract_entities_intent"}
+
+def test_fused_analysis_uses_two_llm_calls():
+    """Test that fused mode covers classification and extraction in one call"""
+    llm = fake_llm()
+    graph = build_email_graph(llm_client=llm, analysis_mode="fused")
+    result = graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+
+    assert len(llm.prompts) == 2
+    assert result["category"] == "schedule"
+    assert result["intent"] == "reschedule_meeting"
+    assert result["entities"] == {"time": "4:30pm"}
+    assert result["reply"] == "Sure, 4:30pm works."
+
+class FencedJsonChatModel(PromptRoutedChatModel):
+    """Fake chat model that wraps its extraction JSON in a code fence"""
+
+    extraction: str = ""
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        answer = super()._call(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if "Extract intent" not in messages[-1].content:
+            return answer
+        return self.extraction or f"```json\n{answer}\n```"
+
+def test_fenced_extraction_json_is_parsed():
+    """Test that extraction JSON inside a code fence is used and not degraded"""
+    graph = build_email_graph(llm_client=FencedJsonChatModel(prompts=[]))
+    result = graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+
+    assert result["intent"] == "reschedule_meeting"
+    assert result["entities"] == {"time": "4:30pm"}
+    assert result["degraded"] is False
+
+def test_malformed_extraction_json_is_not_degraded():
+    """Test that unusable extraction JSON still yields a real, non-degraded reply"""
+    graph = build_email_graph(llm_client=FencedJsonChatModel(prompts=[], extraction="intent: reschedule"))
+    result = graph.invoke({"email_body": "Can we move our meeting to 4:30pm?"})
+
+    assert result["intent"] == "unknown"
+    assert result["entities"] == {}
+    assert result["reply"] == "Sure, 4:30pm works."
+    assert result["degraded"] is False
+
+def test_unknown_analysis_mode_is_rejected():
+    """Test that a misspelled analysis mode fails fast"""
+    with pytest.raises(ValueError):
+        build_email_graph(llm_client=fake_llm(), analysis_mode="combined")
+
+def test_async_retry_recovers_after_failure():
+    """Test that the async backoff retries a failing coroutine"""
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RuntimeError("rate limit")
+        return "ok"
+
+    result = asyncio.run(retry_with_exponential_backoff_async(flaky, base_delay=0.0, jitter=False))
+
+    assert result == "ok"
+    assert len(attempts) == 2
+
+if __name__ == "__main__":
+    pytest.main([__file__])